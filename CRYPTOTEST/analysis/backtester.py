@@ -1,80 +1,109 @@
 
+import itertools
 import pandas as pd
 import numpy as np
-from typing import Dict, List
+from typing import Dict, List, Union
+from core.records import Order, Signal
+from core.strategy_scheduler import StrategyScheduler
 from strategies.base_strategy import BaseStrategy
 from portfolio_management.portfolio import Portfolio
 from portfolio_management.risk_management import RiskManager
+from analysis.vectorized_backtest import VectorizedBacktestEngine
+from analysis.parallel_optimizer import (ParallelGridSearch, build_indicator_engine, generate_param_combinations,
+                                         run_combination, select_best)
 from utils.logging_config import setup_logging
 
 class Backtester:
     def __init__(self, strategy: BaseStrategy, initial_balance: float, risk_params: Dict):
         self.logger = setup_logging()
         self.strategy = strategy
+        self.initial_balance = initial_balance
+        self.risk_params = risk_params
         self.portfolio = Portfolio(initial_balance)
         self.risk_manager = RiskManager(**risk_params)
 
-    def run(self, historical_data: pd.DataFrame) -> Dict:
-        self.logger.info("Starting backtesting...")
-        results = []
-        for index, row in historical_data.iterrows():
-            signals = self.strategy.generate_signals(historical_data.loc[:index])
-            for signal in signals:
-                if self.risk_manager.check_risk(signal, self.portfolio):
-                    order = self.execute_trade(signal, row['close'])
-                    self.portfolio.update(order)
-            
-            portfolio_value = self.portfolio.get_total_value({'close': row['close']})
-            results.append({
-                'timestamp': index,
-                'close': row['close'],
-                'portfolio_value': portfolio_value
-            })
+    def run(self, historical_data: pd.DataFrame, mode: str = 'loop') -> Dict:
+        '''
+        mode='loop' replays the history row by row and hands the strategy a growing
+        DataFrame prefix. mode='vectorized' uses VectorizedBacktestEngine, which is
+        linear in the number of bars and reports the same metrics.
+        '''
+        self.logger.info(f"Starting backtesting ({mode} mode)...")
+        self.portfolio = Portfolio(self.initial_balance)
+
+        if mode == 'vectorized':
+            results = VectorizedBacktestEngine(self).run(historical_data)
+        elif mode == 'loop':
+            results = []
+            for index, row in historical_data.iterrows():
+                signals = self.strategy.generate_signals(historical_data.loc[:index])
+                self.process_signals(signals, row['close'])
+
+                portfolio_value = self.get_portfolio_value(row['close'])
+                results.append({
+                    'timestamp': index,
+                    'close': row['close'],
+                    'portfolio_value': portfolio_value
+                })
+        else:
+            raise ValueError(f"Unknown backtest mode: {mode}")
 
         performance_metrics = self.calculate_performance_metrics(results)
         self.logger.info(f"Backtesting completed. Performance metrics: {performance_metrics}")
         return performance_metrics
 
-    def execute_trade(self, signal: Dict, current_price: float) -> Dict:
+    def process_signals(self, signals: List[Signal], current_price: float):
+        for signal in signals:
+            signal = Signal.coerce(signal)
+            # execute_trade sizes its own orders: a 'hold' would otherwise become a full-size sell
+            if not StrategyScheduler.is_tradeable(signal):
+                continue
+            if self.risk_manager.check_risk(signal, self.portfolio):
+                order = self.execute_trade(signal, current_price)
+                try:
+                    self.portfolio.update(order)
+                except ValueError as e:
+                    self.logger.debug(f"Order rejected by portfolio: {e}")
+
+    def get_portfolio_value(self, current_price: float) -> float:
+        # Single-symbol backtest: every open position is marked at the current close
+        return self.portfolio.balance + sum(self.portfolio.positions.values()) * current_price
+
+    def execute_trade(self, signal: Signal, current_price: float) -> Order:
         amount = self.risk_manager.calculate_position_size(
             self.portfolio.balance,
             0.02,  # risk per trade (2% of balance)
             current_price,
-            self.risk_manager.calculate_stop_loss(current_price, signal['type'])
+            self.risk_manager.calculate_stop_loss(current_price, signal.type)
         )
 
-        return {
-            'symbol': signal['symbol'],
-            'side': 'buy' if signal['type'] == 'BUY' else 'sell',
-            'amount': amount,
-            'price': current_price
-        }
+        return Order(signal.symbol, 'buy' if signal.action == 'buy' else 'sell', amount, current_price)
 
-    def calculate_performance_metrics(self, results: List[Dict]) -> Dict:
-        df = pd.DataFrame(results)
+    def calculate_performance_metrics(self, results: Union[List[Dict], pd.DataFrame]) -> Dict:
+        df = results if isinstance(results, pd.DataFrame) else pd.DataFrame(results)
         df['returns'] = df['portfolio_value'].pct_change()
 
         total_return = (df['portfolio_value'].iloc[-1] - df['portfolio_value'].iloc[0]) / df['portfolio_value'].iloc[0]
         sharpe_ratio = np.sqrt(252) * df['returns'].mean() / df['returns'].std()
         max_drawdown = (df['portfolio_value'] / df['portfolio_value'].cummax() - 1).min()
         
+        # Closed trades, read from the trade log's profit column
+        profits = self.portfolio.trade_history.profits()
+        winning = profits > 0
+
         # Calculate win rate
-        trades = self.portfolio.get_trade_history()
-        winning_trades = [trade for trade in trades if trade['profit'] > 0]
-        win_rate = len(winning_trades) / len(trades) if trades else 0
+        win_rate = winning.mean() if len(profits) else 0
 
         # Calculate profit factor
-        gross_profit = sum([trade['profit'] for trade in winning_trades])
-        losing_trades = [trade for trade in trades if trade['profit'] <= 0]
-        gross_loss = abs(sum([trade['profit'] for trade in losing_trades]))
+        gross_profit = profits[winning].sum()
+        gross_loss = abs(profits[~winning].sum())
         profit_factor = gross_profit / gross_loss if gross_loss != 0 else float('inf')
 
         # Calculate average trade
-        avg_trade = np.mean([trade['profit'] for trade in trades]) if trades else 0
+        avg_trade = profits.mean() if len(profits) else 0
 
         # Calculate maximum consecutive losses
-        trade_results = [1 if trade['profit'] > 0 else 0 for trade in trades]
-        max_consecutive_losses = max(sum(1 for _ in group) for key, group in itertools.groupby(trade_results) if key == 0)
+        max_consecutive_losses = max((sum(1 for _ in group) for key, group in itertools.groupby(winning) if not key), default=0)
 
         return {
             'total_return': total_return,
@@ -82,32 +111,48 @@ class Backtester:
             'max_drawdown': max_drawdown,
             'win_rate': win_rate,
             'profit_factor': profit_factor,
-            'total_trades': len(trades),
+            'total_trades': len(profits),
             'avg_trade': avg_trade,
             'max_consecutive_losses': max_consecutive_losses,
             'final_portfolio_value': df['portfolio_value'].iloc[-1]
         }
 
-    def optimize_parameters(self, historical_data: pd.DataFrame, param_grid: Dict) -> Dict:
-        best_params = {}
-        best_performance = float('-inf')
-
-        for params in self._generate_param_combinations(param_grid):
-            self.strategy.set_parameters(**params)
-            performance = self.run(historical_data)
-            
-            if performance['total_return'] > best_performance:
-                best_performance = performance['total_return']
-                best_params = params
-
+    def optimize_parameters(self, historical_data: pd.DataFrame, param_grid: Dict, n_workers: int = 1,
+                            mode: str = 'vectorized', seed: int = None, progress_callback=None,
+                            stop_condition=None) -> Dict:
+        '''
+        Grid search over param_grid, maximizing total_return. Each combination runs on its own copy
+        of the strategy, so self.strategy is left untouched. With n_workers > 1 the grid is spread
+        over a process pool (see ParallelGridSearch); both paths pick the same best parameters.
+        Indicators are computed once for the whole search through a shared IndicatorEngine.
+        '''
+        if n_workers > 1:
+            search = ParallelGridSearch(self.strategy, self.initial_balance, self.risk_params,
+                                        n_workers=n_workers, mode=mode, seed=seed)
+            best_params, _, _ = search.run(historical_data, param_grid, progress_callback=progress_callback,
+                                           stop_condition=stop_condition)
+            self.logger.info(f"Optimization completed. Best parameters: {best_params}")
+            return best_params
+
+        combinations = list(self._generate_param_combinations(param_grid))
+        indicators = build_indicator_engine(self.strategy, historical_data, param_grid)
+        results = []
+        for index, params in enumerate(combinations):
+            performance = run_combination(self.strategy, params, historical_data, self.initial_balance,
+                                          self.risk_params, mode, seed, indicators)
+            results.append((index, params, performance))
+            if progress_callback is not None:
+                progress_callback(len(results), len(combinations), params, performance)
+            if stop_condition is not None and stop_condition(params, performance):
+                break
+
+        best = select_best(results, 'total_return')
+        best_params = best[1] if best else {}
         self.logger.info(f"Optimization completed. Best parameters: {best_params}")
         return best_params
 
     def _generate_param_combinations(self, param_grid: Dict):
-        keys = param_grid.keys()
-        values = param_grid.values()
-        for combination in itertools.product(*values):
-            yield dict(zip(keys, combination))
+        return generate_param_combinations(param_grid)
 
 if __name__ == "__main__":
     # Example usage
@@ -132,5 +177,5 @@ if __name__ == "__main__":
         'ema_short': range(5, 21),
         'ema_long': range(20, 51),
     }
-    best_params = backtester.optimize_parameters(historical_data, param_grid)
+    best_params = backtester.optimize_parameters(historical_data, param_grid, n_workers=4)
     print(f"Best parameters: {best_params}")
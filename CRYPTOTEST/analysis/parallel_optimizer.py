@@ -0,0 +1,159 @@
+
+import copy
+import itertools
+import os
+import random
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Tuple
+import numpy as np
+import pandas as pd
+from indicators.indicator_engine import IndicatorEngine
+
+class MemmapFrame:
+    '''
+    Numeric DataFrame stored as .npy files so worker processes can map it read-only
+    instead of receiving a pickled copy per task. Non-numeric columns are dropped.
+    '''
+    def __init__(self, df: pd.DataFrame, directory: str):
+        numeric = df.select_dtypes(include=[np.number])
+        self.columns = list(numeric.columns)
+        self.index_name = df.index.name
+        self.datetime_index = isinstance(df.index, pd.DatetimeIndex)
+        self.values_path = os.path.join(directory, 'values.npy')
+        self.index_path = os.path.join(directory, 'index.npy')
+        np.save(self.values_path, numeric.to_numpy(dtype=np.float64))
+        index = df.index.as_unit('ns').asi8 if self.datetime_index else np.asarray(df.index)
+        np.save(self.index_path, index)
+
+    def load(self) -> pd.DataFrame:
+        values = np.load(self.values_path, mmap_mode='r')
+        index = np.load(self.index_path, mmap_mode='r')
+        index = pd.DatetimeIndex(np.asarray(index).view('datetime64[ns]')) if self.datetime_index else pd.Index(index)
+        index.name = self.index_name
+        return pd.DataFrame(values, index=index, columns=self.columns, copy=False)
+
+def apply_parameters(strategy, params: Dict):
+    if hasattr(strategy, 'set_parameters'):
+        strategy.set_parameters(**params)
+    else:
+        for name, value in params.items():
+            setattr(strategy, name, value)
+
+def build_indicator_engine(strategy, historical_data: pd.DataFrame, param_grid: Dict = None) -> IndicatorEngine:
+    '''
+    IndicatorEngine over the history shared by every combination of a search. When the strategy
+    implements indicator_grid(param_grid) -> {name: periods}, the whole grid is computed up front.
+    '''
+    engine = IndicatorEngine.from_frame(historical_data)
+    if param_grid is not None and hasattr(strategy, 'indicator_grid'):
+        engine.precompute(strategy.indicator_grid(param_grid))
+    return engine
+
+def run_combination(strategy, params: Dict, historical_data: pd.DataFrame, initial_balance: float,
+                    risk_params: Dict, mode: str = 'vectorized', seed: int = None,
+                    indicators: IndicatorEngine = None) -> Dict:
+    # Imported lazily because analysis.backtester imports this module
+    from analysis.backtester import Backtester
+
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    strategy = copy.deepcopy(strategy)
+    apply_parameters(strategy, params)
+    if indicators is not None:
+        strategy.indicators = indicators
+    backtester = Backtester(strategy, initial_balance, risk_params)
+    return backtester.run(historical_data, mode=mode)
+
+def generate_param_combinations(param_grid: Dict) -> List[Dict]:
+    keys = param_grid.keys()
+    return [dict(zip(keys, combination)) for combination in itertools.product(*param_grid.values())]
+
+def select_best(results: Iterable[Tuple[int, Dict, Dict]], metric: str):
+    # Same rule as the serial loop: highest metric wins, the earliest combination wins ties, NaN never wins
+    best = None
+    for index, params, performance in results:
+        value = performance[metric]
+        if np.isnan(value):
+            continue
+        if best is None or value > best[2][metric] or (value == best[2][metric] and index < best[0]):
+            best = (index, params, performance)
+    return best
+
+_worker_state = {}
+
+def _init_worker(shared_frame: MemmapFrame, strategy, initial_balance: float, risk_params: Dict, mode: str,
+                 param_grid: Dict = None):
+    # Runs once per worker: the data is mapped, the strategy template unpickled and the indicators computed a single time
+    data = shared_frame.load()
+    _worker_state.update(
+        data=data,
+        indicators=build_indicator_engine(strategy, data, param_grid),
+        strategy=strategy,
+        initial_balance=initial_balance,
+        risk_params=risk_params,
+        mode=mode
+    )
+
+def _evaluate(index: int, params: Dict, seed: int):
+    state = _worker_state
+    performance = run_combination(state['strategy'], params, state['data'], state['initial_balance'],
+                                  state['risk_params'], state['mode'], seed, state['indicators'])
+    return index, params, performance
+
+class ParallelGridSearch:
+    def __init__(self, strategy, initial_balance: float, risk_params: Dict, n_workers: int = None,
+                 mode: str = 'vectorized', seed: int = None):
+        self.strategy = strategy
+        self.initial_balance = initial_balance
+        self.risk_params = risk_params
+        self.n_workers = n_workers or os.cpu_count()
+        self.mode = mode
+        self.seed = seed
+        self._stop = threading.Event()
+
+    def stop(self):
+        # Can be called from another thread (e.g. the GUI) to end the search early
+        self._stop.set()
+
+    def run(self, historical_data: pd.DataFrame, param_grid: Dict, metric: str = 'total_return',
+            progress_callback: Callable = None, stop_condition: Callable = None):
+        '''
+        Evaluates every combination of param_grid across a process pool.
+        progress_callback(completed, total, params, performance) is called as results arrive;
+        the search stops early when stop_condition(params, performance) returns True or stop() is called.
+        Returns (best_params, best_performance, results) where results lists (index, params, performance).
+        '''
+        self._stop.clear()
+        combinations = generate_param_combinations(param_grid)
+        results = []
+        directory = tempfile.mkdtemp(prefix='grid_search_')
+        try:
+            shared_frame = MemmapFrame(historical_data, directory)
+            executor = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                initializer=_init_worker,
+                initargs=(shared_frame, self.strategy, self.initial_balance, self.risk_params, self.mode, param_grid)
+            )
+            try:
+                futures = [executor.submit(_evaluate, index, params, self.seed) for index, params in enumerate(combinations)]
+                for future in as_completed(futures):
+                    index, params, performance = future.result()
+                    results.append((index, params, performance))
+                    if progress_callback is not None:
+                        progress_callback(len(results), len(combinations), params, performance)
+                    if self._stop.is_set() or (stop_condition is not None and stop_condition(params, performance)):
+                        break
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        results.sort(key=lambda result: result[0])
+        best = select_best(results, metric)
+        if best is None:
+            return {}, None, results
+        return best[1], best[2], results
@@ -1,17 +1,60 @@
 
 import random
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from deap import base, creator, tools, algorithms
 from analysis.backtester import Backtester
+from analysis.parallel_optimizer import MemmapFrame
+from indicators.indicator_engine import IndicatorEngine
 from utils.logging_config import setup_logging
 
+_worker_state = {}
+
+# Indicator columns kept per engine: GA parameters are continuous, so most periods are seen once
+INDICATOR_CACHE_SIZE = 256
+
+def _init_worker(shared_frame, strategy_class, initial_balance, risk_params, mode):
+    # Runs once per worker process, so the history is mapped once instead of pickled per individual
+    data = shared_frame.load()
+    _worker_state.update(
+        data=data,
+        indicators=IndicatorEngine.from_frame(data, max_cached=INDICATOR_CACHE_SIZE),
+        strategy_class=strategy_class,
+        initial_balance=initial_balance,
+        risk_params=risk_params,
+        mode=mode
+    )
+
+def _evaluate_params(params):
+    state = _worker_state
+    strategy = state['strategy_class'](**params)
+    strategy.indicators = state['indicators']
+    backtester = Backtester(strategy, state['initial_balance'], state['risk_params'])
+    results = backtester.run(state['data'], mode=state['mode'])
+    return -results['total_return'],
+
 class ParameterOptimizer:
-    def __init__(self, strategy_class, historical_data, initial_balance, risk_params):
+    def __init__(self, strategy_class, historical_data, initial_balance, risk_params, cache_size=4096, precision=4,
+                 mode='vectorized'):
         self.logger = setup_logging()
         self.strategy_class = strategy_class
         self.historical_data = historical_data
         self.initial_balance = initial_balance
         self.risk_params = risk_params
+        # Fitness memo keyed by the individual's parameters rounded to `precision` decimals
+        self.cache_size = cache_size
+        self.precision = precision
+        self.mode = mode
+        self.fitness_cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.generation_stats = []
+        self._executor = None
+        self.indicators = IndicatorEngine.from_frame(historical_data, max_cached=INDICATOR_CACHE_SIZE)
 
     def evaluate(self, individual):
         # Convert the individual to a dictionary of parameters
@@ -19,20 +62,77 @@ class ParameterOptimizer:
         
         # Create a strategy instance with these parameters
         strategy = self.strategy_class(**params)
+        strategy.indicators = self.indicators
         
         # Run the backtester
         backtester = Backtester(strategy, self.initial_balance, self.risk_params)
-        results = backtester.run(self.historical_data)
+        results = backtester.run(self.historical_data, mode=self.mode)
         
         # Return the negative of the total return (we want to maximize it)
         return -results['total_return'],
 
-    def optimize(self, param_ranges, population_size=50, generations=50):
+    def _cache_key(self, individual):
+        return tuple(round(float(value), self.precision) for value in individual)
+
+    def _map(self, evaluate, individuals):
+        '''
+        toolbox.map replacement. eaSimple calls it once per generation with the individuals
+        whose fitness is invalid: duplicates and cached parameter sets are not re-evaluated,
+        and the remaining ones are spread over the worker pool when there is one.
+        '''
+        start = time.perf_counter()
+        keys = [self._cache_key(individual) for individual in individuals]
+        missing = [key for key in dict.fromkeys(keys) if key not in self.fitness_cache]
+
+        if self._executor is not None:
+            fitnesses = self._executor.map(_evaluate_params, [dict(zip(self.param_names, key)) for key in missing])
+        else:
+            fitnesses = (evaluate(list(key)) for key in missing)
+        for key, fitness in zip(missing, fitnesses):
+            self.fitness_cache[key] = fitness
+            while len(self.fitness_cache) > self.cache_size:
+                self.fitness_cache.popitem(last=False)
+
+        results = []
+        for key in keys:
+            if key in self.fitness_cache:
+                self.fitness_cache.move_to_end(key)
+                results.append(self.fitness_cache[key])
+            else:
+                # Evicted while filling a batch larger than cache_size
+                results.append(evaluate(list(key)))
+        hits = len(keys) - len(missing)
+        self.cache_hits += hits
+        self.cache_misses += len(missing)
+
+        stats = {
+            'generation': len(self.generation_stats),
+            'individuals': len(keys),
+            'evaluated': len(missing),
+            'cache_hits': hits,
+            'cache_hit_rate': self.cache_hits / (self.cache_hits + self.cache_misses) if keys else 0.0,
+            'seconds': time.perf_counter() - start
+        }
+        self.generation_stats.append(stats)
+        self.logger.info(
+            f"Generation {stats['generation']}: evaluated {stats['evaluated']}/{stats['individuals']} individuals "
+            f"in {stats['seconds']:.2f}s, {hits} cache hits (overall hit rate {stats['cache_hit_rate']:.1%})"
+        )
+        return results
+
+    def optimize(self, param_ranges, population_size=50, generations=50, n_workers=1):
         self.param_names = list(param_ranges.keys())
+        self.generation_stats = []
+        # Keys are positional values: a previous run over other parameters would map them to the wrong names
+        self.fitness_cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
         
-        # Create types
-        creator.create("FitnessMax", base.Fitness, weights=(1.0,))
-        creator.create("Individual", list, fitness=creator.FitnessMax)
+        # Create types once per process; DEAP warns and overwrites them on every call otherwise
+        if not hasattr(creator, "FitnessMax"):
+            creator.create("FitnessMax", base.Fitness, weights=(1.0,))
+        if not hasattr(creator, "Individual"):
+            creator.create("Individual", list, fitness=creator.FitnessMax)
 
         # Initialize toolbox
         toolbox = base.Toolbox()
@@ -40,11 +140,12 @@ class ParameterOptimizer:
             toolbox.register(f"attr_{i}", random.uniform, low, high)
         
         toolbox.register("individual", tools.initCycle, creator.Individual,
-                         (getattr(toolbox, f"attr_{i}") for i in range(len(param_ranges))),
+                         tuple(getattr(toolbox, f"attr_{i}") for i in range(len(param_ranges))),
                          n=1)
         toolbox.register("population", tools.initRepeat, list, toolbox.individual)
         
         toolbox.register("evaluate", self.evaluate)
+        toolbox.register("map", self._map)
         toolbox.register("mate", tools.cxBlend, alpha=0.5)
         toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=1, indpb=0.2)
         toolbox.register("select", tools.selTournament, tournsize=3)
@@ -53,7 +154,22 @@ class ParameterOptimizer:
         pop = toolbox.population(n=population_size)
         
         # Run the genetic algorithm
-        algorithms.eaSimple(pop, toolbox, cxpb=0.5, mutpb=0.2, ngen=generations, verbose=False)
+        directory = tempfile.mkdtemp(prefix='parameter_optimizer_') if n_workers > 1 else None
+        try:
+            if directory is not None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=n_workers,
+                    initializer=_init_worker,
+                    initargs=(MemmapFrame(self.historical_data, directory), self.strategy_class,
+                              self.initial_balance, self.risk_params, self.mode)
+                )
+            algorithms.eaSimple(pop, toolbox, cxpb=0.5, mutpb=0.2, ngen=generations, verbose=False)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            if directory is not None:
+                shutil.rmtree(directory, ignore_errors=True)
         
         # Get the best individual
         best_ind = tools.selBest(pop, 1)[0]
@@ -83,5 +199,5 @@ if __name__ == "__main__":
         'macd_signal': (5, 20)
     }
 
-    best_params = optimizer.optimize(param_ranges)
+    best_params = optimizer.optimize(param_ranges, n_workers=4)
     print(f"Optimized parameters: {best_params}")
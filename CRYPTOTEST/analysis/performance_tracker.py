@@ -1,20 +1,18 @@
 
 import pandas as pd
 import numpy as np
+from core.records import TradeLog
 
 class PerformanceTracker:
     def __init__(self):
-        self.trades = []
+        self.trades = TradeLog()
         self.portfolio_values = []
 
-    def add_trade(self, timestamp, symbol, action, amount, price):
-        self.trades.append({
-            'timestamp': timestamp,
-            'symbol': symbol,
-            'action': action,
-            'amount': amount,
-            'price': price
-        })
+    def add_trade(self, timestamp, symbol, action, amount, price, profit=None):
+        # timestamp: epoch ms or anything pd.Timestamp accepts; profit: realized PnL of closing trades
+        if not isinstance(timestamp, (int, np.integer)):
+            timestamp = pd.Timestamp(timestamp).value // 1_000_000
+        self.trades.record(symbol, action, amount, price, timestamp, profit=profit)
 
     def add_portfolio_value(self, timestamp, value):
         self.portfolio_values.append({
@@ -49,8 +47,8 @@ class PerformanceTracker:
             'sharpe_ratio': sharpe_ratio,
             'max_drawdown': max_drawdown,
             'total_trades': len(self.trades),
-            'winning_trades': sum(1 for trade in self.trades if trade['action'] == 'sell' and trade['price'] > trade['price']),
-            'losing_trades': sum(1 for trade in self.trades if trade['action'] == 'sell' and trade['price'] < trade['price'])
+            'winning_trades': int((self.trades.profits() > 0).sum()),
+            'losing_trades': int((self.trades.profits() < 0).sum())
         }
         
         return report
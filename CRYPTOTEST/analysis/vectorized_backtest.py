@@ -0,0 +1,99 @@
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from data.market_snapshot import SINGLE_SYMBOL
+
+class BarCursor:
+    '''
+    Read-only window over the precomputed columns of a backtest, ending at the current bar.
+    Column access returns NumPy views, so advancing the cursor never copies data.
+    '''
+    __slots__ = ('_data', '_columns', 'position')
+
+    def __init__(self, data: pd.DataFrame, columns: Dict[str, np.ndarray]):
+        self._data = data
+        self._columns = {}
+        for name, values in columns.items():
+            values = np.asarray(values)
+            if len(values) != len(data):
+                raise ValueError(f"Column {name} has {len(values)} rows, expected {len(data)}")
+            view = values.view()
+            view.flags.writeable = False
+            self._columns[name] = view
+        self.position = -1
+
+    def __len__(self):
+        return self.position + 1
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._columns[name][:self.position + 1]
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    @property
+    def symbol(self) -> str:
+        # Same symbol MarketSnapshot.from_source gives the frame in the loop mode
+        return self._data.attrs.get('symbol', SINGLE_SYMBOL)
+
+    @property
+    def timestamp(self):
+        return self._data.index[self.position]
+
+    def value(self, name: str, offset: int = 0) -> float:
+        # offset=0 is the current bar, offset=1 the previous one, ...
+        return self._columns[name][self.position - offset]
+
+    def frame(self) -> pd.DataFrame:
+        # Positional slices share memory with the source frame, unlike .loc[:index] in the loop mode
+        return self._data.iloc[:self.position + 1]
+
+class VectorizedBacktestEngine:
+    '''
+    Single-pass backtest: indicator columns are computed once over the whole history
+    through the strategy's precompute() hook, then each bar is handed to on_bar()
+    as a BarCursor. Strategies without on_bar() get a zero-copy prefix of the frame.
+    '''
+    def __init__(self, backtester):
+        self.backtester = backtester
+
+    def prepare(self, historical_data: pd.DataFrame) -> BarCursor:
+        columns = {
+            column: historical_data[column].to_numpy(dtype=np.float64)
+            for column in historical_data.columns
+            if pd.api.types.is_numeric_dtype(historical_data[column])
+        }
+        precompute = getattr(self.backtester.strategy, 'precompute', None)
+        if precompute is not None:
+            columns.update(precompute(historical_data) or {})
+        return BarCursor(historical_data, columns)
+
+    def run(self, historical_data: pd.DataFrame) -> pd.DataFrame:
+        backtester = self.backtester
+        strategy = backtester.strategy
+        cursor = self.prepare(historical_data)
+        on_bar = getattr(strategy, 'on_bar', None)
+
+        close = cursor._columns['close']
+        portfolio_values = np.empty(len(close), dtype=np.float64)
+        for i in range(len(close)):
+            cursor.position = i
+            price = close[i]
+            if on_bar is not None:
+                signals = on_bar(cursor)
+            else:
+                signals = strategy.generate_signals(cursor.frame())
+            if signals:
+                backtester.process_signals(signals, price)
+            portfolio_values[i] = backtester.get_portfolio_value(price)
+
+        return pd.DataFrame({
+            'timestamp': historical_data.index,
+            'close': close,
+            'portfolio_value': portfolio_values
+        })
@@ -0,0 +1,37 @@
+
+import argparse
+import time
+import numpy as np
+from indicators.bollinger_bands import BollingerBands
+
+def list_of_slices_std(close_prices, period):
+    # The previous implementation: one Python slice per window, stacked and reduced
+    return np.std([close_prices[i:i+period] for i in range(len(close_prices)-period+1)], axis=1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bollinger Bands: O(n) cumulative sums vs per-window slices")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 10000000])
+    parser.add_argument('--period', type=int, default=20)
+    parser.add_argument('--symbols', type=int, default=100, help="rows of the 2-D batched run")
+    parser.add_argument('--max-slices', type=int, default=1000000, help="skip the slice version above this size")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    bands = BollingerBands(period=args.period)
+    for size in args.sizes:
+        prices = 30000 + np.cumsum(rng.normal(0, 50, size))
+        start = time.perf_counter()
+        result = bands.calculate_all(prices)
+        elapsed = time.perf_counter() - start
+        line = f"{size:>10} points | calculate_all {elapsed * 1000:9.2f}ms"
+        if size <= args.max_slices:
+            start = time.perf_counter()
+            reference = list_of_slices_std(prices, args.period)
+            slices = time.perf_counter() - start
+            std = (result['upper'] - result['middle'])[args.period - 1:] / bands.std_dev
+            line += f" | slices {slices * 1000:9.2f}ms | max rel diff {np.max(np.abs(std - reference) / reference):.1e}"
+        batch = prices[:size - size % args.symbols].reshape(args.symbols, -1)
+        start = time.perf_counter()
+        bands.calculate_all(batch)
+        line += f" | {args.symbols} x {batch.shape[1]} batch {(time.perf_counter() - start) * 1000:9.2f}ms"
+        print(line)
@@ -0,0 +1,49 @@
+
+import argparse
+import time
+import numpy as np
+from indicators.indicator_engine import INDICATORS, IndicatorEngine
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-call indicators vs one IndicatorEngine grid")
+    parser.add_argument('--symbols', type=int, default=100)
+    parser.add_argument('--bars', type=int, default=10000)
+    parser.add_argument('--periods', type=int, nargs='+', default=list(range(5, 51)))
+    parser.add_argument('--combinations', type=int, default=500, help="grid points of the simulated parameter search")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    prices = 30000 + np.cumsum(rng.normal(0, 50, (args.symbols, args.bars)), axis=-1)
+    # Each grid point of a two-parameter search asks for two periods, most of them already seen
+    requests = rng.choice(args.periods, size=(args.combinations, 2))
+
+    for name in ('sma', 'ema', 'rsi'):
+        function = INDICATORS[name]
+        start = time.perf_counter()
+        for row in range(args.symbols):
+            for period in args.periods:
+                function(prices[row], period)
+        per_call = time.perf_counter() - start
+
+        engine = IndicatorEngine(prices)
+        start = time.perf_counter()
+        engine.compute(name, args.periods)
+        grid = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for pair in requests:
+            for period in pair:
+                function(prices[0], period)
+        search_per_call = time.perf_counter() - start
+
+        engine = IndicatorEngine(prices[:1])
+        start = time.perf_counter()
+        engine.precompute({name: args.periods})
+        for pair in requests:
+            for period in pair:
+                engine.get(name, period)
+        search_shared = time.perf_counter() - start
+
+        print(f"{name:>4} | {args.symbols} x {len(args.periods)} periods x {args.bars} bars: "
+              f"per call {per_call:7.3f}s, grid {grid:7.3f}s | "
+              f"search of {args.combinations}: per call {search_per_call:7.3f}s, shared {search_shared:7.3f}s")
@@ -0,0 +1,95 @@
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+import numpy as np
+import pandas as pd
+from core.strategy_scheduler import StrategyScheduler
+from data.market_snapshot import MarketSnapshot
+from portfolio_management.portfolio import Portfolio
+from portfolio_management.risk_management import RiskManager
+from utils.logging_config import LOG_FORMAT, get_logging_stats, setup_logging, shutdown_logging
+
+class ChattyStrategy:
+    # Logs a debug line per symbol and an info line per cycle, like the strategies on a busy tick
+    cpu_bound = False
+
+    def __init__(self, name):
+        self.name = name
+        self.logger = logging.getLogger(f'TradingBot.{name}')
+
+    def generate_signals(self, snapshot):
+        for symbol in snapshot.symbols():
+            self.logger.debug("Evaluating %s at %s", symbol, snapshot.get_latest_price(symbol))
+        self.logger.info("Cycle done for %d symbols", len(snapshot.symbols()))
+        return []
+
+def legacy_handlers(directory, copies):
+    # What calling the old setup_logging from `copies` constructors left on the logger
+    logger = logging.getLogger('TradingBot')
+    logger.setLevel(logging.DEBUG)
+    handlers = []
+    for _ in range(copies):
+        console = logging.StreamHandler(open(os.devnull, 'w'))
+        console.setLevel(logging.WARNING)
+        log_file = RotatingFileHandler(os.path.join(directory, 'legacy.log'), maxBytes=5 * 1024 * 1024, backupCount=3)
+        for handler in (console, log_file):
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            logger.addHandler(handler)
+            handlers.append(handler)
+    return handlers
+
+async def run_cycles(cycles, strategies, snapshot):
+    portfolio = Portfolio(10000)
+    scheduler = StrategyScheduler(RiskManager(), portfolio, None)
+    scheduler.logger.disabled = False
+    latencies = np.empty(cycles)
+    for i in range(cycles):
+        start = time.perf_counter()
+        await scheduler.run_cycle(strategies, lambda: snapshot)
+        latencies[i] = time.perf_counter() - start
+    scheduler.close()
+    return latencies
+
+def report(mode, latencies):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e6
+    print(f"{mode:>22}: p50 {p50:8.1f}us | p99 {p99:8.1f}us | max {latencies.max() * 1e6:9.1f}us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strategy cycle latency with logging off, legacy handlers and the queue")
+    parser.add_argument('--cycles', type=int, default=2000)
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--strategies', type=int, default=5)
+    parser.add_argument('--copies', type=int, default=6, help="constructors that called the old setup_logging")
+    args = parser.parse_args()
+
+    frame = pd.DataFrame({'close': np.linspace(100, 110, 50)})
+    snapshot = MarketSnapshot({f"S{i}/USDT": frame for i in range(args.symbols)})
+    strategies = [ChattyStrategy(f"strategy{i}") for i in range(args.strategies)]
+    logger = logging.getLogger('TradingBot')
+
+    with tempfile.TemporaryDirectory() as directory:
+        shutdown_logging()
+        # Strategy loggers inherit the level, unlike .disabled
+        logger.setLevel(logging.CRITICAL)
+        report('off', asyncio.run(run_cycles(args.cycles, strategies, snapshot)))
+
+        handlers = legacy_handlers(directory, args.copies)
+        report(f'legacy x{args.copies} (sync)', asyncio.run(run_cycles(args.cycles, strategies, snapshot)))
+        for handler in handlers:
+            logger.removeHandler(handler)
+            handler.close()
+
+        setup_logging(log_dir=directory, debug_rate=None)
+        report('queued', asyncio.run(run_cycles(args.cycles, strategies, snapshot)))
+        shutdown_logging()
+
+        setup_logging(log_dir=directory)
+        report('queued + rate limit', asyncio.run(run_cycles(args.cycles, strategies, snapshot)))
+        dropped = sum(get_logging_stats()['dropped'].values())
+        shutdown_logging()
+        print(f"rate limit dropped {dropped} debug lines")
@@ -0,0 +1,107 @@
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import time
+import numpy as np
+import pandas as pd
+from core.strategy_scheduler import StrategyScheduler
+from data.market_snapshot import MarketSnapshot
+from portfolio_management.portfolio import Portfolio
+from portfolio_management.risk_management import RiskManager
+from utils.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+# Instrumentation must stay under 1us per recorded value (label lookup included) and 3% of a
+# strategy cycle, measured on the lightest one: strategies that only read the latest prices
+BUDGET_PER_OP = 1e-6
+BUDGET_CYCLE = 0.03
+
+class _Noop:
+    def inc(self, amount=1.0):
+        pass
+
+    def record(self, seconds):
+        pass
+
+    def time(self):
+        return contextlib.nullcontext()
+
+class NullRegistry(MetricsRegistry):
+    # Baseline: same calls, nothing recorded
+    def _get_or_create(self, cls, name, help, labelnames, **kwargs):
+        metric = super()._get_or_create(cls, name, help, labelnames, **kwargs)
+        metric.labels = lambda *values, **labels: _Noop()
+        return metric
+
+class MovingAverageStrategy:
+    # A light per-symbol strategy emitting one signal per cycle
+    cpu_bound = False
+
+    def __init__(self, name):
+        self.name = name
+
+    def generate_signals(self, snapshot):
+        for symbol in snapshot.symbols():
+            snapshot.get_latest_price(symbol)
+        return [{'symbol': snapshot.symbols()[0], 'action': 'buy', 'amount': 1e-6}]
+
+async def fill(signal):
+    return {'symbol': signal.symbol, 'side': signal.action, 'amount': signal.amount, 'price': signal.price}
+
+def build_scheduler(metrics):
+    risk_manager = RiskManager(max_position_size=1e9, stop_loss_pct=0.04, take_profit_pct=0.1, metrics=metrics)
+    return StrategyScheduler(risk_manager, Portfolio(1e9), fill, metrics=metrics)
+
+async def run_paired(cycles, strategies, snapshot):
+    # Cycles alternate between the two schedulers, so that drift of the machine hits both alike
+    schedulers = (build_scheduler(NullRegistry()), build_scheduler(MetricsRegistry()))
+    latencies = np.empty((2, cycles))
+    for i in range(cycles):
+        for side, scheduler in enumerate(schedulers):
+            start = time.perf_counter()
+            await scheduler.run_cycle(strategies, lambda: snapshot)
+            latencies[side, i] = time.perf_counter() - start
+    for scheduler in schedulers:
+        scheduler.close()
+    return latencies
+
+def per_op(label, function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    seconds = (time.perf_counter() - start) / repeat
+    verdict = 'ok' if seconds <= BUDGET_PER_OP else 'OVER BUDGET'
+    print(f"{label:>32}: {seconds * 1e9:7.0f}ns  {verdict}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cost of the metrics instrumentation per value and per strategy cycle")
+    parser.add_argument('--repeat', type=int, default=200000)
+    parser.add_argument('--cycles', type=int, default=5000)
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--strategies', type=int, default=10)
+    args = parser.parse_args()
+    logging.getLogger('TradingBot').setLevel(logging.CRITICAL)
+
+    counter = Counter('c', labelnames=('side', 'status'))
+    child = counter.labels('buy', 'filled')
+    histogram = Histogram('h', labelnames=('endpoint',))
+    latency = histogram.labels('fetch_ticker')
+    gauge = Gauge('g')
+    per_op('counter child inc', child.inc, args.repeat)
+    per_op('counter labels().inc', lambda: counter.labels('buy', 'filled').inc(), args.repeat)
+    per_op('gauge set', lambda: gauge.set(1.0), args.repeat)
+    per_op('histogram child record', lambda: latency.record(0.0042), args.repeat)
+    per_op('histogram labels().record', lambda: histogram.labels('fetch_ticker').record(0.0042), args.repeat)
+
+    frame = pd.DataFrame({'close': np.linspace(100, 110, 50)})
+    snapshot = MarketSnapshot({f"S{i}/USDT": frame for i in range(args.symbols)})
+    strategies = [MovingAverageStrategy(f"strategy{i}") for i in range(args.strategies)]
+    baseline, instrumented = asyncio.run(run_paired(args.cycles, strategies, snapshot))
+    for mode, latencies in (('no-op metrics', baseline), ('metrics', instrumented)):
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1e6
+        print(f"{mode:>32}: cycle p50 {p50:8.1f}us | p99 {p99:8.1f}us")
+    extra = np.median(instrumented - baseline)
+    overhead = extra / np.median(baseline)
+    verdict = 'ok' if overhead <= BUDGET_CYCLE else 'OVER BUDGET'
+    print(f"{'cycle overhead':>32}: {extra * 1e6:5.1f}us = {overhead * 100:5.2f}% (budget {BUDGET_CYCLE * 100:.0f}%)  {verdict}")
@@ -0,0 +1,49 @@
+
+import argparse
+import random
+import time
+from data.order_book import LocalOrderBook
+
+def make_updates(count, levels, seed=0):
+    # Level changes clustered near the top of the book, a quarter of them removals
+    rng = random.Random(seed)
+    updates = []
+    for _ in range(count):
+        distance = int(rng.expovariate(1 / 10)) % levels
+        amount = 0 if rng.random() < 0.25 else round(rng.uniform(0.1, 5), 3)
+        if rng.random() < 0.5:
+            updates.append(([[100.0 - 0.5 - distance * 0.01, amount]], []))
+        else:
+            updates.append(([], [[100.0 + 0.5 + distance * 0.01, amount]]))
+    return updates
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local order book update and query throughput")
+    parser.add_argument('--levels', type=int, default=1000, help="levels per side in the initial snapshot")
+    parser.add_argument('--updates', type=int, default=200000)
+    args = parser.parse_args()
+
+    book = LocalOrderBook('BTC/USDT')
+    book.load_snapshot({
+        'bids': [[100.0 - 0.5 - i * 0.01, 1.0] for i in range(args.levels)],
+        'asks': [[100.0 + 0.5 + i * 0.01, 1.0] for i in range(args.levels)],
+    })
+    updates = make_updates(args.updates, args.levels)
+
+    start = time.perf_counter()
+    for bids, asks in updates:
+        book.apply_delta(bids, asks)
+    elapsed = time.perf_counter() - start
+    print(f"apply_delta: {elapsed / len(updates) * 1e6:6.2f}us per update ({len(updates)} updates, "
+          f"{len(book.bids)}/{len(book.asks)} levels)")
+
+    for name, query in (('best bid/ask', lambda: (book.best_bid(), book.best_ask())),
+                        ('spread_bps', book.spread_bps),
+                        ('mid', book.mid),
+                        ('depth 10 bps', lambda: book.depth(10)),
+                        ('checksum', book.checksum)):
+        runs = 100000
+        start = time.perf_counter()
+        for _ in range(runs):
+            query()
+        print(f"{name:>12}: {(time.perf_counter() - start) / runs * 1e6:6.2f}us")
@@ -0,0 +1,44 @@
+
+import argparse
+import time
+import numpy as np
+from indicators.rsi import RSI_BACKENDS, wilder_rsi
+
+def timed(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RSI backends on 1k, 100k and 10M points")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 10000000])
+    parser.add_argument('--period', type=int, default=14)
+    parser.add_argument('--symbols', type=int, default=100, help="rows of the 2-D batched run")
+    parser.add_argument('--max-python', type=int, default=1000000, help="skip the reference loop above this size")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"backends: {', '.join(RSI_BACKENDS)}")
+    for size in args.sizes:
+        prices = 30000 + np.cumsum(rng.normal(0, 50, size))
+        # Warms up Numba's compilation outside the timings
+        wilder_rsi(prices[:100], args.period)
+        reference = None
+        for backend in RSI_BACKENDS:
+            if backend == 'python' and size > args.max_python:
+                print(f"{size:>10} points | {backend:>8}: skipped")
+                continue
+            repeat = 1 if size >= 1000000 else 5
+            elapsed = timed(lambda: wilder_rsi(prices, args.period, backend), repeat)
+            result = wilder_rsi(prices, args.period, backend)
+            if backend == 'python':
+                reference = result
+            error = f"max diff vs loop {np.nanmax(np.abs(result - reference)):.1e}" if reference is not None else ''
+            print(f"{size:>10} points | {backend:>8}: {elapsed * 1000:10.2f}ms | {error}")
+        batch = prices[:size - size % args.symbols].reshape(args.symbols, -1)
+        if batch.shape[1] > args.period:
+            elapsed = timed(lambda: wilder_rsi(batch, args.period), 1 if size >= 1000000 else 5)
+            print(f"{size:>10} points | {args.symbols} x {batch.shape[1]} batch: {elapsed * 1000:10.2f}ms")
@@ -0,0 +1,42 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from benchmarks.bench_backtester import make_candles
+from data.storage import BinaryStorage, CSVStorage
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def bench(name, storage, data, directory, appended):
+    symbol, timeframe = 'BTC/USDT', '1m'
+    write_time, _ = timed(lambda: storage.save(symbol, timeframe, data))
+    size = directory_size(directory)
+    load_time, loaded = timed(lambda: storage.load(symbol, timeframe))
+    day = data.index[len(data) // 2].normalize()
+    range_time, _ = timed(lambda: storage.load(symbol, timeframe, day, day + (data.index[1] - data.index[0]) * 1439))
+    append_time, _ = timed(lambda: storage.append(symbol, timeframe, appended))
+    print(f"{name:>7}: write {write_time:7.3f}s | full load {load_time:7.3f}s ({len(loaded)} rows) | "
+          f"1-day range {range_time * 1000:8.2f}ms | append {len(appended)} bars {append_time * 1000:8.2f}ms | "
+          f"{size / 1e6:7.1f} MB on disk")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSV vs binary partitioned storage")
+    parser.add_argument('--bars', type=int, default=525600, help="bars to store (default: one year of 1m)")
+    parser.add_argument('--append-bars', type=int, default=60)
+    args = parser.parse_args()
+
+    candles = make_candles(args.bars + args.append_bars)
+    data, appended = candles.iloc[:args.bars], candles.iloc[args.bars:]
+    for name, backend in (('csv', CSVStorage), ('binary', BinaryStorage)):
+        directory = tempfile.mkdtemp(prefix=f'bench_storage_{name}_')
+        try:
+            bench(name, backend(directory), data, directory, appended)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -1,81 +1,236 @@
 
 import asyncio
+import math
+import signal
+import time
 from typing import Dict, List
+from core.event_bus import CANDLE_CLOSED, EventBus
 from core.exchange_handler import ExchangeHandler
 from core.plugin_manager import PluginManager
+from core.records import Signal
+from core.strategy_scheduler import StrategyScheduler
 from data.exchange_data import ExchangeData
 from data.historical_data import HistoricalData
+from data.stream_feed import StreamFeed
 from portfolio_management.portfolio import Portfolio
 from portfolio_management.risk_management import RiskManager
 from utils.logging_config import setup_logging
+from utils.metrics import MetricsServer, get_registry
+from utils.profiler import SamplingProfiler
 
 class TradingEngine:
     def __init__(self, config: Dict):
         self.logger = setup_logging()
         self.config = config
-        self.exchange_handler = ExchangeHandler(config['exchange'])
+        # Every component records into the process registry, served on metrics_port when configured
+        self.metrics = get_registry()
+        self.metrics_server = None
+        self.exchange_handler = ExchangeHandler(config['exchange'], metrics=self.metrics)
         self.plugin_manager = PluginManager()
-        self.exchange_data = ExchangeData(self.exchange_handler)
-        self.historical_data = HistoricalData(self.exchange_handler)
+        # 'event' runs strategies when their candles close; 'polling' every strategy_interval seconds
+        self.mode = config.get('mode', 'event')
+        self.event_bus = EventBus()
+        self.exchange_data = ExchangeData(
+            config['exchange']['name'],
+            config['exchange']['api_key'],
+            config['exchange']['secret_key'],
+            timeframe=config.get('timeframe', '1m'),
+            exchange_handler=self.exchange_handler,
+            event_bus=self.event_bus,
+            snapshot_lookback=config.get('snapshot_lookback')
+        )
+        self.exchange_data.set_trading_pairs(config.get('symbols', []))
+        self.historical_data = HistoricalData(config.get('data_dir', 'historical_data'))
         self.portfolio = Portfolio(config['initial_balance'])
-        self.risk_manager = RiskManager(config['risk_params'])
+        self.risk_manager = RiskManager(**config['risk_params'], order_books=self.exchange_handler.order_books,
+                                        metrics=self.metrics)
         self.strategies = []
+        self.stream_feed = None
+        self.scheduler = StrategyScheduler(self.risk_manager, self.portfolio, self.execute_trade,
+                                           max_workers=config.get('strategy_workers'), metrics=self.metrics)
+        self._pending_strategies: Dict[int, object] = {}
+        self._strategies_ready = asyncio.Event()
         self.running = False
 
+        self.cycles_total = self.metrics.counter('engine_cycles_total', "Strategy cycles run", ('mode',)).labels(self.mode)
+        self.cycle_overruns = self.metrics.counter('engine_cycle_overruns_total', "Polling cycles longer than strategy_interval")
+        self.market_data_seconds = self.metrics.histogram('engine_market_data_seconds', "Market data refresh latency")
+        self.trade_seconds = self.metrics.histogram('engine_execute_trade_seconds', "execute_trade latency", ('side',))
+        self.metrics.gauge('portfolio_equity', "Portfolio value at the last prices").set_function(self.portfolio.get_value)
+        self.metrics.gauge('portfolio_open_positions', "Open positions").set_function(lambda: len(self.portfolio.positions))
+        self.metrics.gauge('portfolio_drawdown', "Drawdown from the equity peak").set_function(self.portfolio.calculate_drawdown)
+        # Off until asked for: SIGUSR2, POST /admin/profile?seconds=N on the metrics port, or an overrun
+        self.profiler = SamplingProfiler(config.get('profile_dir', 'profiles'), config.get('profile_interval', 0.01))
+
     async def start(self):
         self.logger.info("Starting trading engine...")
         self.running = True
+        if self.config.get('metrics_port') is not None and self.metrics_server is None:
+            self.metrics_server = MetricsServer(
+                self.metrics, self.config.get('metrics_host', '127.0.0.1'), self.config['metrics_port'],
+                commands={'profile': lambda params: self.start_profiling(float(params['seconds']) if 'seconds' in params else None)},
+                admin_token=self.config.get('metrics_admin_token')
+            ).start()
+        if hasattr(signal, 'SIGUSR2'):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGUSR2, self.start_profiling)
+            except (NotImplementedError, RuntimeError, ValueError) as e:
+                self.logger.warning(f"SIGUSR2 profiling trigger unavailable: {e}")
         await self.load_strategies()
         await asyncio.gather(
-            self.update_market_data(),
-            self.run_strategies()
+            self.stream_market_data() if self.config.get('streaming') else self.update_market_data(),
+            self.run_strategies() if self.mode == 'polling' else self.run_event_driven()
         )
 
     async def stop(self):
         self.logger.info("Stopping trading engine...")
         self.running = False
+        # Wakes run_event_driven so it can exit
+        self._strategies_ready.set()
+        self.scheduler.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if hasattr(signal, 'SIGUSR2'):
+            try:
+                asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR2)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+        if self.profiler.running:
+            self.profiler.stop()
+
+    def start_profiling(self, seconds: float = None) -> Dict:
+        '''
+        Samples every thread's stack for seconds (profile_seconds, 30 by default, at most
+        profile_max_seconds, 300 by default) and then writes a collapsed-stack file to
+        profile_dir. Does nothing if a profile is running.
+        '''
+        seconds = seconds if seconds is not None else self.config.get('profile_seconds', 30)
+        if not math.isfinite(seconds) or seconds <= 0:
+            raise ValueError(f"seconds must be a positive number, got {seconds}")
+        # The sampler costs ~10% of a core and keeps every distinct stack until it stops
+        seconds = min(seconds, self.config.get('profile_max_seconds', 300))
+        started = self.profiler.start(seconds)
+        return {'started': started, 'seconds': seconds, 'output_dir': self.profiler.output_dir,
+                'last_profile': self.profiler.last_path}
 
     async def load_strategies(self):
         for strategy_config in self.config['strategies']:
             strategy = self.plugin_manager.load_strategy(strategy_config['name'])
             strategy.initialize(strategy_config['params'])
+            if 'cpu_bound' in strategy_config:
+                strategy.cpu_bound = strategy_config['cpu_bound']
             self.strategies.append(strategy)
+            if self.mode != 'polling':
+                self.subscribe_strategy(strategy, strategy_config.get('symbols'), strategy_config.get('timeframe'))
+
+    def subscribe_strategy(self, strategy, symbols: List[str] = None, timeframe: str = None):
+        '''
+        Runs strategy whenever a candle of one of symbols (any symbol when None) closes on timeframe.
+        '''
+        timeframe = timeframe or self.exchange_data.timeframe
+        for symbol in symbols or [None]:
+            self.event_bus.subscribe(CANDLE_CLOSED, lambda event, strategy=strategy: self._schedule_strategy(strategy),
+                                     symbol=symbol, timeframe=timeframe)
+
+    def _schedule_strategy(self, strategy):
+        # Strategies triggered by several events before the next cycle run once
+        self._pending_strategies[id(strategy)] = strategy
+        self._strategies_ready.set()
 
     async def update_market_data(self):
         while self.running:
             try:
-                await self.exchange_data.update()
-                await asyncio.sleep(self.config['update_interval'])
+                latency = await self.exchange_data.update_async()
+                self.market_data_seconds.record(latency)
+                if latency > self.config['update_interval']:
+                    self.logger.warning(f"Market data refresh took {latency:.2f}s, longer than update_interval")
+                await asyncio.sleep(max(self.config['update_interval'] - latency, 0))
             except Exception as e:
                 self.logger.error(f"Error updating market data: {e}")
 
+    async def stream_market_data(self, client=None):
+        '''
+        Pushes klines, trades and book updates through a ccxt.pro WebSocket client instead of
+        polling REST; the ExchangeHandler is only used to resnapshot after gaps and reconnects.
+        '''
+        if client is None:
+            import ccxt.pro
+
+            client = getattr(ccxt.pro, self.config['exchange']['name'])({
+                'apiKey': self.config['exchange']['api_key'],
+                'secret': self.config['exchange']['secret_key'],
+            })
+        self.stream_feed = StreamFeed(client, self.exchange_data, self.exchange_data.trading_pairs, rest_handler=self.exchange_handler,
+                                      order_books=self.exchange_handler.order_books)
+        await self.stream_feed.start()
+        try:
+            while self.running:
+                await asyncio.sleep(1)
+        finally:
+            await self.stream_feed.stop()
+            await client.close()
+
     async def run_strategies(self):
         while self.running:
-            for strategy in self.strategies:
-                try:
-                    signals = strategy.generate_signals(self.exchange_data.get_latest_data())
-                    for signal in signals:
-                        if self.risk_manager.check_risk(signal, self.portfolio):
-                            order = await self.execute_trade(signal)
-                            if order:
-                                self.portfolio.update(order)
-                except Exception as e:
-                    self.logger.error(f"Error in strategy {strategy.name}: {e}")
-            await asyncio.sleep(self.config['strategy_interval'])
-
-    async def execute_trade(self, signal: Dict) -> Dict:
+            start = time.perf_counter()
+            try:
+                await self.scheduler.run_cycle(self.strategies, self.exchange_data.get_latest_data)
+            except Exception as e:
+                self.logger.error(f"Error in strategy cycle: {e}")
+            elapsed = time.perf_counter() - start
+            self.cycles_total.inc()
+            if elapsed > self.config['strategy_interval']:
+                self.cycle_overruns.inc()
+                self.logger.warning(f"Strategy cycle took {elapsed:.2f}s, longer than strategy_interval; "
+                                    f"slowest strategies: {self.describe_slowest_strategies()}")
+                if self.config.get('profile_on_overrun'):
+                    self.start_profiling(self.config['profile_on_overrun'])
+            await asyncio.sleep(max(self.config['strategy_interval'] - elapsed, 0))
+
+    async def run_event_driven(self):
+        while self.running:
+            await self._strategies_ready.wait()
+            self._strategies_ready.clear()
+            if not self.running:
+                break
+            strategies = list(self._pending_strategies.values())
+            self._pending_strategies.clear()
+            try:
+                await self.scheduler.run_cycle(strategies, self.exchange_data.get_latest_data)
+            except Exception as e:
+                self.logger.error(f"Error in strategy cycle: {e}")
+            self.cycles_total.inc()
+
+    async def execute_trade(self, signal: Signal) -> Dict:
+        start = time.perf_counter()
         try:
             order = await self.exchange_handler.place_order(
-                symbol=signal['symbol'],
-                side=signal['type'],
-                amount=self.risk_manager.calculate_position_size(signal, self.portfolio),
-                price=signal['price']
+                symbol=signal.symbol,
+                side=signal.action,
+                amount=signal.amount,
+                price=signal.price
             )
             self.logger.info(f"Executed trade: {order}")
             return order
         except Exception as e:
             self.logger.error(f"Error executing trade: {e}")
             return None
+        finally:
+            self.trade_seconds.labels(signal.action).record(time.perf_counter() - start)
+
+    def get_latency_stats(self) -> Dict:
+        return self.scheduler.get_latency_stats()
+
+    def describe_slowest_strategies(self, count: int = 3) -> str:
+        # Wall (and CPU) time of the strategies that took longest in the last cycle
+        slowest = sorted(self.scheduler.cycle_times.items(), key=lambda item: item[1][0], reverse=True)[:count]
+        return ', '.join(f"{name} {wall:.3f}s" + (f" ({cpu:.3f}s CPU)" if cpu is not None else '')
+                         for name, (wall, cpu) in slowest) or 'none'
+
+    def get_metrics(self) -> Dict:
+        # Snapshot of every counter, gauge and latency histogram, for the dashboard
+        return self.metrics.snapshot()
 
     def get_performance_metrics(self):
         return self.portfolio.get_metrics()
@@ -85,13 +240,20 @@ if __name__ == "__main__":
     config = {
         'exchange': {'name': 'binance', 'api_key': 'your_api_key', 'secret_key': 'your_secret_key'},
         'initial_balance': 10000,
+        'symbols': ['BTC/USDT', 'ETH/USDT'],
         'risk_params': {'max_position_size': 0.02, 'stop_loss_pct': 0.01, 'take_profit_pct': 0.03},
         'strategies': [
             {'name': 'ScalpingStrategy', 'params': {'rsi_period': 14, 'rsi_overbought': 70, 'rsi_oversold': 30}},
             {'name': 'MomentumStrategy', 'params': {'ema_fast': 12, 'ema_slow': 26, 'macd_signal': 9}}
         ],
+        'mode': 'event',  # or 'polling'
+        'streaming': False,  # True streams market data over WebSocket instead of polling REST
         'update_interval': 1,  # seconds
-        'strategy_interval': 5  # seconds
+        'strategy_interval': 5,  # seconds, polling mode only
+        'metrics_port': 9108,  # /metrics (Prometheus) and /metrics.json on localhost; omit to disable
+        'metrics_admin_token': 'change_me',  # bearer token for POST /admin/*; omit to disable admin commands
+        'profile_max_seconds': 300,  # upper bound of any profile request
+        'profile_on_overrun': 10  # seconds of stack sampling after a cycle overruns strategy_interval
     }
 
     engine = TradingEngine(config)
@@ -0,0 +1,97 @@
+
+import asyncio
+import itertools
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from utils.logging_config import setup_logging
+
+CANDLE_CLOSED = 'candle_closed'
+TICKER_UPDATED = 'ticker_updated'
+
+class Event:
+    __slots__ = ('type', 'symbol', 'timeframe', 'timestamp', 'data')
+
+    def __init__(self, type: str, symbol: str, timeframe: str = None, timestamp: int = None, data=None):
+        self.type = type
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.timestamp = timestamp
+        self.data = data
+
+    def __repr__(self):
+        return f"Event({self.type}, {self.symbol}, {self.timeframe}, {self.timestamp})"
+
+class EventBus:
+    '''
+    In-process pub/sub for market data events. Subscribers filter on event
+    type and optionally on symbol and timeframe (None matches any), and are
+    looked up by key, so publishing costs the same whatever the number of
+    unrelated subscriptions. Handlers are called synchronously by publish()
+    and must stay cheap; coroutine handlers are scheduled as tasks, which the
+    bus holds on to until they finish.
+    '''
+    def __init__(self):
+        self.logger = setup_logging()
+        self._subscribers: Dict[Tuple[str, Optional[str], Optional[str]], Dict[int, Callable]] = {}
+        self._keys: Dict[int, Tuple[str, Optional[str], Optional[str]]] = {}
+        self._ids = itertools.count()
+        self._tasks: Set[asyncio.Future] = set()
+        self.published: Dict[str, int] = {}
+        self.delivered: Dict[str, int] = {}
+
+    def subscribe(self, event_type: str, handler: Callable, symbol: str = None, timeframe: str = None) -> int:
+        '''
+        Registers handler(event) and returns a token for unsubscribe().
+        '''
+        key = (event_type, symbol, timeframe)
+        token = next(self._ids)
+        self._subscribers.setdefault(key, {})[token] = handler
+        self._keys[token] = key
+        return token
+
+    def unsubscribe(self, token: int):
+        key = self._keys.pop(token, None)
+        if key is None:
+            return
+        handlers = self._subscribers[key]
+        del handlers[token]
+        if not handlers:
+            del self._subscribers[key]
+
+    def _handlers(self, event: Event) -> List[Callable]:
+        handlers = []
+        keys = dict.fromkeys(((event.type, event.symbol, event.timeframe), (event.type, event.symbol, None),
+                              (event.type, None, event.timeframe), (event.type, None, None)))
+        for key in keys:
+            handlers.extend(self._subscribers.get(key, {}).values())
+        return handlers
+
+    def publish(self, event: Event) -> int:
+        '''
+        Delivers event to every matching subscriber and returns how many there were.
+        '''
+        self.published[event.type] = self.published.get(event.type, 0) + 1
+        handlers = self._handlers(event)
+        for handler in handlers:
+            try:
+                result = handler(event)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.ensure_future(result)
+                    self._tasks.add(task)
+                    task.add_done_callback(lambda task, event=event: self._task_done(task, event))
+            except Exception as e:
+                self.logger.error(f"Error handling {event}: {e}")
+        self.delivered[event.type] = self.delivered.get(event.type, 0) + len(handlers)
+        return len(handlers)
+
+    def _task_done(self, task: asyncio.Future, event: Event):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error(f"Error handling {event}: {task.exception()}")
+
+    def get_stats(self) -> Dict:
+        return {
+            'subscriptions': len(self._keys),
+            'pending': len(self._tasks),
+            'published': dict(self.published),
+            'delivered': dict(self.delivered)
+        }
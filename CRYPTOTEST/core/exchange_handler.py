@@ -1,81 +1,200 @@
 
 import asyncio
+import time
+from contextlib import asynccontextmanager
 import ccxt.async_support as ccxt
-from typing import Dict
+from typing import Dict, Optional
+from core.rate_limiter import TokenBucketRateLimiter
+from data.data_cache import DataCache
+from data.order_book import LocalOrderBook
 from utils.logging_config import setup_logging
+from utils.metrics import MetricsRegistry
 
 class ExchangeHandler:
-    def __init__(self, exchange_config: Dict):
+    def __init__(self, exchange_config: Dict, exchange=None, metrics: MetricsRegistry = None):
         self.logger = setup_logging()
         self.exchange_name = exchange_config['name']
-        self.exchange = getattr(ccxt, self.exchange_name)({
+        # An already-built client (e.g. MockAsyncExchange) can be injected for tests and simulations
+        self.exchange = exchange or getattr(ccxt, self.exchange_name)({
             'apiKey': exchange_config['api_key'],
             'secret': exchange_config['secret_key'],
-            'enableRateLimit': True,
+            # The token bucket below paces every request; ccxt's own FIFO throttle behind it
+            # would make orders wait for queued market-data polls again
+            'enableRateLimit': False,
         })
         self.markets = {}
-        self.rate_limiter = asyncio.Semaphore(10)  # Limit to 10 requests per second
+        # Token bucket shared by every request; see core/rate_limiter.py for default weights and priorities
+        rate_limit = exchange_config.get('rate_limit', {})
+        self.rate_limiter = TokenBucketRateLimiter(
+            rate=rate_limit.get('rate', 10),
+            capacity=rate_limit.get('capacity'),
+            weights=rate_limit.get('weights'),
+            priorities=rate_limit.get('priorities')
+        )
+        # Short-lived memo for market data: identical concurrent requests share one call
+        self.cache = DataCache(max_size=exchange_config.get('cache_size', 1000),
+                               expiration_time=exchange_config.get('cache_ttl', 0.5))
+        self.order_books: Dict[str, LocalOrderBook] = {}
+        # Time spent in the exchange itself, after the rate limiter let the request through
+        self.metrics = metrics or MetricsRegistry()
+        self.request_seconds = self.metrics.histogram('exchange_request_seconds', "Exchange API call latency",
+                                                      ('endpoint', 'status'))
 
     async def initialize(self):
         self.logger.info(f"Initializing {self.exchange_name} exchange handler")
         self.markets = await self.exchange.load_markets()
 
-    async def get_ticker(self, symbol: str) -> Dict:
-        async with self.rate_limiter:
+    @asynccontextmanager
+    async def _request(self, endpoint: str):
+        # Rate limits the block and records its latency under (endpoint, 'ok' or 'error')
+        async with self.rate_limiter.limit(endpoint):
+            status = 'error'
+            start = time.perf_counter()
             try:
-                return await self.exchange.fetch_ticker(symbol)
-            except Exception as e:
-                self.logger.error(f"Error fetching ticker for {symbol}: {e}")
-                return {}
+                yield
+                status = 'ok'
+            finally:
+                self.request_seconds.labels(endpoint, status).record(time.perf_counter() - start)
+
+    async def _limited(self, endpoint: str, method, *args):
+        async with self._request(endpoint):
+            return await method(*args)
+
+    async def get_ticker(self, symbol: str) -> Dict:
+        try:
+            return await self.cache.get_or_load_async(
+                ('ticker', symbol),
+                lambda: self._limited('fetch_ticker', self.exchange.fetch_ticker, symbol)
+            )
+        except Exception as e:
+            self.logger.error(f"Error fetching ticker for {symbol}: {e}")
+            return {}
+
+    async def get_ohlcv(self, symbol: str, timeframe: str = '1m', since: int = None, limit: int = None) -> list:
+        try:
+            return await self.cache.get_or_load_async(
+                ('ohlcv', symbol, timeframe, since, limit),
+                lambda: self._limited('fetch_ohlcv', self.exchange.fetch_ohlcv, symbol, timeframe, since, limit)
+            )
+        except Exception as e:
+            self.logger.error(f"Error fetching {timeframe} OHLCV for {symbol}: {e}")
+            return []
+
+    async def fetch_ohlcv_page(self, symbol: str, timeframe: str, since: int, limit: int) -> list:
+        # Uncached and lets exceptions through, so paginated callers can tell failures from empty pages
+        return await self._limited('fetch_ohlcv', self.exchange.fetch_ohlcv, symbol, timeframe, since, limit)
 
     async def get_order_book(self, symbol: str) -> Dict:
-        async with self.rate_limiter:
-            try:
-                return await self.exchange.fetch_order_book(symbol)
-            except Exception as e:
-                self.logger.error(f"Error fetching order book for {symbol}: {e}")
-                return {}
+        try:
+            snapshot = await self._limited('fetch_order_book', self.exchange.fetch_order_book, symbol)
+        except Exception as e:
+            self.logger.error(f"Error fetching order book for {symbol}: {e}")
+            return {}
+        if symbol not in self.order_books:
+            self.order_books[symbol] = LocalOrderBook(symbol)
+        if not self.order_books[symbol].load_snapshot(snapshot):
+            self.logger.warning(f"Order book snapshot for {symbol} failed validation")
+        return snapshot
+
+    def local_order_book(self, symbol: str) -> Optional[LocalOrderBook]:
+        '''
+        Locally maintained book for symbol (kept current by a StreamFeed, or by the last
+        get_order_book call), or None until it has been synced. Never hits the network.
+        '''
+        book = self.order_books.get(symbol)
+        return book if book is not None and book.synced else None
 
     async def place_order(self, symbol: str, side: str, amount: float, price: float = None) -> Dict:
-        async with self.rate_limiter:
-            try:
+        try:
+            async with self._request('create_order'):
                 if price is None:
                     order = await self.exchange.create_market_order(symbol, side, amount)
                 else:
                     order = await self.exchange.create_limit_order(symbol, side, amount, price)
-                self.logger.info(f"Placed {side} order for {amount} {symbol} at {price}")
-                return order
-            except Exception as e:
-                self.logger.error(f"Error placing {side} order for {symbol}: {e}")
-                return {}
+            self.logger.info(f"Placed {side} order for {amount} {symbol} at {price}")
+            return order
+        except Exception as e:
+            self.logger.error(f"Error placing {side} order for {symbol}: {e}")
+            return {}
 
     async def get_balance(self) -> Dict:
-        async with self.rate_limiter:
-            try:
-                return await self.exchange.fetch_balance()
-            except Exception as e:
-                self.logger.error(f"Error fetching balance: {e}")
-                return {}
+        try:
+            return await self._limited('fetch_balance', self.exchange.fetch_balance)
+        except Exception as e:
+            self.logger.error(f"Error fetching balance: {e}")
+            return {}
 
     async def get_open_orders(self, symbol: str = None) -> list:
-        async with self.rate_limiter:
-            try:
-                return await self.exchange.fetch_open_orders(symbol)
-            except Exception as e:
-                self.logger.error(f"Error fetching open orders for {symbol}: {e}")
-                return []
+        try:
+            return await self._limited('fetch_open_orders', self.exchange.fetch_open_orders, symbol)
+        except Exception as e:
+            self.logger.error(f"Error fetching open orders for {symbol}: {e}")
+            return []
 
     async def cancel_order(self, order_id: str, symbol: str) -> Dict:
-        async with self.rate_limiter:
-            try:
-                return await self.exchange.cancel_order(order_id, symbol)
-            except Exception as e:
-                self.logger.error(f"Error cancelling order {order_id} for {symbol}: {e}")
-                return {}
+        try:
+            return await self._limited('cancel_order', self.exchange.cancel_order, order_id, symbol)
+        except Exception as e:
+            self.logger.error(f"Error cancelling order {order_id} for {symbol}: {e}")
+            return {}
+
+    def get_rate_limit_stats(self) -> Dict:
+        return self.rate_limiter.get_stats()
 
     async def close(self):
         await self.exchange.close()
 
+class MockAsyncExchange:
+    '''
+    Offline stand-in for a ccxt.async_support exchange: deterministic candles
+    and a fixed simulated network latency per request.
+    '''
+    def __init__(self, latency: float = 0.05, start_price: float = 30000):
+        self.id = 'mock'
+        self.latency = latency
+        self.start_price = start_price
+        self.requests = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+
+    async def _request(self):
+        self.requests += 1
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self._in_flight -= 1
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: int = None, limit: int = None) -> list:
+        await self._request()
+        step = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        limit = limit or 100
+        if since is None:
+            since = (int(time.time() * 1000) // step - limit + 1) * step
+        base = self.start_price + sum(map(ord, symbol))
+        return [[since + i * step, base, base + 1, base - 1, base + ((since // step + i) % 10), 1.0] for i in range(limit)]
+
+    async def fetch_ticker(self, symbol: str) -> Dict:
+        await self._request()
+        price = self.start_price + sum(map(ord, symbol))
+        return {'symbol': symbol, 'bid': price - 0.5, 'ask': price + 0.5, 'last': price, 'timestamp': int(time.time() * 1000)}
+
+    async def fetch_order_book(self, symbol: str, limit: int = None) -> Dict:
+        await self._request()
+        price = self.start_price + sum(map(ord, symbol))
+        depth = limit or 20
+        return {
+            'symbol': symbol,
+            'bids': [[price - 0.5 - i, 1.0] for i in range(depth)],
+            'asks': [[price + 0.5 + i, 1.0] for i in range(depth)],
+            'timestamp': int(time.time() * 1000),
+            'nonce': self.requests
+        }
+
+    async def close(self):
+        pass
+
 if __name__ == "__main__":
     # Example usage
     async def main():
@@ -0,0 +1,128 @@
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+PRIORITY_HIGH = 0     # order placement and cancels
+PRIORITY_NORMAL = 1   # account queries
+PRIORITY_LOW = 2      # market data polling
+
+# Request weights modelled on Binance's spot API, relative to a ticker request
+DEFAULT_WEIGHTS = {
+    'fetch_ticker': 1,
+    'fetch_ohlcv': 1,
+    'fetch_order_book': 5,
+    'fetch_balance': 10,
+    'fetch_open_orders': 3,
+    'create_order': 1,
+    'cancel_order': 1,
+}
+
+DEFAULT_PRIORITIES = {
+    'fetch_ticker': PRIORITY_LOW,
+    'fetch_ohlcv': PRIORITY_LOW,
+    'fetch_order_book': PRIORITY_LOW,
+    'fetch_balance': PRIORITY_NORMAL,
+    'fetch_open_orders': PRIORITY_NORMAL,
+    'create_order': PRIORITY_HIGH,
+    'cancel_order': PRIORITY_HIGH,
+}
+
+class TokenBucketRateLimiter:
+    '''
+    Async token bucket: refills `rate` tokens per second up to `capacity` (by default
+    `rate`, or the heaviest endpoint weight when larger, so that every endpoint can be
+    called), and each request consumes its endpoint weight. Waiting requests are served strictly by
+    priority, then FIFO, so orders and cancels jump ahead of queued market-data polls.
+    '''
+    def __init__(self, rate: float = 10, capacity: float = None, weights: Dict[str, float] = None,
+                 priorities: Dict[str, int] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.capacity = capacity or max(rate, max(self.weights.values()))
+        self.priorities = {**DEFAULT_PRIORITIES, **(priorities or {})}
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._timer = None
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._refill()
+        while self._waiters:
+            _, _, weight, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.tokens < weight:
+                break
+            heapq.heappop(self._waiters)
+            self.tokens -= weight
+            future.set_result(None)
+        if self._waiters:
+            deficit = self._waiters[0][2] - self.tokens
+            self._timer = asyncio.get_running_loop().call_later(max(deficit / self.rate, 0), self._dispatch)
+
+    async def acquire(self, endpoint: str = 'default', priority: int = None, weight: float = None) -> float:
+        '''
+        Waits until the request may be sent and returns the time spent queued, in seconds.
+        '''
+        weight = self.weights.get(endpoint, 1) if weight is None else weight
+        priority = self.priorities.get(endpoint, PRIORITY_NORMAL) if priority is None else priority
+        if weight > self.capacity:
+            raise ValueError(f"Weight {weight} for {endpoint} exceeds bucket capacity {self.capacity}")
+        stats = self.stats.setdefault(endpoint, {'requests': 0, 'queued': 0, 'queued_time': 0.0, 'max_queued_time': 0.0})
+        stats['requests'] += 1
+
+        self._refill()
+        if not self._waiters and self.tokens >= weight:
+            self.tokens -= weight
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), weight, future))
+        start = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        finally:
+            if future.cancelled():
+                # Let the next waiter take over the slot this one was holding
+                self._dispatch()
+        queued_time = time.monotonic() - start
+        stats['queued'] += 1
+        stats['queued_time'] += queued_time
+        stats['max_queued_time'] = max(stats['max_queued_time'], queued_time)
+        return queued_time
+
+    @asynccontextmanager
+    async def limit(self, endpoint: str = 'default', priority: int = None, weight: float = None):
+        await self.acquire(endpoint, priority, weight)
+        yield
+
+    def get_stats(self) -> Dict:
+        self._refill()
+        endpoints = {}
+        for endpoint, stats in self.stats.items():
+            endpoints[endpoint] = dict(stats, avg_queued_time=stats['queued_time'] / stats['queued'] if stats['queued'] else 0.0)
+        return {
+            'tokens': self.tokens,
+            'capacity': self.capacity,
+            'rate': self.rate,
+            'waiting': sum(1 for waiter in self._waiters if not waiter[3].done()),
+            'endpoints': endpoints
+        }
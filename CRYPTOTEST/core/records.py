@@ -0,0 +1,245 @@
+
+import time
+from typing import Dict, Iterator, List
+import numpy as np
+import pandas as pd
+
+class _Record:
+    '''
+    Base of the __slots__ records below. They also answer the dict protocol
+    (record['symbol'], .get(), `in`, keys(), dict(record)) for code written
+    against the plain dicts they replace; a field left to None reads as absent.
+    '''
+    __slots__ = ()
+    # Keys readable through the dict protocol: the slots plus alias properties
+    _keys: tuple = ()
+
+    def __getitem__(self, key: str):
+        value = getattr(self, key, None) if key in self._keys else self._extra(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value):
+        if key not in self._keys:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def _extra(self, key: str):
+        return None
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def keys(self) -> List[str]:
+        return [key for key in self._keys if getattr(self, key) is not None]
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self.keys()}
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if getattr(self, name) is not None)
+        return f"{type(self).__name__}({fields})"
+
+class Signal(_Record):
+    '''
+    Trading intent emitted by a strategy. action is 'buy', 'sell' or 'hold';
+    `type` (BUY/SELL, as the risk checks used to expect) and `side` are views of it.
+    Keys that are not fields live in metadata and stay readable as signal[key].
+    '''
+    __slots__ = ('symbol', 'action', 'price', 'amount', 'strategy', 'timestamp', 'metadata')
+    _keys = __slots__ + ('type', 'side')
+
+    def __init__(self, symbol: str, action: str, price: float = None, amount: float = None, strategy: str = None,
+                 timestamp=None, metadata: Dict = None):
+        self.symbol = symbol
+        self.action = action.lower()
+        self.price = price
+        self.amount = amount
+        self.strategy = strategy
+        self.timestamp = timestamp
+        self.metadata = metadata
+
+    @property
+    def type(self) -> str:
+        return self.action.upper()
+
+    @type.setter
+    def type(self, value: str):
+        self.action = value.lower()
+
+    side = property(lambda self: self.action, type.fset)
+
+    def _extra(self, key: str):
+        return self.metadata.get(key) if self.metadata else None
+
+    def __setitem__(self, key: str, value):
+        if key in self._keys:
+            setattr(self, key, value)
+        else:
+            if self.metadata is None:
+                self.metadata = {}
+            self.metadata[key] = value
+
+    @classmethod
+    def coerce(cls, signal) -> 'Signal':
+        '''
+        The signal itself, or a Signal built from a dict using any of 'action', 'side' or 'type'.
+        '''
+        if isinstance(signal, cls):
+            return signal
+        action = signal.get('action') or signal.get('side') or signal.get('type')
+        metadata = dict(signal.get('metadata') or {})
+        metadata.update((key, value) for key, value in signal.items() if key not in cls._keys)
+        return cls(signal['symbol'], action, signal.get('price'), signal.get('amount'), signal.get('strategy'),
+                   signal.get('timestamp'), metadata or None)
+
+class Order(_Record):
+    # Order sent to (or acknowledged by) an exchange; order['type'] is the order type, as in ccxt
+    __slots__ = ('symbol', 'side', 'amount', 'price', 'order_type', 'id', 'status', 'timestamp')
+    _keys = __slots__ + ('type', 'action')
+
+    def __init__(self, symbol: str, side: str, amount: float, price: float = None, order_type: str = 'market',
+                 id: str = None, status: str = None, timestamp=None):
+        self.symbol = symbol
+        self.side = side
+        self.amount = amount
+        self.price = price
+        self.order_type = order_type
+        self.id = id
+        self.status = status
+        self.timestamp = timestamp
+
+    type = property(lambda self: self.order_type, lambda self, value: setattr(self, 'order_type', value))
+    action = property(lambda self: self.side, lambda self, value: setattr(self, 'side', value))
+
+    @classmethod
+    def coerce(cls, order) -> 'Order':
+        if isinstance(order, cls):
+            return order
+        return cls(order['symbol'], order.get('side') or order.get('action'), order['amount'], order.get('price'),
+                   order.get('type') or 'market', order.get('id'), order.get('status'), order.get('timestamp'))
+
+class Fill(_Record):
+    # Executed trade; profit is the realized PnL of the sells that close a position
+    __slots__ = ('symbol', 'side', 'amount', 'price', 'fee', 'timestamp', 'order_id', 'profit')
+    _keys = __slots__ + ('action',)
+
+    def __init__(self, symbol: str, side: str, amount: float, price: float, fee: float = 0.0, timestamp: int = None,
+                 order_id: str = None, profit: float = None):
+        self.symbol = symbol
+        self.side = side
+        self.amount = amount
+        self.price = price
+        self.fee = fee
+        self.timestamp = timestamp
+        self.order_id = order_id
+        self.profit = profit
+
+    action = property(lambda self: self.side, lambda self, value: setattr(self, 'side', value))
+
+class ColumnStore:
+    '''
+    Append-only table kept as one growable NumPy array per column (COLUMNS lists
+    (name, dtype) pairs); capacity doubles when full, so appends are amortized O(1).
+    '''
+    COLUMNS: tuple = ()
+
+    def __init__(self, capacity: int = 1024):
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.COLUMNS}
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _next_row(self) -> int:
+        if self._length == len(next(iter(self._columns.values()))):
+            for name, values in self._columns.items():
+                grown = np.empty(max(2 * len(values), 1), dtype=values.dtype)
+                grown[:self._length] = values[:self._length]
+                self._columns[name] = grown
+        self._length += 1
+        return self._length - 1
+
+    def column(self, name: str) -> np.ndarray:
+        # Read-only view of the filled part of one column
+        view = self._columns[name][:self._length].view()
+        view.flags.writeable = False
+        return view
+
+class TradeLog(ColumnStore):
+    '''
+    Columnar history of fills instead of a list of per-trade dicts. Symbols are
+    stored as codes into `symbols`, sides as +1 (buy) / -1 (sell), timestamps in
+    epoch ms and a missing profit as NaN. Indexing and iteration rebuild Fill
+    records on demand; analytics should read the columns.
+    '''
+    SIDES = {'buy': 1, 'sell': -1}
+    COLUMNS = (('timestamp', np.int64), ('symbol', np.int32), ('side', np.int8), ('amount', np.float64),
+               ('price', np.float64), ('fee', np.float64), ('profit', np.float64))
+
+    def __init__(self, capacity: int = 1024):
+        super().__init__(capacity)
+        self.symbols: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def record(self, symbol: str, side: str, amount: float, price: float, timestamp: int = None, fee: float = 0.0,
+               profit: float = None) -> int:
+        code = self._codes.get(symbol)
+        if code is None:
+            code = self._codes[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        row = self._next_row()
+        columns = self._columns
+        columns['timestamp'][row] = timestamp if timestamp is not None else time.time_ns() // 1_000_000
+        columns['symbol'][row] = code
+        columns['side'][row] = self.SIDES[side]
+        columns['amount'][row] = amount
+        columns['price'][row] = price
+        columns['fee'][row] = fee
+        columns['profit'][row] = np.nan if profit is None else profit
+        return row
+
+    def append(self, fill: Fill) -> int:
+        return self.record(fill.symbol, fill.side, fill.amount, fill.price, fill.timestamp, fill.fee, fill.profit)
+
+    def closed(self) -> np.ndarray:
+        # Row numbers of the fills that realized a profit or loss
+        return np.flatnonzero(~np.isnan(self.column('profit')))
+
+    def profits(self) -> np.ndarray:
+        profit = self.column('profit')
+        return profit[~np.isnan(profit)]
+
+    def __getitem__(self, row: int) -> Fill:
+        if row < 0:
+            row += self._length
+        if not 0 <= row < self._length:
+            raise IndexError(row)
+        columns = self._columns
+        profit = columns['profit'][row]
+        return Fill(self.symbols[columns['symbol'][row]], 'buy' if columns['side'][row] > 0 else 'sell',
+                    float(columns['amount'][row]), float(columns['price'][row]), float(columns['fee'][row]),
+                    int(columns['timestamp'][row]), profit=None if np.isnan(profit) else float(profit))
+
+    def __iter__(self) -> Iterator[Fill]:
+        for row in range(self._length):
+            yield self[row]
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame({name: self.column(name) for name, _ in self.COLUMNS})
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'], unit='ms')
+        frame['symbol'] = np.asarray(self.symbols, dtype=object)[frame['symbol']] if self.symbols else []
+        frame['side'] = np.where(frame['side'] > 0, 'buy', 'sell')
+        return frame
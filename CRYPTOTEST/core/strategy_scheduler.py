@@ -0,0 +1,211 @@
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from core.records import Signal
+from utils.latency import LatencyHistogram
+from utils.logging_config import setup_logging
+from utils.metrics import CounterValue, MetricsRegistry
+
+class StrategyScheduler:
+    '''
+    Runs one strategy cycle: takes a single market snapshot, evaluates every
+    strategy against it, checks the resulting signals as one batch and sends
+    the approved orders concurrently.
+
+    Strategies with `cpu_bound = True` run on a thread pool (NumPy/pandas
+    release the GIL for most of their work) while the light ones run inline
+    on the event loop; coroutine generate_signals are awaited. Latencies of
+    each stage, strategy and order are histograms of the metrics registry,
+    along with signal, error and order counters. Each strategy call is also
+    charged its wall and CPU time (thread CPU time, so pool workers running
+    in parallel are told apart; not measured for coroutines, which share the
+    loop thread), in total and for the last cycle.
+    '''
+    STAGES = ('snapshot', 'signals', 'risk', 'orders', 'cycle')
+
+    def __init__(self, risk_manager, portfolio, execute_order: Callable[[Dict], Awaitable[Dict]], max_workers: int = None,
+                 metrics: MetricsRegistry = None):
+        self.logger = setup_logging()
+        self.risk_manager = risk_manager
+        self.portfolio = portfolio
+        self.execute_order = execute_order
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='strategy')
+        self.metrics = metrics or MetricsRegistry()
+        stage_seconds = self.metrics.histogram('scheduler_stage_seconds', "Strategy cycle latency by stage", ('stage',))
+        self.latency = {stage: stage_seconds.labels(stage) for stage in self.STAGES}
+        self.strategy_latency: Dict[str, LatencyHistogram] = {}
+        self.strategy_seconds = self.metrics.histogram('strategy_signals_seconds', "generate_signals latency", ('strategy',))
+        self.strategy_errors = self.metrics.counter('strategy_errors_total', "generate_signals calls that raised", ('strategy',))
+        self.strategy_cpu = self.metrics.counter('strategy_cpu_seconds_total', "CPU time spent in generate_signals",
+                                                 ('strategy',))
+        self.strategy_cpu_time: Dict[str, CounterValue] = {}
+        self.strategy_signals: Dict[str, CounterValue] = {}
+        # name -> (wall, cpu or None) of the strategies run by the last cycle
+        self.cycle_times: Dict[str, Tuple[float, Optional[float]]] = {}
+        self.signals_total = self.metrics.counter('signals_total', "Signals emitted", ('strategy',))
+        # status: filled, rejected (empty result), error (raised) or unapplied (the portfolio refused it)
+        self.orders_total = self.metrics.counter('orders_total', "Orders sent by the scheduler", ('side', 'status'))
+
+    @staticmethod
+    def strategy_name(strategy) -> str:
+        return getattr(strategy, 'name', strategy.__class__.__name__)
+
+    @staticmethod
+    def is_tradeable(signal: Signal) -> bool:
+        # 'hold' signals and zero-sized ones would only cost an exchange round trip to be rejected
+        return signal.action in ('buy', 'sell') and signal.amount is not None and signal.amount > 0
+
+    @staticmethod
+    def normalize_signal(signal, snapshot, strategy_name: str) -> Signal:
+        # Signal records, or dicts with 'action' (buy/sell), 'side' or 'type' (BUY/SELL)
+        signal = Signal.coerce(signal)
+        signal.strategy = strategy_name
+        if signal.price is None:
+            signal.price = snapshot.get_latest_price(signal.symbol)
+        return signal
+
+    def _account(self, strategy, wall: float, cpu: float = None):
+        name = self.strategy_name(strategy)
+        if name not in self.strategy_latency:
+            self.strategy_latency[name] = self.strategy_seconds.labels(name)
+            self.strategy_cpu_time[name] = self.strategy_cpu.labels(name)
+            self.strategy_signals[name] = self.signals_total.labels(name)
+        self.strategy_latency[name].record(wall)
+        if cpu is not None:
+            self.strategy_cpu_time[name].inc(cpu)
+        self.cycle_times[name] = (wall, cpu)
+
+    @staticmethod
+    def _timed_call(strategy, snapshot):
+        # (signals, wall, cpu, error); pool threads return their timing for the loop to record
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            signals, error = strategy.generate_signals(snapshot), None
+        except Exception as e:
+            signals, error = None, e
+        return signals, time.perf_counter() - start, time.thread_time() - cpu_start, error
+
+    async def _evaluate_async(self, strategy, snapshot):
+        start = time.perf_counter()
+        try:
+            return await strategy.generate_signals(snapshot)
+        finally:
+            self._account(strategy, time.perf_counter() - start)
+
+    async def collect_signals(self, strategies: List, snapshot) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        self.cycle_times = {}
+        pending = []
+        inline = []
+        for strategy in strategies:
+            if asyncio.iscoroutinefunction(strategy.generate_signals):
+                pending.append((strategy, False, asyncio.ensure_future(self._evaluate_async(strategy, snapshot))))
+            elif getattr(strategy, 'cpu_bound', False):
+                pending.append((strategy, True, loop.run_in_executor(self.executor, self._timed_call, strategy, snapshot)))
+            else:
+                inline.append(strategy)
+
+        outputs = []
+        # Light strategies run while the pool works on the heavy ones
+        timed = [(strategy, self._timed_call(strategy, snapshot)) for strategy in inline]
+        results = await asyncio.gather(*(future for _, _, future in pending), return_exceptions=True)
+        for (strategy, pooled, _), result in zip(pending, results):
+            if isinstance(result, Exception):
+                self.strategy_errors.labels(self.strategy_name(strategy)).inc()
+                self.logger.error(f"Error in strategy {self.strategy_name(strategy)}: {result}")
+            elif pooled:
+                timed.append((strategy, result))
+            else:
+                outputs.append((strategy, result))
+        for strategy, (strategy_signals, wall, cpu, error) in timed:
+            self._account(strategy, wall, cpu)
+            if error is not None:
+                self.strategy_errors.labels(self.strategy_name(strategy)).inc()
+                self.logger.error(f"Error in strategy {self.strategy_name(strategy)}: {error}")
+            else:
+                outputs.append((strategy, strategy_signals))
+
+        signals = []
+        for strategy, strategy_signals in outputs:
+            name = self.strategy_name(strategy)
+            emitted = len(signals)
+            for signal in strategy_signals or []:
+                try:
+                    signal = self.normalize_signal(signal, snapshot, name)
+                except (AttributeError, KeyError, TypeError) as e:
+                    self.logger.error(f"Invalid signal from {name}: {signal} ({e})")
+                    continue
+                if self.is_tradeable(signal):
+                    signals.append(signal)
+            if len(signals) > emitted:
+                self.strategy_signals[name].inc(len(signals) - emitted)
+        return signals
+
+    async def place_orders(self, signals: List[Signal]) -> List[Dict]:
+        results = await asyncio.gather(*(self.execute_order(signal) for signal in signals), return_exceptions=True)
+        orders = []
+        # Counted once per (side, status) and cycle rather than once per order
+        outcomes: Dict[tuple, int] = {}
+        for signal, order in zip(signals, results):
+            status = 'filled'
+            if isinstance(order, Exception):
+                status = 'error'
+                self.logger.error(f"Error executing {signal.action} {signal.symbol} from {signal.strategy}: {order}")
+            elif order:
+                try:
+                    self.portfolio.update(order)
+                except (KeyError, ValueError) as e:
+                    status = 'unapplied'
+                    self.logger.error(f"Could not apply order {order} to the portfolio: {e}")
+                orders.append(order)
+            else:
+                status = 'rejected'
+            outcomes[signal.action, status] = outcomes.get((signal.action, status), 0) + 1
+        for (side, status), count in outcomes.items():
+            self.orders_total.labels(side, status).inc(count)
+        return orders
+
+    async def run_cycle(self, strategies: List, snapshot_source: Callable) -> List[Dict]:
+        '''
+        Runs one cycle and returns the orders placed. snapshot_source() returns the
+        market snapshot shared by every strategy of the cycle.
+        '''
+        latency = self.latency
+        cycle_start = time.perf_counter()
+        snapshot = snapshot_source()
+        signals_start = time.perf_counter()
+        signals = await self.collect_signals(strategies, snapshot)
+        risk_start = time.perf_counter()
+        approved = [signal for signal, ok in zip(signals, self.risk_manager.check_risks(signals, self.portfolio)) if ok]
+        orders_start = time.perf_counter()
+        orders = await self.place_orders(approved)
+        end = time.perf_counter()
+        latency['snapshot'].record(signals_start - cycle_start)
+        latency['signals'].record(risk_start - signals_start)
+        latency['risk'].record(orders_start - risk_start)
+        latency['orders'].record(end - orders_start)
+        latency['cycle'].record(end - cycle_start)
+        return orders
+
+    def get_latency_stats(self) -> Dict:
+        return {
+            'stages': {stage: histogram.get_stats() for stage, histogram in self.latency.items()},
+            'strategies': {name: histogram.get_stats() for name, histogram in self.strategy_latency.items()}
+        }
+
+    def get_strategy_times(self) -> Dict:
+        '''
+        {name: {'calls', 'wall', 'cpu', 'last_wall', 'last_cpu'}} in seconds: totals
+        since start and the strategy's share of the last cycle (None if it did not run).
+        '''
+        times = {}
+        for name, histogram in self.strategy_latency.items():
+            last_wall, last_cpu = self.cycle_times.get(name, (None, None))
+            times[name] = {'calls': histogram.count, 'wall': histogram.total, 'cpu': self.strategy_cpu_time[name].value,
+                           'last_wall': last_wall, 'last_cpu': last_cpu}
+        return times
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
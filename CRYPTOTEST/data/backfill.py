@@ -0,0 +1,138 @@
+
+import asyncio
+import json
+import os
+import time
+from typing import Callable, Dict, List, Set, Tuple
+import numpy as np
+import pandas as pd
+from data.candle_store import OHLCV_COLUMNS
+from data.historical_data import HistoricalData
+from data.timeframes import shift_timestamp
+from utils.logging_config import setup_logging
+
+class BackfillService:
+    '''
+    Fills the gaps of historical series from fetch_ohlcv. The missing ranges
+    are split into fixed windows up front, fetched concurrently through the
+    ExchangeHandler (whose rate limiter sets the request budget) and written
+    to the HistoricalData store page by page, in timestamp order per series.
+
+    Completed windows are recorded in an append-only checkpoint file, so an
+    interrupted run resumes where it stopped, including windows for which
+    the exchange had no data (once they lie in the past). Use the 'binary' storage backend: the CSV one
+    rewrites the whole file on every page.
+    '''
+    def __init__(self, exchange_handler, historical_data: HistoricalData, page_limit: int = 1000,
+                 max_concurrency: int = 8, max_retries: int = 3, retry_delay: float = 1.0,
+                 checkpoint_path: str = None):
+        self.logger = setup_logging()
+        self.exchange_handler = exchange_handler
+        self.historical_data = historical_data
+        self.page_limit = page_limit
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.checkpoint_path = checkpoint_path
+
+    def _load_checkpoint(self) -> Set[Tuple[str, str, int]]:
+        done = set()
+        if self.checkpoint_path is None or not os.path.exists(self.checkpoint_path):
+            return done
+        with open(self.checkpoint_path) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Last line cut short by an interruption
+                    continue
+                done.add((entry['symbol'], entry['timeframe'], entry['since']))
+        return done
+
+    def _record_checkpoint(self, symbol: str, timeframe: str, since: int):
+        if self.checkpoint_path is None:
+            return
+        with open(self.checkpoint_path, 'a') as file:
+            file.write(json.dumps({'symbol': symbol, 'timeframe': timeframe, 'since': since}) + '\n')
+
+    def plan(self, symbols: List[str], timeframe: str, start_date, end_date) -> Dict[str, List[Tuple[int, int]]]:
+        '''
+        (since_ms, limit) windows still to fetch per symbol, skipping stored candles and checkpointed windows.
+        '''
+        done = self._load_checkpoint()
+        windows = {}
+        for symbol in symbols:
+            planned = self.historical_data.plan_backfill(symbol, timeframe, start_date, end_date, self.page_limit)
+            windows[symbol] = [window for window in planned if (symbol, timeframe, window[0]) not in done]
+        return windows
+
+    async def _fetch_window(self, symbol: str, timeframe: str, since: int, limit: int,
+                            semaphore: asyncio.Semaphore) -> Tuple[pd.DataFrame, bool]:
+        '''
+        Candles of the window, and whether it had already ended when it was fetched:
+        an empty window that had not may still receive candles.
+        '''
+        until = shift_timestamp(since, limit, timeframe)
+        rows = []
+        cursor = since
+        async with semaphore:
+            fetched_at = int(time.time() * 1000)
+            # Exchanges may cap a page below `limit`; keep paging until the window is covered
+            while cursor < until:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        page = await self.exchange_handler.fetch_ohlcv_page(symbol, timeframe, cursor, limit)
+                        break
+                    except Exception as e:
+                        if attempt == self.max_retries:
+                            raise
+                        self.logger.warning(f"Retrying {symbol} {timeframe} page at {cursor}: {e}")
+                        await asyncio.sleep(self.retry_delay * 2 ** attempt)
+                if not page:
+                    break
+                rows.extend(page)
+                cursor = page[-1][0] + 1
+        data = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+        timestamps = data[:, 0].astype(np.int64)
+        data = data[(timestamps >= since) & (timestamps < until)]
+        df = pd.DataFrame(data[:, 1:], columns=OHLCV_COLUMNS, index=pd.to_datetime(data[:, 0].astype(np.int64), unit='ms'))
+        df.index.name = 'timestamp'
+        return df, until <= fetched_at
+
+    async def run(self, symbols: List[str], timeframe: str, start_date, end_date,
+                  progress_callback: Callable = None) -> Dict[str, int]:
+        '''
+        Backfills every symbol between start_date and end_date and returns the
+        number of candles written per symbol. progress_callback(symbol, completed, total)
+        is called after each window is stored.
+        '''
+        windows = self.plan(symbols, timeframe, start_date, end_date)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        written = {symbol: 0 for symbol in symbols}
+
+        async def backfill_symbol(symbol: str):
+            planned = windows[symbol]
+            tasks = [asyncio.ensure_future(self._fetch_window(symbol, timeframe, since, limit, semaphore))
+                     for since, limit in planned]
+            try:
+                # Awaiting in plan order writes each series sequentially while later windows are in flight
+                for completed, ((since, _), task) in enumerate(zip(planned, tasks), 1):
+                    try:
+                        df, ended = await task
+                    except Exception as e:
+                        self.logger.error(f"Backfill of {symbol} {timeframe} window at {since} failed: {e}")
+                        continue
+                    if not df.empty:
+                        self.historical_data.update_data(symbol, timeframe, df)
+                        written[symbol] += len(df)
+                    if ended or not df.empty:
+                        self._record_checkpoint(symbol, timeframe, since)
+                    if progress_callback is not None:
+                        progress_callback(symbol, completed, len(planned))
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        await asyncio.gather(*(backfill_symbol(symbol) for symbol in symbols))
+        self.logger.info(f"Backfilled {sum(written.values())} {timeframe} candles for {len(symbols)} symbols")
+        return written
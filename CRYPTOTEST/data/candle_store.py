@@ -0,0 +1,205 @@
+
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+class CandleBuffer:
+    '''
+    Fixed-capacity OHLCV ring buffer backed by preallocated NumPy arrays.
+
+    Every row is written twice, at slot i and i + capacity, so the latest
+    candles are always contiguous in memory and tail() can return views
+    instead of copies. Appends are O(1); a candle with the same timestamp
+    as the open bar updates it in place.
+    '''
+    def __init__(self, capacity: int = 10000):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((2 * capacity, len(OHLCV_COLUMNS)), dtype=np.float64)
+        self._head = 0
+        self._size = 0
+        # Bumped on every write so readers can cache derived data (e.g. materialized frames)
+        self.version = 0
+
+    def __len__(self):
+        return self._size
+
+    def _write(self, slot: int, timestamp: int, row):
+        self._timestamps[slot] = self._timestamps[slot + self.capacity] = timestamp
+        self._values[slot] = self._values[slot + self.capacity] = row
+
+    def append(self, timestamp: int, open_: float, high: float, low: float, close: float, volume: float) -> bool:
+        '''
+        Returns True when a new bar was opened, False when an existing bar was updated or the candle was dropped.
+        '''
+        timestamp = int(timestamp)
+        row = (open_, high, low, close, volume)
+        self.version += 1
+        if self._size:
+            last_slot = (self._head - 1) % self.capacity
+            last_timestamp = self._timestamps[last_slot]
+            if timestamp == last_timestamp:
+                self._write(last_slot, timestamp, row)
+                return False
+            if timestamp < last_timestamp:
+                # Late update for an older bar still in the window; anything older is dropped
+                timestamps, _ = self.tail()
+                position = np.searchsorted(timestamps, timestamp)
+                if position < len(timestamps) and timestamps[position] == timestamp:
+                    self._write((self._head - self._size + position) % self.capacity, timestamp, row)
+                return False
+        self._write(self._head, timestamp, row)
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return True
+
+    def extend(self, ohlcv: Iterable) -> int:
+        # ccxt-style rows: [timestamp, open, high, low, close, volume]
+        return sum(self.append(*candle[:6]) for candle in ohlcv)
+
+    def load(self, timestamps: np.ndarray, values: np.ndarray):
+        # Bulk replace with sorted, unique candles; only the last `capacity` rows are kept
+        timestamps = np.asarray(timestamps, dtype=np.int64)[-self.capacity:]
+        values = np.asarray(values, dtype=np.float64)[-self.capacity:]
+        size = len(timestamps)
+        self._timestamps[:size] = self._timestamps[self.capacity:self.capacity + size] = timestamps
+        self._values[:size] = self._values[self.capacity:self.capacity + size] = values
+        self._size = size
+        self._head = size % self.capacity
+        self.version += 1
+
+    def truncate(self, after_timestamp: int):
+        # Drop every candle newer than after_timestamp
+        timestamps, _ = self.tail()
+        keep = int(np.searchsorted(timestamps, after_timestamp, side='right'))
+        self._head = (self._head - (self._size - keep)) % self.capacity
+        self._size = keep
+        self.version += 1
+
+    def tail(self, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Read-only views of the last n timestamps and OHLCV rows (all rows when n is None).
+        '''
+        n = self._size if n is None else min(n, self._size)
+        end = self._head + self.capacity
+        timestamps = self._timestamps[end - n:end]
+        values = self._values[end - n:end]
+        timestamps.flags.writeable = False
+        values.flags.writeable = False
+        return timestamps, values
+
+    def column(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        return self.tail(n)[1][:, OHLCV_COLUMNS.index(name)]
+
+    def last(self, name: str = 'close') -> Optional[float]:
+        if not self._size:
+            return None
+        return self._values[(self._head - 1) % self.capacity, OHLCV_COLUMNS.index(name)]
+
+    def last_timestamp(self) -> Optional[int]:
+        if not self._size:
+            return None
+        return int(self._timestamps[(self._head - 1) % self.capacity])
+
+    def to_frame(self, n: Optional[int] = None) -> pd.DataFrame:
+        timestamps, values = self.tail(n)
+        df = pd.DataFrame(values.copy(), columns=OHLCV_COLUMNS,
+                          index=pd.to_datetime(timestamps, unit='ms'))
+        df.index.name = 'timestamp'
+        return df
+
+class CandleStore:
+    '''
+    One CandleBuffer per (symbol, timeframe).
+    '''
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        self.buffers: Dict[Tuple[str, str], CandleBuffer] = {}
+
+    def get(self, symbol: str, timeframe: str) -> Optional[CandleBuffer]:
+        return self.buffers.get((symbol, timeframe))
+
+    def buffer(self, symbol: str, timeframe: str, capacity: int = None) -> CandleBuffer:
+        key = (symbol, timeframe)
+        capacity = max(capacity or 0, self.capacity)
+        if key not in self.buffers or self.buffers[key].capacity < capacity:
+            self.buffers[key] = CandleBuffer(capacity)
+        return self.buffers[key]
+
+    def append_ohlcv(self, symbol: str, timeframe: str, ohlcv: Iterable) -> int:
+        return self.buffer(symbol, timeframe).extend(ohlcv)
+
+    def load_frame(self, symbol: str, timeframe: str, df: pd.DataFrame) -> CandleBuffer:
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        df = df[~df.index.duplicated(keep='last')]
+        if isinstance(df.index, pd.DatetimeIndex):
+            timestamps = df.index.as_unit('ms').asi8
+        else:
+            timestamps = np.asarray(df.index, dtype=np.int64)
+        values = df.reindex(columns=OHLCV_COLUMNS).to_numpy(dtype=np.float64)
+        buffer = self.buffer(symbol, timeframe, capacity=len(df))
+        buffer.load(timestamps, values)
+        return buffer
+
+    def remove(self, symbol: str, timeframe: str):
+        self.buffers.pop((symbol, timeframe), None)
+
+    def symbols(self, timeframe: str) -> list:
+        return [symbol for symbol, tf in self.buffers if tf == timeframe]
+
+class CandleFrames(MutableMapping):
+    '''
+    dict-like view of a CandleStore timeframe as {symbol: DataFrame} for callers that
+    read exchange_data.data. Frames are materialized on demand and cached until the
+    underlying buffer changes; a frame assigned directly is kept as-is until then.
+    '''
+    def __init__(self, store: CandleStore, timeframe: str):
+        self.store = store
+        self.timeframe = timeframe
+        self._frames: Dict[str, Tuple[int, pd.DataFrame]] = {}
+
+    def current_frame(self, symbol: str) -> Optional[pd.DataFrame]:
+        buffer = self.store.get(symbol, self.timeframe)
+        cached = self._frames.get(symbol)
+        if buffer is not None and cached is not None and cached[0] == buffer.version:
+            return cached[1]
+        return None
+
+    def latest(self, symbol: str, column: str = 'close') -> Optional[float]:
+        frame = self.current_frame(symbol)
+        if frame is not None:
+            return frame[column].iloc[-1] if not frame.empty else None
+        buffer = self.store.get(symbol, self.timeframe)
+        return buffer.last(column) if buffer is not None else None
+
+    def __getitem__(self, symbol: str) -> pd.DataFrame:
+        frame = self.current_frame(symbol)
+        if frame is None:
+            buffer = self.store.get(symbol, self.timeframe)
+            if buffer is None:
+                raise KeyError(symbol)
+            frame = buffer.to_frame()
+            self._frames[symbol] = (buffer.version, frame)
+        return frame
+
+    def __setitem__(self, symbol: str, df: pd.DataFrame):
+        buffer = self.store.load_frame(symbol, self.timeframe, df)
+        self._frames[symbol] = (buffer.version, df)
+
+    def __delitem__(self, symbol: str):
+        if self.store.get(symbol, self.timeframe) is None:
+            raise KeyError(symbol)
+        self.store.remove(symbol, self.timeframe)
+        self._frames.pop(symbol, None)
+
+    def __iter__(self):
+        return iter(self.store.symbols(self.timeframe))
+
+    def __len__(self):
+        return len(self.store.symbols(self.timeframe))
@@ -1,38 +1,150 @@
 
-from typing import Dict, Any
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+import asyncio
+import sys
+import threading
 import time
 
+import numpy as np
+import pandas as pd
+
 class DataCache:
-    def __init__(self, max_size: int = 1000, expiration_time: int = 3600):
-        self.cache: Dict[str, Dict[str, Any]] = {}
+    '''
+    LRU cache with a per-entry TTL. Entries live in an OrderedDict kept in
+    least-recently-used order, so get/set/evict are O(1). Optionally bounded
+    by the total size in bytes of the cached values (DataFrames, arrays).
+
+    get_or_load / get_or_load_async memoize a loader with single-flight
+    semantics: concurrent misses on the same key share one load.
+    '''
+    def __init__(self, max_size: int = 1000, expiration_time: float = 3600, max_bytes: int = None):
+        self.cache: 'OrderedDict[Hashable, Dict[str, Any]]' = OrderedDict()
+        # Write timestamps in write order (hits reorder self.cache, not this), so both ends give the extreme ages
+        self._written: 'OrderedDict[Hashable, float]' = OrderedDict()
         self.max_size = max_size
         self.expiration_time = expiration_time
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.loads = 0
+        self.coalesced_loads = 0
+        self._lock = threading.RLock()
+        self._loading: Dict[Hashable, Future] = {}
+        self._loading_async: Dict[Hashable, asyncio.Future] = {}
 
-    def get(self, key: str) -> Any:
-        if key in self.cache:
-            item = self.cache[key]
-            if time.time() - item['timestamp'] < self.expiration_time:
-                return item['data']
-            else:
-                del self.cache[key]
-        return None
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(deep=True).sum())
+        if isinstance(value, pd.Series):
+            return int(value.memory_usage(deep=True))
+        if isinstance(value, np.ndarray):
+            return value.nbytes
+        return sys.getsizeof(value)
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            item = self.cache.get(key)
+            if item is not None:
+                if time.time() - item['timestamp'] < self.expiration_time:
+                    self.cache.move_to_end(key)
+                    self.hits += 1
+                    return True, item['data']
+                self._discard(key)
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def _discard(self, key: Hashable):
+        item = self.cache.pop(key)
+        del self._written[key]
+        self.current_bytes -= item['size']
 
-    def set(self, key: str, value: Any):
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(self.cache, key=lambda k: self.cache[k]['timestamp'])
-            del self.cache[oldest_key]
+    def get(self, key: Hashable) -> Any:
+        return self._lookup(key)[1]
 
-        self.cache[key] = {
-            'data': value,
-            'timestamp': time.time()
-        }
+    def set(self, key: Hashable, value: Any):
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self.cache:
+                self._discard(key)
+            self.cache[key] = {
+                'data': value,
+                'timestamp': time.time(),
+                'size': size
+            }
+            self._written[key] = self.cache[key]['timestamp']
+            self.current_bytes += size
+            while len(self.cache) > self.max_size or (self.max_bytes is not None and self.current_bytes > self.max_bytes and len(self.cache) > 1):
+                self._discard(next(iter(self.cache)))
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        found, value = self._lookup(key)
+        if found:
+            return value
+        with self._lock:
+            pending = self._loading.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._loading[key] = Future()
+            else:
+                self.coalesced_loads += 1
+        if not owner:
+            return pending.result()
+        try:
+            value = loader()
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            self.set(key, value)
+            self.loads += 1
+            pending.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._loading[key]
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        found, value = self._lookup(key)
+        if found:
+            return value
+        pending = self._loading_async.get(key)
+        if pending is not None:
+            self.coalesced_loads += 1
+            return await asyncio.shield(pending)
+        pending = self._loading_async[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await loader()
+        except BaseException as e:
+            pending.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting for it
+            pending.exception()
+            raise
+        else:
+            self.set(key, value)
+            self.loads += 1
+            pending.set_result(value)
+            return value
+        finally:
+            del self._loading_async[key]
 
     def clear(self):
-        self.cache.clear()
+        with self._lock:
+            self.cache.clear()
+            self._written.clear()
+            self.current_bytes = 0
 
-    def remove(self, key: str):
-        if key in self.cache:
-            del self.cache[key]
+    def remove(self, key: Hashable):
+        with self._lock:
+            if key in self.cache:
+                self._discard(key)
 
     def get_size(self) -> int:
         return len(self.cache)
@@ -40,20 +152,39 @@ class DataCache:
     def get_keys(self) -> list:
         return list(self.cache.keys())
 
-    def is_expired(self, key: str) -> bool:
+    def is_expired(self, key: Hashable) -> bool:
         if key in self.cache:
             return time.time() - self.cache[key]['timestamp'] >= self.expiration_time
         return True
 
-    def refresh(self, key: str):
-        if key in self.cache:
-            self.cache[key]['timestamp'] = time.time()
+    def refresh(self, key: Hashable):
+        with self._lock:
+            if key in self.cache:
+                self.cache[key]['timestamp'] = self._written[key] = time.time()
+                self.cache.move_to_end(key)
+                self._written.move_to_end(key)
 
     def get_stats(self) -> Dict[str, Any]:
-        return {
-            'size': len(self.cache),
-            'max_size': self.max_size,
-            'expiration_time': self.expiration_time,
-            'oldest_item_age': max([time.time() - item['timestamp'] for item in self.cache.values()]) if self.cache else 0,
-            'newest_item_age': min([time.time() - item['timestamp'] for item in self.cache.values()]) if self.cache else 0
-        }
+        now = time.time()
+        oldest_item_age = newest_item_age = 0
+        with self._lock:
+            if self._written:
+                oldest_item_age = now - self._written[next(iter(self._written))]
+                newest_item_age = now - self._written[next(reversed(self._written))]
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.cache),
+                'max_size': self.max_size,
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'expiration_time': self.expiration_time,
+                'oldest_item_age': oldest_item_age,
+                'newest_item_age': newest_item_age,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'loads': self.loads,
+                'coalesced_loads': self.coalesced_loads
+            }
@@ -1,70 +1,184 @@
 
+import asyncio
+import time
+from collections import deque
 import ccxt
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from core.event_bus import CANDLE_CLOSED, TICKER_UPDATED, Event
+from data.backfill import BackfillService
+from data.candle_store import OHLCV_COLUMNS, CandleStore, CandleFrames
+from data.market_snapshot import MarketSnapshot
+from data.timeframes import timeframe_to_ms
 
 class ExchangeData:
-    def __init__(self, exchange_name, api_key, api_secret):
+    def __init__(self, exchange_name, api_key, api_secret, timeframe='1m', capacity=10000, exchange_handler=None, event_bus=None,
+                 snapshot_lookback=None):
         self.exchange = getattr(ccxt, exchange_name)({
             'apiKey': api_key,
             'secret': api_secret,
             'enableRateLimit': True,
         })
-        self.data = {}
+        # Async ExchangeHandler used by update_async(); the blocking client above serves update()
+        self.exchange_handler = exchange_handler
+        # Optional EventBus notified of closed candles and price changes after each update
+        self.event_bus = event_bus
+        self.update_latencies = deque(maxlen=1000)
+        self.timeframe = timeframe
+        self.store = CandleStore(capacity)
+        # {symbol: DataFrame} view over the candle store, materialized on demand
+        self.data = CandleFrames(self.store, timeframe)
         self.current_timestamp = None
         self.trading_pairs = []
+        # Candles per symbol handed to strategies in each cycle's MarketSnapshot
+        self.snapshot_lookback = snapshot_lookback
 
     def set_trading_pairs(self, pairs):
         self.trading_pairs = pairs
         for pair in pairs:
-            if pair not in self.data:
-                self.data[pair] = pd.DataFrame(columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                self.data[pair].set_index('timestamp', inplace=True)
+            self.store.buffer(pair, self.timeframe)
 
     def load_historical_data(self, symbol, start_date, end_date, timeframe='1m'):
         since = int(start_date.timestamp() * 1000)
         end = int(end_date.timestamp() * 1000)
-        
-        all_ohlcv = []
+
+        pages = []
         while since < end:
             ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since)
+            ohlcv = [candle for candle in ohlcv if candle[0] < end]
             if len(ohlcv) == 0:
                 break
-            all_ohlcv.extend(ohlcv)
+            pages.append(np.asarray(ohlcv, dtype=np.float64)[:, :6])
             since = ohlcv[-1][0] + 1
-        
-        df = pd.DataFrame(all_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
-        self.data[symbol] = df
-
-    def update(self):
+        if not pages:
+            return
+
+        # The range usually predates the candles already stored (buffers drop late rows), so both are
+        # merged and reloaded; fetched candles win over stored ones with the same timestamp
+        candles = np.concatenate(pages)
+        frames = [pd.DataFrame(candles[:, 1:], columns=OHLCV_COLUMNS, index=candles[:, 0].astype(np.int64))]
+        buffer = self.store.get(symbol, timeframe)
+        if buffer is not None and len(buffer):
+            timestamps, values = buffer.tail()
+            frames.insert(0, pd.DataFrame(values, columns=OHLCV_COLUMNS, index=timestamps))
+        self.store.load_frame(symbol, timeframe, pd.concat(frames))
+
+    async def backfill(self, historical_data, symbols, start_date, end_date, timeframe=None, **options):
+        '''
+        Concurrent, resumable backfill of historical_data through the async ExchangeHandler.
+        options are passed to BackfillService (page_limit, max_concurrency, checkpoint_path, ...).
+        '''
+        if self.exchange_handler is None:
+            raise ValueError("backfill requires an exchange_handler")
+        service = BackfillService(self.exchange_handler, historical_data, **options)
+        return await service.run(symbols, timeframe or self.timeframe, start_date, end_date)
+
+    def update(self, limit=2):
+        # limit=2 as in update_async: the bar that just closed comes back with its final values
         if self.current_timestamp is None:
             self.current_timestamp = datetime.now()
         
-        for symbol in self.data.keys():
-            latest_data = self.exchange.fetch_ohlcv(symbol, '1m', limit=1)
+        events = []
+        for symbol in list(self.data.keys()):
+            latest_data = self.exchange.fetch_ohlcv(symbol, self.timeframe, limit=limit)
             if latest_data:
-                latest_df = pd.DataFrame(latest_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                latest_df['timestamp'] = pd.to_datetime(latest_df['timestamp'], unit='ms')
-                latest_df.set_index('timestamp', inplace=True)
-                self.data[symbol] = self.data[symbol].append(latest_df)
+                events.extend(self._append(symbol, latest_data))
         
         self.current_timestamp = datetime.now()
+        self._publish(events)
+
+    async def update_async(self, limit=2):
+        '''
+        Refreshes every symbol concurrently through the async ExchangeHandler, whose rate
+        limiter bounds the fan-out. limit=2 also returns the bar that just closed, so its
+        final values overwrite the partial ones seen on the previous round.
+        Returns the round latency in seconds.
+        '''
+        if self.exchange_handler is None:
+            raise ValueError("update_async requires an exchange_handler")
+        start = time.perf_counter()
+        symbols = list(self.data.keys())
+        results = await asyncio.gather(*(
+            self.exchange_handler.get_ohlcv(symbol, self.timeframe, limit=limit) for symbol in symbols
+        ))
+        events = []
+        for symbol, ohlcv in zip(symbols, results):
+            if ohlcv:
+                events.extend(self._append(symbol, ohlcv))
+        latency = time.perf_counter() - start
+        self.update_latencies.append(latency)
+        self.current_timestamp = datetime.now()
+        self._publish(events)
+        return latency
+
+    def ingest_ohlcv(self, symbol, ohlcv):
+        # Entry point for pushed candles (e.g. StreamFeed): stored and published like a polled round
+        self._publish(self._append(symbol, ohlcv))
+
+    def _append(self, symbol, ohlcv):
+        buffer = self.store.buffer(symbol, self.timeframe)
+        previous_close = buffer.last('close')
+        opened = buffer.extend(ohlcv)
+        if self.event_bus is None:
+            return []
+        events = []
+        if opened and len(buffer) > 1:
+            # A new bar opening means the one before it is final
+            events.append(Event(CANDLE_CLOSED, symbol, self.timeframe, int(buffer.tail(2)[0][0])))
+        if buffer.last('close') != previous_close:
+            events.append(Event(TICKER_UPDATED, symbol, self.timeframe, buffer.last_timestamp(), buffer.last('close')))
+        return events
+
+    def _publish(self, events):
+        # Published once the whole round is stored, so subscribers see every symbol updated
+        if self.event_bus is None:
+            return
+        for event in events:
+            self.event_bus.publish(event)
+
+    def get_update_stats(self):
+        if not self.update_latencies:
+            return {'rounds': 0}
+        latencies = np.array(self.update_latencies)
+        return {
+            'rounds': len(latencies),
+            'last': latencies[-1],
+            'mean': latencies.mean(),
+            'p95': np.percentile(latencies, 95),
+            'max': latencies.max()
+        }
 
     def update_to_timestamp(self, timestamp):
         self.current_timestamp = timestamp
-        for symbol in self.data.keys():
-            self.data[symbol] = self.data[symbol][self.data[symbol].index <= timestamp]
+        cutoff = int(pd.Timestamp(timestamp).timestamp() * 1000)
+        for symbol in list(self.data.keys()):
+            self.store.get(symbol, self.timeframe).truncate(cutoff)
 
     def get_data(self, symbol):
         return self.data.get(symbol)
 
+    def get_latest_data(self, lookback=None):
+        '''
+        Snapshot of the last lookback candles of every symbol for one strategy cycle. Each
+        symbol's window is copied once, so updates of the open bar do not leak into the
+        running cycle, and then shared read-only by every strategy. Without a lookback
+        (argument or snapshot_lookback) the window is every stored candle.
+        '''
+        lookback = lookback or self.snapshot_lookback
+        arrays = {}
+        for symbol in self.data:
+            timestamps, values = self.store.get(symbol, self.timeframe).tail(lookback)
+            arrays[symbol] = (timestamps.copy(), values.copy())
+        return MarketSnapshot(timestamp=self.current_timestamp, arrays=arrays)
+
+    def tail(self, symbol, n):
+        # Read-only (timestamps, ohlcv) views of the last n candles, without building a DataFrame
+        buffer = self.store.get(symbol, self.timeframe)
+        return buffer.tail(n) if buffer is not None else None
+
     def get_latest_price(self, symbol):
-        df = self.data.get(symbol)
-        if df is not None and not df.empty:
-            return df['close'].iloc[-1]
-        return None
+        return self.data.latest(symbol, 'close')
 
     def get_total_value(self, portfolio):
         total_value = portfolio.balance
@@ -75,10 +189,7 @@ class ExchangeData:
         return total_value
 
     def get_market_value(self, symbol):
-        df = self.data.get(symbol)
-        if df is not None and not df.empty:
-            return df['close'].iloc[-1]
-        return None
+        return self.data.latest(symbol, 'close')
 
 class MockExchange:
     def __init__(self):
@@ -86,40 +197,32 @@ class MockExchange:
         self.apiKey = 'mock_api_key'
         self.secret = 'mock_secret'
 
-    def fetch_ohlcv(self, symbol, timeframe, since):
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
         import numpy as np
-        dates = pd.date_range(start=datetime.fromtimestamp(since/1000), periods=100, freq=timeframe)
-        close_prices = np.random.randint(30000, 40000, size=100)
+        periods = limit or 100
+        step = pd.Timedelta(milliseconds=timeframe_to_ms(timeframe))
+        # Without since, the latest candles, as the live update() asks for them
+        start = pd.Timestamp.now().floor(step) - step * (periods - 1) if since is None else datetime.fromtimestamp(since/1000)
+        dates = pd.date_range(start=start, periods=periods, freq=step)
+        close_prices = np.random.randint(30000, 40000, size=periods)
         return [[int(d.timestamp() * 1000), 0, 0, 0, p, 0] for d, p in zip(dates, close_prices)]
 
 class MockExchangeData(ExchangeData):
-    def __init__(self):
+    def __init__(self, timeframe='1d', capacity=10000, snapshot_lookback=None):
         self.exchange = MockExchange()
-        self.data = {}
+        self.exchange_handler = None
+        self.event_bus = None
+        self.update_latencies = deque(maxlen=1000)
+        self.snapshot_lookback = snapshot_lookback
+        self.timeframe = timeframe
+        self.store = CandleStore(capacity)
+        self.data = CandleFrames(self.store, timeframe)
         self.current_timestamp = None
         self.trading_pairs = []
 
-    def set_trading_pairs(self, pairs):
-        self.trading_pairs = pairs
-        for pair in pairs:
-            if pair not in self.data:
-                self.data[pair] = pd.DataFrame(columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                self.data[pair].set_index('timestamp', inplace=True)
-
     def load_historical_data(self, symbol, start_date, end_date, timeframe='1d'):
         ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, int(start_date.timestamp() * 1000))
         df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
         df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
         df.set_index('timestamp', inplace=True)
         self.data[symbol] = df
-
-    def update_to_timestamp(self, timestamp):
-        self.current_timestamp = timestamp
-        for symbol in self.data.keys():
-            self.data[symbol] = self.data[symbol][self.data[symbol].index <= timestamp]
-
-    def get_latest_price(self, symbol):
-        df = self.data.get(symbol)
-        if df is not None and not df.empty:
-            return df['close'].iloc[-1]
-        return None
@@ -1,61 +1,62 @@
 
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Union
 import os
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
+from data.data_cache import DataCache
+from data.storage import STORAGE_BACKENDS, StorageBackend
+from data.timeframes import find_gaps, index_to_ms, plan_fetches, timestamp_to_ms
 
 class HistoricalData:
-    def __init__(self, data_dir: str):
+    def __init__(self, data_dir: str, backend: Union[str, StorageBackend] = 'csv', cache_size: int = 32,
+                 cache_max_bytes: int = 512 * 1024 * 1024):
         self.data_dir = data_dir
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
+        # 'csv' keeps the original one-file-per-series layout, 'binary' uses monthly partitions of fixed-size binary records
+        self.storage = STORAGE_BACKENDS[backend](data_dir) if isinstance(backend, str) else backend
+        # Full-history frames, invalidated whenever the series is written
+        self.cache = DataCache(max_size=cache_size, expiration_time=float('inf'), max_bytes=cache_max_bytes)
 
     def save_data(self, symbol: str, timeframe: str, data: pd.DataFrame):
-        filename = f"{symbol}_{timeframe}.csv"
-        filepath = os.path.join(self.data_dir, filename)
-        data.to_csv(filepath, index=True)
-
-    def load_data(self, symbol: str, timeframe: str) -> pd.DataFrame:
-        filename = f"{symbol}_{timeframe}.csv"
-        filepath = os.path.join(self.data_dir, filename)
-        if os.path.exists(filepath):
-            return pd.read_csv(filepath, index_col=0, parse_dates=True)
-        return pd.DataFrame()
+        self.storage.save(symbol, timeframe, data)
+        self.cache.remove((symbol, timeframe))
+
+    def load_data(self, symbol: str, timeframe: str, start_date: datetime = None, end_date: datetime = None) -> pd.DataFrame:
+        '''
+        Candles of the series, between start_date and end_date when given. The full history is
+        served from the cache as a copy, so callers may modify the frame they get.
+        '''
+        if start_date is not None or end_date is not None:
+            return self.storage.load(symbol, timeframe, start_date, end_date)
+        return self.cache.get_or_load((symbol, timeframe), lambda: self.storage.load(symbol, timeframe)).copy()
 
     def update_data(self, symbol: str, timeframe: str, new_data: pd.DataFrame):
-        existing_data = self.load_data(symbol, timeframe)
-        updated_data = pd.concat([existing_data, new_data]).drop_duplicates().sort_index()
-        self.save_data(symbol, timeframe, updated_data)
-
-    def get_missing_data_ranges(self, symbol: str, timeframe: str, start_date: datetime, end_date: datetime) -> list:
-        data = self.load_data(symbol, timeframe)
-        if data.empty:
-            return [(start_date, end_date)]
+        self.storage.append(symbol, timeframe, new_data)
+        self.cache.remove((symbol, timeframe))
 
-        missing_ranges = []
-        current_date = start_date
+    def _find_gaps(self, symbol: str, timeframe: str, start_date: datetime, end_date: datetime) -> list:
+        data = self.storage.load(symbol, timeframe, start_date, end_date)
+        return find_gaps(index_to_ms(data.index), timestamp_to_ms(start_date), timestamp_to_ms(end_date), timeframe)
 
-        while current_date < end_date:
-            if current_date not in data.index:
-                range_start = current_date
-                while current_date < end_date and current_date not in data.index:
-                    current_date += timedelta(minutes=1)  # Assume 1-minute timeframe, adjust as needed
-                missing_ranges.append((range_start, current_date))
-            else:
-                current_date += timedelta(minutes=1)
-
-        return missing_ranges
+    def get_missing_data_ranges(self, symbol: str, timeframe: str, start_date: datetime, end_date: datetime) -> list:
+        '''
+        Merged (start, end) ranges of candles missing between start_date and end_date,
+        end exclusive. Works for any ccxt timeframe.
+        '''
+        gaps = self._find_gaps(symbol, timeframe, start_date, end_date)
+        return [(pd.Timestamp(start, unit='ms'), pd.Timestamp(end, unit='ms'))
+                for start, end in gaps]
+
+    def plan_backfill(self, symbol: str, timeframe: str, start_date: datetime, end_date: datetime, limit: int = 1000) -> list:
+        '''
+        (since_ms, limit) fetch_ohlcv calls needed to fill the gaps between start_date and end_date.
+        '''
+        return plan_fetches(self._find_gaps(symbol, timeframe, start_date, end_date), timeframe, limit)
 
     def get_data_info(self) -> Dict[str, Any]:
         info = {}
-        for filename in os.listdir(self.data_dir):
-            if filename.endswith('.csv'):
-                symbol, timeframe = filename[:-4].split('_')
-                data = pd.read_csv(os.path.join(self.data_dir, filename), index_col=0, parse_dates=True)
-                info[f"{symbol}_{timeframe}"] = {
-                    "start_date": data.index[0].strftime("%Y-%m-%d %H:%M:%S"),
-                    "end_date": data.index[-1].strftime("%Y-%m-%d %H:%M:%S"),
-                    "num_records": len(data)
-                }
+        for symbol, timeframe in self.storage.list_series():
+            info[f"{symbol}_{timeframe}"] = self.storage.info(symbol, timeframe)
         return info
@@ -0,0 +1,163 @@
+
+import threading
+from collections.abc import Mapping
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterator, Optional, Tuple
+import numpy as np
+import pandas as pd
+from data.candle_store import OHLCV_COLUMNS
+from data.timeframes import index_to_ms
+from indicators.indicator_engine import GRID_KERNELS, INDICATORS
+
+# Symbol of a snapshot built from a lone frame that does not name its market
+SINGLE_SYMBOL = 'default'
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+class _SnapshotFrames(Mapping):
+    # {symbol: DataFrame} over the snapshot arrays for strategies that still read .data
+    def __init__(self, snapshot: 'MarketSnapshot', frames: Dict[str, pd.DataFrame]):
+        self._snapshot = snapshot
+        self._frames = frames
+
+    def __getitem__(self, symbol: str) -> pd.DataFrame:
+        if symbol not in self._frames:
+            timestamps, values = self._snapshot.ohlcv(symbol)
+            frame = pd.DataFrame(values, columns=OHLCV_COLUMNS, index=pd.to_datetime(timestamps, unit='ms'))
+            frame.index.name = 'timestamp'
+            self._frames[symbol] = frame
+        return self._frames[symbol]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._snapshot.symbols())
+
+    def __len__(self) -> int:
+        return len(self._snapshot.symbols())
+
+class MarketSnapshot:
+    '''
+    Market data frozen for one strategy cycle: every strategy evaluated in the
+    cycle sees the same candles, whatever lands in the store meanwhile.
+
+    Candles are held once per symbol as read-only NumPy arrays (the last
+    `lookback` bars) that strategies share without copying, and indicators
+    requested through indicator() are computed once per (symbol, indicator,
+    params) for the whole cycle, including from strategies running on the
+    scheduler's thread pool. `data` still exposes {symbol: DataFrame},
+    materialized on first access, for strategies written against ExchangeData.
+    '''
+    def __init__(self, data: Dict[str, pd.DataFrame] = None, timestamp=None,
+                 arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = None):
+        self.timestamp = timestamp
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for symbol, (timestamps, values) in (arrays or {}).items():
+            self._arrays[symbol] = (_read_only(timestamps), _read_only(values))
+        for symbol, frame in (data or {}).items():
+            values = frame.reindex(columns=OHLCV_COLUMNS).to_numpy(dtype=np.float64, copy=True)
+            self._arrays[symbol] = (_read_only(index_to_ms(frame.index)), _read_only(values))
+        self.data = _SnapshotFrames(self, dict(data or {}))
+        self._indicators: Dict[tuple, Future] = {}
+        self._grids: Dict[tuple, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.indicator_stats = {'hits': 0, 'misses': 0}
+
+    @classmethod
+    def from_source(cls, source) -> 'MarketSnapshot':
+        '''
+        The snapshot itself, or one taken from an ExchangeData (or any object with a `data`
+        mapping). A bare OHLCV DataFrame, as the backtester passes, becomes a single-symbol
+        snapshot under frame.attrs['symbol'] (SINGLE_SYMBOL when unset).
+        '''
+        if isinstance(source, cls):
+            return source
+        if isinstance(source, pd.DataFrame):
+            return cls({source.attrs.get('symbol', SINGLE_SYMBOL): source})
+        if hasattr(source, 'get_latest_data'):
+            return source.get_latest_data()
+        return cls(dict(source.data))
+
+    def symbols(self):
+        return list(self._arrays)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._arrays
+
+    def bars(self, symbol: str) -> int:
+        arrays = self._arrays.get(symbol)
+        return len(arrays[0]) if arrays is not None else 0
+
+    def ohlcv(self, symbol: str, n: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Read-only (timestamps, OHLCV rows) of the last n bars (all of them when n is None).
+        '''
+        timestamps, values = self._arrays[symbol]
+        if n is None:
+            return timestamps, values
+        start = max(len(timestamps) - n, 0)
+        return timestamps[start:], values[start:]
+
+    def column(self, symbol: str, name: str = 'close', n: int = None) -> np.ndarray:
+        return self.ohlcv(symbol, n)[1][:, OHLCV_COLUMNS.index(name)]
+
+    def indicator(self, symbol: str, name: str, *params, compute: Callable = None) -> np.ndarray:
+        '''
+        Indicator values for every bar of symbol, computed on the first request of the
+        cycle and shared afterwards. compute(closes, *params) overrides the INDICATORS
+        entry for name, for indicators that are not registered there.
+        '''
+        key = (symbol, name, params)
+        with self._lock:
+            future = self._indicators.get(key)
+            owner = future is None
+            if owner:
+                future = self._indicators[key] = Future()
+                self.indicator_stats['misses'] += 1
+            else:
+                self.indicator_stats['hits'] += 1
+        if owner:
+            try:
+                function = compute or INDICATORS[name]
+                future.set_result(_read_only(np.asarray(function(self.column(symbol), *params), dtype=np.float64)))
+            except Exception as e:
+                future.set_exception(e)
+        # Concurrent requests for the same key wait for the first one instead of recomputing
+        return future.result()
+
+    def indicator_grid(self, name: str, periods, symbols=None) -> np.ndarray:
+        '''
+        (symbols x periods x bars) values of an indicator for many parameters in one batched
+        call, over the last bars common to every symbol. When all the symbols have as many
+        bars, the grid also fills the indicator() cache for each (symbol, period).
+        '''
+        symbols = tuple(symbols or self.symbols())
+        periods = tuple(periods)
+        key = (symbols, name, periods)
+        with self._lock:
+            grid = self._grids.get(key)
+        if grid is not None:
+            return grid
+        bars = min(self.bars(symbol) for symbol in symbols)
+        closes = np.vstack([self.column(symbol, 'close', bars) for symbol in symbols])
+        grid = _read_only(GRID_KERNELS[name](closes, periods))
+        with self._lock:
+            self._grids[key] = grid
+            if all(self.bars(symbol) == bars for symbol in symbols):
+                for row, symbol in enumerate(symbols):
+                    for position, period in enumerate(periods):
+                        if (symbol, name, (period,)) not in self._indicators:
+                            future = self._indicators[(symbol, name, (period,))] = Future()
+                            future.set_result(grid[row, position])
+        return grid
+
+    def get_data(self, symbol: str) -> Optional[pd.DataFrame]:
+        return self.data.get(symbol)
+
+    def get_latest_price(self, symbol: str) -> Optional[float]:
+        if not self.bars(symbol):
+            return None
+        return self._arrays[symbol][1][-1, OHLCV_COLUMNS.index('close')]
+
+    def get_market_value(self, symbol: str) -> Optional[float]:
+        return self.get_latest_price(symbol)
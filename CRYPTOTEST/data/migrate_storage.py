@@ -0,0 +1,31 @@
+
+import argparse
+from typing import Dict
+from data.storage import BinaryStorage, CSVStorage
+
+def migrate_csv_to_binary(source_dir: str, target_dir: str) -> Dict[str, int]:
+    '''
+    Copies every {symbol}_{timeframe}.csv series from source_dir into the
+    binary partitioned layout under target_dir. Returns the number of
+    records written per series.
+    '''
+    source = CSVStorage(source_dir)
+    target = BinaryStorage(target_dir)
+    migrated = {}
+    for symbol, timeframe in source.list_series():
+        data = source.load(symbol, timeframe)
+        target.save(symbol, timeframe, data)
+        migrated[f"{symbol}_{timeframe}"] = len(data)
+    return migrated
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate historical CSV data to the binary storage format")
+    parser.add_argument('source_dir', help="Directory containing the CSV files")
+    parser.add_argument('target_dir', help="Directory for the binary partitions")
+    args = parser.parse_args()
+
+    for series, count in migrate_csv_to_binary(args.source_dir, args.target_dir).items():
+        print(f"{series}: {count} records")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+
+import zlib
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional
+
+CHECKSUM_LEVELS = 25
+
+def book_checksum(bids: List[List[float]], asks: List[List[float]], levels: int = CHECKSUM_LEVELS) -> int:
+    '''
+    CRC32 of the top levels, interleaved bid/ask as "bid_price:bid_amount:ask_price:ask_amount:..."
+    (the layout OKX and Kraken checksums use). Numbers are formatted with repr so that
+    the publisher and the local book agree on the string.
+    '''
+    parts = []
+    for i in range(levels):
+        for side in (bids, asks):
+            if i < len(side):
+                parts.append(repr(float(side[i][0])))
+                parts.append(repr(float(side[i][1])))
+    return zlib.crc32(':'.join(parts).encode()) & 0xffffffff
+
+class BookSide:
+    '''
+    One side of the book as sorted parallel arrays, best level last: updates are a
+    bisect plus a list insert/delete near the top of the book (where most of the
+    activity is), and reading the best level is an index lookup.
+    '''
+    __slots__ = ('is_ask', 'keys', 'amounts')
+
+    def __init__(self, is_ask: bool):
+        self.is_ask = is_ask
+        # Sort keys are the prices, negated for asks, so both sides keep the best level at the end
+        self.keys: List[float] = []
+        self.amounts: List[float] = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _key(self, price: float) -> float:
+        return -price if self.is_ask else price
+
+    def load(self, levels: Iterable[List[float]]):
+        pairs = sorted((self._key(float(price)), float(amount)) for price, amount, *_ in levels if amount)
+        self.keys = [key for key, _ in pairs]
+        self.amounts = [amount for _, amount in pairs]
+
+    def update(self, price: float, amount: float):
+        key = self._key(float(price))
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            if amount:
+                self.amounts[i] = float(amount)
+            else:
+                del self.keys[i]
+                del self.amounts[i]
+        elif amount:
+            self.keys.insert(i, key)
+            self.amounts.insert(i, float(amount))
+
+    def best(self) -> Optional[float]:
+        if not self.keys:
+            return None
+        return self._key(self.keys[-1])
+
+    def levels(self, depth: int = None) -> List[List[float]]:
+        start = 0 if depth is None else max(len(self.keys) - depth, 0)
+        return [[self._key(self.keys[i]), self.amounts[i]] for i in range(len(self.keys) - 1, start - 1, -1)]
+
+    def volume_to(self, limit_price: float) -> float:
+        '''
+        Amount resting at prices at least as good as limit_price.
+        '''
+        return sum(self.amounts[bisect_left(self.keys, self._key(limit_price)):])
+
+class LocalOrderBook:
+    '''
+    Order book for one symbol kept up to date locally from a snapshot and
+    incremental level updates, so readers (strategies, risk checks) get the
+    top of book without a network call.
+
+    A book is only `synced` once a snapshot has been loaded. Snapshots and
+    deltas carrying a `checksum` are validated with book_checksum and
+    rejected (the book is left unsynced) when it doesn't match, as are
+    crossed books; the owner is then expected to resnapshot.
+    '''
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = BookSide(is_ask=False)
+        self.asks = BookSide(is_ask=True)
+        self.nonce = None
+        self.timestamp = None
+        self.synced = False
+        self.updates = 0
+
+    def load_snapshot(self, snapshot: Dict) -> bool:
+        '''
+        Replaces the book with a ccxt-shaped snapshot; returns False if it fails validation.
+        '''
+        self.bids.load(snapshot.get('bids', []))
+        self.asks.load(snapshot.get('asks', []))
+        self.nonce = snapshot.get('nonce')
+        self.timestamp = snapshot.get('timestamp')
+        self.synced = self._valid(snapshot.get('checksum'))
+        return self.synced
+
+    def apply_delta(self, bids: Iterable[List[float]] = (), asks: Iterable[List[float]] = (), nonce: int = None,
+                    timestamp: int = None, checksum: int = None) -> bool:
+        '''
+        Applies level changes (amount 0 removes the level); returns False if the
+        resulting book fails validation.
+        '''
+        for price, amount, *_ in bids:
+            self.bids.update(price, amount)
+        for price, amount, *_ in asks:
+            self.asks.update(price, amount)
+        if nonce is not None:
+            self.nonce = nonce
+        if timestamp is not None:
+            self.timestamp = timestamp
+        self.updates += 1
+        self.synced = self.synced and self._valid(checksum)
+        return self.synced
+
+    def covers(self, nonce: int) -> bool:
+        # True when the update with this nonce is already part of the book
+        return self.synced and nonce is not None and self.nonce is not None and nonce <= self.nonce
+
+    def follows(self, nonce: int) -> bool:
+        # True when an update with this nonce can be applied without missing any in between
+        return self.synced and (nonce is None or self.nonce is None or nonce == self.nonce + 1)
+
+    def _valid(self, checksum: int = None) -> bool:
+        if self.is_crossed():
+            return False
+        return checksum is None or checksum == self.checksum()
+
+    def checksum(self, levels: int = CHECKSUM_LEVELS) -> int:
+        return book_checksum(self.bids.levels(levels), self.asks.levels(levels), levels)
+
+    def best_bid(self) -> Optional[float]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[float]:
+        return self.asks.best()
+
+    def is_crossed(self) -> bool:
+        bid, ask = self.bids.best(), self.asks.best()
+        return bid is not None and ask is not None and bid >= ask
+
+    def spread(self) -> Optional[float]:
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask - bid
+
+    def mid(self) -> Optional[float]:
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def spread_bps(self) -> Optional[float]:
+        mid = self.mid()
+        if not mid:
+            return None
+        return self.spread() / mid * 10000
+
+    def depth(self, bps: float, side: str = 'both') -> float:
+        '''
+        Amount resting within bps basis points of the mid price on 'bids', 'asks' or 'both'.
+        '''
+        mid = self.mid()
+        if mid is None:
+            return 0.0
+        offset = mid * bps / 10000
+        volume = 0.0
+        if side in ('bids', 'both'):
+            volume += self.bids.volume_to(mid - offset)
+        if side in ('asks', 'both'):
+            volume += self.asks.volume_to(mid + offset)
+        return volume
+
+    def to_dict(self, depth: int = None) -> Dict:
+        # ccxt-shaped view: [price, amount] lists, best level first
+        return {
+            'symbol': self.symbol,
+            'bids': self.bids.levels(depth),
+            'asks': self.asks.levels(depth),
+            'nonce': self.nonce,
+            'timestamp': self.timestamp
+        }
@@ -0,0 +1,205 @@
+
+import os
+import shutil
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Tuple
+from urllib.parse import quote, unquote
+import numpy as np
+import pandas as pd
+from data.candle_store import OHLCV_COLUMNS
+from data.timeframes import index_to_ms, timestamp_to_ms
+
+RECORD_DTYPE = np.dtype([('timestamp', '<i8')] + [(column, '<f8') for column in OHLCV_COLUMNS])
+
+# info() of a series without candles
+EMPTY_INFO = {"start_date": None, "end_date": None, "num_records": 0}
+
+class StorageBackend(ABC):
+    '''
+    Persistence for OHLCV series keyed by (symbol, timeframe). Frames use a
+    DatetimeIndex and the columns open, high, low, close, volume.
+    '''
+    @abstractmethod
+    def save(self, symbol: str, timeframe: str, data: pd.DataFrame):
+        pass
+
+    @abstractmethod
+    def load(self, symbol: str, timeframe: str, start=None, end=None) -> pd.DataFrame:
+        pass
+
+    @abstractmethod
+    def append(self, symbol: str, timeframe: str, data: pd.DataFrame):
+        pass
+
+    @abstractmethod
+    def list_series(self) -> List[Tuple[str, str]]:
+        pass
+
+    def info(self, symbol: str, timeframe: str) -> Dict[str, Any]:
+        data = self.load(symbol, timeframe)
+        if data.empty:
+            return EMPTY_INFO.copy()
+        return {
+            "start_date": data.index[0].strftime("%Y-%m-%d %H:%M:%S"),
+            "end_date": data.index[-1].strftime("%Y-%m-%d %H:%M:%S"),
+            "num_records": len(data)
+        }
+
+class CSVStorage(StorageBackend):
+    '''
+    One {symbol}_{timeframe}.csv per series. Appending rewrites the whole file.
+    '''
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+
+    def _path(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.data_dir, f"{symbol}_{timeframe}.csv")
+
+    def save(self, symbol: str, timeframe: str, data: pd.DataFrame):
+        path = self._path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data.to_csv(path, index=True)
+
+    def load(self, symbol: str, timeframe: str, start=None, end=None) -> pd.DataFrame:
+        path = self._path(symbol, timeframe)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        data = pd.read_csv(path, index_col=0, parse_dates=True)
+        if start is not None or end is not None:
+            data = data.loc[start:end]
+        return data
+
+    def append(self, symbol: str, timeframe: str, data: pd.DataFrame):
+        existing_data = self.load(symbol, timeframe)
+        updated_data = pd.concat([existing_data, data]).drop_duplicates().sort_index()
+        self.save(symbol, timeframe, updated_data)
+
+    def list_series(self) -> List[Tuple[str, str]]:
+        series = []
+        for root, _, files in os.walk(self.data_dir):
+            for filename in files:
+                if filename.endswith('.csv'):
+                    # Symbols like BTC/USDT end up one directory deep
+                    name = os.path.relpath(os.path.join(root, filename), self.data_dir)[:-4].replace(os.sep, '/')
+                    symbol, timeframe = name.rsplit('_', 1)
+                    series.append((symbol, timeframe))
+        return series
+
+class BinaryStorage(StorageBackend):
+    '''
+    Binary record store: each series is a directory of monthly partitions
+    (YYYY-MM.bin) of fixed-size little-endian rows (timestamp in ms + OHLCV as
+    float64, interleaved per candle), sorted by timestamp. New candles are appended to the end of
+    the last partition without touching older months; a range load only maps
+    the partitions it overlaps, through np.memmap.
+    '''
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+
+    def _series_dir(self, symbol: str, timeframe: str) -> str:
+        # Percent-encoded so that list_series() gets the symbol back, whatever '/', '-' or '_' it holds
+        return os.path.join(self.data_dir, f"{quote(symbol, safe='')}_{timeframe}")
+
+    def _partitions(self, symbol: str, timeframe: str) -> List[str]:
+        directory = self._series_dir(symbol, timeframe)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.bin'))
+
+    def _read_partition(self, path: str) -> np.ndarray:
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(path, dtype=RECORD_DTYPE, mode='r')
+
+    @staticmethod
+    def _to_records(data: pd.DataFrame) -> np.ndarray:
+        data = data.sort_index()
+        data = data[~data.index.duplicated(keep='last')]
+        records = np.empty(len(data), dtype=RECORD_DTYPE)
+        records['timestamp'] = index_to_ms(data.index)
+        for column in OHLCV_COLUMNS:
+            records[column] = data[column].to_numpy(dtype=np.float64) if column in data else np.nan
+        return records
+
+    @staticmethod
+    def _to_frame(records: np.ndarray) -> pd.DataFrame:
+        df = pd.DataFrame({column: records[column] for column in OHLCV_COLUMNS},
+                          index=pd.to_datetime(records['timestamp'], unit='ms'))
+        df.index.name = 'timestamp'
+        return df
+
+    def save(self, symbol: str, timeframe: str, data: pd.DataFrame):
+        shutil.rmtree(self._series_dir(symbol, timeframe), ignore_errors=True)
+        self.append(symbol, timeframe, data)
+
+    def append(self, symbol: str, timeframe: str, data: pd.DataFrame):
+        if data.empty:
+            return
+        records = self._to_records(data)
+        directory = self._series_dir(symbol, timeframe)
+        os.makedirs(directory, exist_ok=True)
+        months = records['timestamp'].astype('datetime64[ms]').astype('datetime64[M]')
+        boundaries = np.flatnonzero(months[1:] != months[:-1]) + 1
+        for chunk in np.split(records, boundaries):
+            partition = str(chunk['timestamp'][:1].astype('datetime64[ms]').astype('datetime64[M]')[0])
+            path = os.path.join(directory, f"{partition}.bin")
+            existing = self._read_partition(path) if os.path.exists(path) else None
+            if existing is None or len(existing) == 0 or chunk['timestamp'][0] > existing['timestamp'][-1]:
+                with open(path, 'ab') as file:
+                    file.write(chunk.tobytes())
+                continue
+            # Overlap with stored candles: merge and rewrite this month only, newest values win
+            merged = np.concatenate([np.asarray(existing), chunk])
+            del existing
+            order = np.argsort(merged['timestamp'], kind='stable')
+            merged = merged[order]
+            keep = np.append(merged['timestamp'][1:] != merged['timestamp'][:-1], True)
+            merged[keep].tofile(path + '.tmp')
+            os.replace(path + '.tmp', path)
+
+    def load(self, symbol: str, timeframe: str, start=None, end=None) -> pd.DataFrame:
+        start_ms, end_ms = timestamp_to_ms(start), timestamp_to_ms(end)
+        directory = self._series_dir(symbol, timeframe)
+        chunks = []
+        for partition in self._partitions(symbol, timeframe):
+            month_start = timestamp_to_ms(partition + '-01')
+            month_end = timestamp_to_ms(pd.Timestamp(partition + '-01') + pd.offsets.MonthBegin(1))
+            if (start_ms is not None and month_end <= start_ms) or (end_ms is not None and month_start > end_ms):
+                continue
+            records = self._read_partition(os.path.join(directory, f"{partition}.bin"))
+            lower = np.searchsorted(records['timestamp'], start_ms, side='left') if start_ms is not None else 0
+            upper = np.searchsorted(records['timestamp'], end_ms, side='right') if end_ms is not None else len(records)
+            chunks.append(np.array(records[lower:upper]))
+        if not chunks:
+            return pd.DataFrame()
+        return self._to_frame(np.concatenate(chunks))
+
+    def list_series(self) -> List[Tuple[str, str]]:
+        if not os.path.isdir(self.data_dir):
+            return []
+        series = []
+        for name in os.listdir(self.data_dir):
+            if os.path.isdir(os.path.join(self.data_dir, name)) and '_' in name:
+                symbol, timeframe = name.rsplit('_', 1)
+                series.append((unquote(symbol), timeframe))
+        return series
+
+    def info(self, symbol: str, timeframe: str) -> Dict[str, Any]:
+        # Only the first and last records and the partition sizes are read
+        directory = self._series_dir(symbol, timeframe)
+        partitions = [self._read_partition(os.path.join(directory, f"{name}.bin")) for name in self._partitions(symbol, timeframe)]
+        partitions = [records for records in partitions if len(records)]
+        if not partitions:
+            return EMPTY_INFO.copy()
+        first = pd.Timestamp(int(partitions[0]['timestamp'][0]), unit='ms')
+        last = pd.Timestamp(int(partitions[-1]['timestamp'][-1]), unit='ms')
+        return {
+            "start_date": first.strftime("%Y-%m-%d %H:%M:%S"),
+            "end_date": last.strftime("%Y-%m-%d %H:%M:%S"),
+            "num_records": sum(len(records) for records in partitions)
+        }
+
+STORAGE_BACKENDS = {
+    'csv': CSVStorage,
+    'binary': BinaryStorage,
+}
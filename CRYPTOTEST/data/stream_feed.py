@@ -0,0 +1,161 @@
+
+import asyncio
+from typing import Dict, Iterable, List
+from core.event_bus import TICKER_UPDATED, Event
+from data.order_book import LocalOrderBook
+from data.timeframes import shift_timestamp
+from utils.logging_config import setup_logging
+
+OHLCV = 'ohlcv'
+TRADES = 'trades'
+BOOK = 'book'
+
+class StreamFeed:
+    '''
+    Streams klines, trades and order book updates from a ccxt.pro-style client
+    (watch_ohlcv / watch_trades / watch_order_book) instead of polling REST.
+
+    Klines go to ExchangeData.ingest_ohlcv, so the candle store and the event
+    bus behave as with polling. Each (channel, symbol) stream reconnects on
+    its own with exponential backoff. After a reconnect, or when a sequence
+    gap shows up (missing bars, non-consecutive book nonces), the state is
+    resnapshotted over REST through the ExchangeHandler.
+
+    Books are LocalOrderBook instances, shared with the ExchangeHandler when
+    the engine passes its order_books. Book messages with type 'delta' are
+    applied as level changes (amount 0 removes the level); any other book
+    message replaces the book, as ccxt.pro's watch_order_book returns the
+    whole maintained book. A checksum mismatch also triggers a resnapshot.
+    '''
+    def __init__(self, client, exchange_data, symbols: List[str], channels: Iterable[str] = (OHLCV, TRADES, BOOK),
+                 rest_handler=None, reconnect_delay: float = 0.5, max_reconnect_delay: float = 30.0,
+                 order_books: Dict[str, LocalOrderBook] = None):
+        self.logger = setup_logging()
+        self.client = client
+        self.exchange_data = exchange_data
+        self.timeframe = exchange_data.timeframe
+        self.symbols = list(symbols)
+        self.channels = tuple(channels)
+        self.rest_handler = rest_handler
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.order_books = order_books if order_books is not None else {}
+        self.last_trades: Dict[str, Dict] = {}
+        self.stats = {'messages': {channel: 0 for channel in self.channels}, 'reconnects': 0, 'gaps': 0,
+                      'checksum_errors': 0, 'resnapshots': 0}
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        for symbol in self.symbols:
+            self.exchange_data.store.buffer(symbol, self.timeframe)
+            for channel in self.channels:
+                self._tasks.append(asyncio.ensure_future(self._run_stream(channel, symbol)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _watch(self, channel: str, symbol: str):
+        if channel == OHLCV:
+            return await self.client.watch_ohlcv(symbol, self.timeframe)
+        if channel == TRADES:
+            return await self.client.watch_trades(symbol)
+        return await self.client.watch_order_book(symbol)
+
+    async def _run_stream(self, channel: str, symbol: str):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                message = await self._watch(channel, symbol)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['reconnects'] += 1
+                self.logger.warning(f"{channel} stream for {symbol} dropped ({e}), reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                # Whatever was published while disconnected is fetched over REST
+                await self.resnapshot(channel, symbol)
+                continue
+            delay = self.reconnect_delay
+            self.stats['messages'][channel] += 1
+            try:
+                await self._handle(channel, symbol, message)
+            except Exception as e:
+                self.logger.error(f"Error handling {channel} message for {symbol}: {e}")
+
+    async def _handle(self, channel: str, symbol: str, message):
+        if channel == OHLCV:
+            await self.on_ohlcv(symbol, message)
+        elif channel == TRADES:
+            self.on_trades(symbol, message)
+        else:
+            await self.on_book(symbol, message)
+
+    async def on_ohlcv(self, symbol: str, candles: List[List]):
+        if not candles:
+            return
+        buffer = self.exchange_data.store.get(symbol, self.timeframe)
+        last = buffer.last_timestamp() if buffer is not None else None
+        if last is not None and candles[0][0] > shift_timestamp(last, 1, self.timeframe):
+            self.stats['gaps'] += 1
+            await self.resnapshot(OHLCV, symbol)
+        self.exchange_data.ingest_ohlcv(symbol, candles)
+
+    def on_trades(self, symbol: str, trades: List[Dict]):
+        if not trades:
+            return
+        self.last_trades[symbol] = trades[-1]
+        event_bus = self.exchange_data.event_bus
+        if event_bus is not None:
+            event_bus.publish(Event(TICKER_UPDATED, symbol, self.timeframe, trades[-1].get('timestamp'), trades[-1].get('price')))
+
+    def book(self, symbol: str) -> LocalOrderBook:
+        if symbol not in self.order_books:
+            self.order_books[symbol] = LocalOrderBook(symbol)
+        return self.order_books[symbol]
+
+    async def on_book(self, symbol: str, message: Dict):
+        book = self.book(symbol)
+        if message.get('type') != 'delta':
+            if not book.load_snapshot(message):
+                self.stats['checksum_errors'] += 1
+                await self.resnapshot(BOOK, symbol)
+            return
+        nonce = message.get('nonce')
+        if book.covers(nonce):
+            return
+        if not book.follows(nonce):
+            self.stats['gaps'] += 1
+            await self.resnapshot(BOOK, symbol)
+            if not book.synced or book.covers(nonce):
+                return
+        if not book.apply_delta(message.get('bids', []), message.get('asks', []), nonce, message.get('timestamp'), message.get('checksum')):
+            self.stats['checksum_errors'] += 1
+            await self.resnapshot(BOOK, symbol)
+
+    async def resnapshot(self, channel: str, symbol: str):
+        if self.rest_handler is None or channel == TRADES:
+            return
+        self.stats['resnapshots'] += 1
+        if channel == OHLCV:
+            buffer = self.exchange_data.store.get(symbol, self.timeframe)
+            since = buffer.last_timestamp() if buffer is not None else None
+            candles = await self.rest_handler.get_ohlcv(symbol, self.timeframe, since=since)
+            if candles:
+                self.exchange_data.ingest_ohlcv(symbol, candles)
+        else:
+            snapshot = await self.rest_handler.get_order_book(symbol)
+            if snapshot:
+                self.book(symbol).load_snapshot(snapshot)
+
+    def get_order_book(self, symbol: str, depth: int = None) -> Dict:
+        book = self.order_books.get(symbol)
+        if book is None or not book.synced:
+            return {}
+        return book.to_dict(depth)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'messages': dict(self.stats['messages'])}
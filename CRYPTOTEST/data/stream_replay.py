@@ -0,0 +1,186 @@
+
+import argparse
+import asyncio
+import json
+from typing import Dict, Iterable, List
+
+# aiohttp ships with ccxt's async support; it is imported lazily so this module
+# can be imported (e.g. for load_recording) without it.
+
+def load_recording(path: str) -> List[Dict]:
+    '''
+    Reads a JSON-lines recording: one {"channel", "symbol", "data", "time"} object
+    per line, where channel is 'ohlcv', 'trades' or 'book' and time (optional) is
+    the offset in seconds from the start of the recording.
+    '''
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def save_recording(path: str, messages: Iterable[Dict]):
+    with open(path, 'w') as file:
+        for message in messages:
+            file.write(json.dumps(message) + '\n')
+
+class ReplayServer:
+    '''
+    Local WebSocket server playing back a recording to every client that connects,
+    so streaming code can be exercised offline. Clients may resume with ?from=<seq>.
+    speed scales the recorded timing (0 sends as fast as possible). drop_after
+    closes the first connection after that many messages and skip leaves out
+    the given sequence numbers, to exercise reconnects and gap recovery.
+    '''
+    def __init__(self, messages: List[Dict], host: str = '127.0.0.1', port: int = 0, speed: float = 0,
+                 drop_after: int = None, skip: Iterable[int] = ()):
+        self.messages = messages
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.drop_after = drop_after
+        self.skip = set(skip)
+        self.connections = 0
+        self._runner = None
+
+    async def start(self) -> str:
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get('/ws', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self.url
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        first_connection = self.connections == 1
+        start = int(request.query.get('from', 0))
+        sent = 0
+        previous_time = None
+        for seq in range(start, len(self.messages)):
+            if seq in self.skip:
+                continue
+            message = self.messages[seq]
+            if self.speed and message.get('time') is not None:
+                if previous_time is not None:
+                    await asyncio.sleep(max(message['time'] - previous_time, 0) / self.speed)
+                previous_time = message['time']
+            await ws.send_json({'seq': seq, 'channel': message['channel'], 'symbol': message['symbol'], 'data': message['data']})
+            sent += 1
+            if first_connection and self.drop_after is not None and sent >= self.drop_after:
+                await ws.close()
+                return ws
+        # Like a live stream, the connection stays open once the recording is exhausted
+        async for _ in ws:
+            pass
+        return ws
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+class ReplayClient:
+    '''
+    ccxt.pro-style client for a ReplayServer: watch_ohlcv, watch_trades and
+    watch_order_book return the next message of their stream. When the
+    connection drops, pending and later calls raise ConnectionError until the
+    next call reconnects, resuming after the last message received.
+    '''
+    def __init__(self, url: str):
+        self.url = url
+        self._session = None
+        self._ws = None
+        self._reader = None
+        self._queues: Dict[tuple, asyncio.Queue] = {}
+        self._next_seq = 0
+        self._connect_lock = None
+        self._connection_id = 0
+        # Connection each stream last read from, so every stream learns about a drop once
+        self._attached: Dict[tuple, int] = {}
+
+    def _queue(self, channel: str, symbol: str) -> asyncio.Queue:
+        key = (channel, symbol)
+        if key not in self._queues:
+            self._queues[key] = asyncio.Queue()
+        return self._queues[key]
+
+    async def _connect(self):
+        import aiohttp
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        self._ws = await self._session.ws_connect(f"{self.url}?from={self._next_seq}")
+        self._connection_id += 1
+        self._reader = asyncio.ensure_future(self._read(self._ws))
+
+    async def _read(self, ws):
+        async for message in ws:
+            payload = json.loads(message.data)
+            self._next_seq = payload['seq'] + 1
+            self._queue(payload['channel'], payload['symbol']).put_nowait(payload['data'])
+
+    def _disconnected(self, key: tuple):
+        self._attached.pop(key, None)
+        return ConnectionError(f"Replay connection to {self.url} closed")
+
+    async def _watch(self, channel: str, symbol: str):
+        key = (channel, symbol)
+        queue = self._queue(channel, symbol)
+        if not queue.empty():
+            return queue.get_nowait()
+        if self._reader is not None and self._reader.done() and self._attached.get(key) == self._connection_id:
+            raise self._disconnected(key)
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            # Every stream shares one connection; the first caller after a drop reconnects
+            if self._reader is None or self._reader.done():
+                await self._connect()
+        self._attached[key] = self._connection_id
+        getter = asyncio.ensure_future(queue.get())
+        await asyncio.wait({getter, self._reader}, return_when=asyncio.FIRST_COMPLETED)
+        if getter.done():
+            return getter.result()
+        getter.cancel()
+        raise self._disconnected(key)
+
+    async def watch_ohlcv(self, symbol: str, timeframe: str = '1m'):
+        return await self._watch('ohlcv', symbol)
+
+    async def watch_trades(self, symbol: str):
+        return await self._watch('trades', symbol)
+
+    async def watch_order_book(self, symbol: str, limit: int = None):
+        return await self._watch('book', symbol)
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._ws is not None:
+            await self._ws.close()
+        if self._session is not None:
+            await self._session.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a recorded market data stream over WebSocket")
+    parser.add_argument('recording', help="JSON-lines recording")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--speed', type=float, default=1.0, help="playback speed, 0 for as fast as possible")
+    args = parser.parse_args()
+
+    async def main():
+        server = ReplayServer(load_recording(args.recording), port=args.port, speed=args.speed)
+        print(f"Replaying {args.recording} on {await server.start()}")
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
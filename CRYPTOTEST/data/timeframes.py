@@ -0,0 +1,124 @@
+
+import re
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+
+# Fixed-length units in milliseconds; months and years follow the calendar
+UNIT_MS = {
+    's': 1000,
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+CALENDAR_UNITS = ('M', 'y')
+# Weekly candles open on Monday; the epoch was a Thursday
+GRID_OFFSET_MS = {'w': 4 * UNIT_MS['d']}
+
+_TIMEFRAME_PATTERN = re.compile(r'^(\d+)([smhdwMy])$')
+
+def parse_timeframe(timeframe: str) -> Tuple[int, str]:
+    '''
+    Splits a ccxt timeframe string ('1m', '4h', '1w', '1M', ...) into (amount, unit).
+    '''
+    match = _TIMEFRAME_PATTERN.match(timeframe)
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid timeframe: {timeframe}")
+    return int(match.group(1)), match.group(2)
+
+def timeframe_to_ms(timeframe: str) -> int:
+    '''
+    Nominal duration of a timeframe in milliseconds, with ccxt's convention of
+    30-day months and 365-day years.
+    '''
+    amount, unit = parse_timeframe(timeframe)
+    if unit == 'M':
+        return amount * 30 * UNIT_MS['d']
+    if unit == 'y':
+        return amount * 365 * UNIT_MS['d']
+    return amount * UNIT_MS[unit]
+
+def _grid_index(timestamps: np.ndarray, amount: int, unit: str) -> Tuple[np.ndarray, np.ndarray]:
+    # Index of the grid slot containing each timestamp, and whether it sits exactly on the slot's open
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if unit in CALENDAR_UNITS:
+        months = timestamps.astype('datetime64[ms]').astype('datetime64[M]')
+        on_grid = months.astype('datetime64[ms]').astype(np.int64) == timestamps
+        index = months.astype(np.int64)
+        if unit == 'y':
+            on_grid &= index % 12 == 0
+            index = index // 12
+    else:
+        step = amount * UNIT_MS[unit]
+        shifted = timestamps - GRID_OFFSET_MS.get(unit, 0)
+        on_grid = shifted % step == 0
+        return shifted // step, on_grid
+    on_grid &= index % amount == 0
+    return index // amount, on_grid
+
+def _grid_timestamp(index: np.ndarray, amount: int, unit: str) -> np.ndarray:
+    index = np.asarray(index, dtype=np.int64)
+    if unit in CALENDAR_UNITS:
+        months = index * amount * (12 if unit == 'y' else 1)
+        return months.astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+    return index * amount * UNIT_MS[unit] + GRID_OFFSET_MS.get(unit, 0)
+
+def _index_bounds(start_ms: int, end_ms: int, amount: int, unit: str) -> Tuple[int, int]:
+    # First slot opening at or after start, and one past the last slot opening before end
+    (first,), (first_on_grid,) = _grid_index([start_ms], amount, unit)
+    (last,), _ = _grid_index([end_ms - 1], amount, unit)
+    return int(first) + (not first_on_grid), int(last) + 1
+
+def find_gaps(timestamps, start_ms: int, end_ms: int, timeframe: str) -> List[Tuple[int, int]]:
+    '''
+    Missing candles of `timeframe` in [start_ms, end_ms), given the open
+    timestamps (ms) already stored. Returns merged half-open (start, end) ranges
+    in ms, where end is the open time of the next present (or out of range) candle.
+    '''
+    amount, unit = parse_timeframe(timeframe)
+    first, stop = _index_bounds(start_ms, end_ms, amount, unit)
+    if stop <= first:
+        return []
+    index, on_grid = _grid_index(timestamps, amount, unit)
+    present = index[on_grid & (index >= first) & (index < stop)]
+    if np.any(present[1:] < present[:-1]):
+        present = np.sort(present)
+    present = present[np.append(True, present[1:] != present[:-1])] if len(present) else present
+    bounds = np.concatenate(([first - 1], present, [stop]))
+    gaps = np.flatnonzero(np.diff(bounds) > 1)
+    gap_starts = _grid_timestamp(bounds[gaps] + 1, amount, unit)
+    gap_ends = _grid_timestamp(bounds[gaps + 1], amount, unit)
+    return list(zip(gap_starts.tolist(), gap_ends.tolist()))
+
+def plan_fetches(gaps: List[Tuple[int, int]], timeframe: str, limit: int = 1000) -> List[Tuple[int, int]]:
+    '''
+    Splits missing ranges into the fetch_ohlcv calls needed to fill them, as
+    (since_ms, limit) pairs of at most `limit` candles each.
+    '''
+    amount, unit = parse_timeframe(timeframe)
+    requests = []
+    for start_ms, end_ms in gaps:
+        first, stop = _index_bounds(start_ms, end_ms, amount, unit)
+        pages = np.arange(first, stop, limit)
+        for since, page in zip(_grid_timestamp(pages, amount, unit).tolist(), pages.tolist()):
+            requests.append((since, min(limit, stop - page)))
+    return requests
+
+def shift_timestamp(timestamp_ms: int, periods: int, timeframe: str) -> int:
+    '''
+    Open time of the candle `periods` slots after the one containing timestamp_ms.
+    '''
+    amount, unit = parse_timeframe(timeframe)
+    (index,), _ = _grid_index([timestamp_ms], amount, unit)
+    return int(_grid_timestamp([index + periods], amount, unit)[0])
+
+def timestamp_to_ms(value) -> int:
+    if value is None:
+        return None
+    return pd.Timestamp(value).value // 1_000_000
+
+def index_to_ms(index: pd.Index) -> np.ndarray:
+    if len(index) == 0:
+        return np.empty(0, dtype=np.int64)
+    return pd.DatetimeIndex(index).as_unit('ms').asi8
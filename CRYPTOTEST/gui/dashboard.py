@@ -41,6 +41,18 @@ class Dashboard:
         self.positions_tree.heading('PNL', text='PNL')
         self.positions_tree.pack(fill='both', expand=True)
 
+        # Latences (snapshot du registre de métriques)
+        latency_frame = ttk.LabelFrame(self.frame, text="Latences")
+        latency_frame.pack(padx=10, pady=10, fill='both', expand=True)
+
+        self.latency_tree = ttk.Treeview(latency_frame, columns=('Metric', 'Labels', 'Count', 'p50', 'p99'), show='headings')
+        self.latency_tree.heading('Metric', text='Métrique')
+        self.latency_tree.heading('Labels', text='Étiquettes')
+        self.latency_tree.heading('Count', text='Appels')
+        self.latency_tree.heading('p50', text='p50 (ms)')
+        self.latency_tree.heading('p99', text='p99 (ms)')
+        self.latency_tree.pack(fill='both', expand=True)
+
     def update(self):
         # Mettre à jour les informations générales
         self.status_label.config(text=f"Statut: {'En cours' if self.bot.is_running else 'Arrêté'}")
@@ -58,3 +70,16 @@ class Dashboard:
             current_price = self.bot.exchange_handler.get_latest_price(symbol)
             pnl = (current_price - position['price']) * position['amount']
             self.positions_tree.insert('', 'end', values=(symbol, position['amount'], position['price'], current_price, f"{pnl:.2f}"))
+
+        # Mettre à jour les latences
+        get_metrics = getattr(self.bot, 'get_metrics', None)
+        if get_metrics is None:
+            return
+        self.latency_tree.delete(*self.latency_tree.get_children())
+        for name, metric in get_metrics().items():
+            if metric['type'] != 'histogram':
+                continue
+            for sample in metric['samples']:
+                labels = ', '.join(f"{key}={value}" for key, value in sample['labels'].items())
+                self.latency_tree.insert('', 'end', values=(name, labels, sample['count'],
+                                                            f"{sample['p50'] * 1000:.2f}", f"{sample['p99'] * 1000:.2f}"))
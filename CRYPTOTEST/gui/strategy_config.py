@@ -1,9 +1,11 @@
 
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox
+from utils.logging_config import setup_logging
 
 class StrategyConfig(QWidget):
     def __init__(self):
         super().__init__()
+        self.logger = setup_logging()
         self.initUI()
 
     def initUI(self):
@@ -68,6 +70,5 @@ class StrategyConfig(QWidget):
                 value = item.itemAt(1).widget().text()
                 params[label] = value
         
-        print(f"Saving configuration for {strategy}:")
-        print(params)
+        self.logger.info(f"Saving configuration for {strategy}: {params}")
         # Here you would typically save this to a config file or database
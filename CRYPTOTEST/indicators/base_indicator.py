@@ -1,7 +1,19 @@
 
 class BaseIndicator:
     def __init__(self):
-        pass
+        self._value = None
 
     def calculate(self, data):
         raise NotImplementedError("Subclass must implement abstract method")
+
+    def update(self, new_value):
+        # Streaming counterpart of calculate(): consume one new close in O(1) and return the latest value
+        raise NotImplementedError("Subclass must implement abstract method")
+
+    def reset(self):
+        self._value = None
+
+    @property
+    def value(self):
+        # Latest streaming value, None until enough data has been seen
+        return self._value
@@ -1,41 +1,82 @@
 
 import numpy as np
 from indicators.base_indicator import BaseIndicator
+from indicators.technical_indicators import rolling_mean_std
 
 class BollingerBands(BaseIndicator):
     def __init__(self, period=20, std_dev=2):
         super().__init__()
         self.period = period
         self.std_dev = std_dev
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self._window = np.empty(self.period)
+        self._head = 0
+        self._count = 0
+        self._shift = 0.0
+        self._sum = 0.0
+        self._sum_sq = 0.0
 
     def calculate(self, data):
-        close_prices = np.array(data)
-        
-        # Calculate middle band (simple moving average)
-        middle_band = np.convolve(close_prices, np.ones(self.period), 'valid') / self.period
+        # (upper, middle, lower) for 1-D prices, or for every row of a 2-D (symbols x bars) array
+        middle_band, rolling_std = rolling_mean_std(data, self.period)
+        return middle_band + rolling_std * self.std_dev, middle_band, middle_band - rolling_std * self.std_dev
 
-        # Calculate standard deviation
-        rolling_std = np.std([close_prices[i:i+self.period] for i in range(len(close_prices)-self.period+1)], axis=1)
+    def calculate_all(self, data):
+        '''
+        Bands, bandwidth and %B from a single pass over the prices.
+        '''
+        close_prices = np.asarray(data, dtype=np.float64)
+        upper_band, middle_band, lower_band = self.calculate(close_prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bandwidth = (upper_band - lower_band) / middle_band
+            percent_b = (close_prices - lower_band) / (upper_band - lower_band)
+        return {'upper': upper_band, 'middle': middle_band, 'lower': lower_band,
+                'bandwidth': bandwidth, 'percent_b': percent_b}
 
-        # Calculate upper and lower bands
-        upper_band = middle_band + (rolling_std * self.std_dev)
-        lower_band = middle_band - (rolling_std * self.std_dev)
+    def update(self, new_value):
+        # Rolling sum and sum of squares over a ring buffer. Sums are kept relative to a shift
+        # close to the window mean to limit cancellation, and rebuilt from the buffer every time
+        # the ring wraps so rounding drift stays bounded (amortized O(1)).
+        if self._count == self.period:
+            old = self._window[self._head] - self._shift
+            self._sum -= old
+            self._sum_sq -= old * old
+        else:
+            self._count += 1
+            if self._count == 1:
+                self._shift = new_value
+        self._window[self._head] = new_value
+        new = new_value - self._shift
+        self._sum += new
+        self._sum_sq += new * new
+        self._head = (self._head + 1) % self.period
 
-        # Pad the beginning of the bands to match the input data length
-        padding = np.array([np.nan] * (len(close_prices) - len(middle_band)))
-        middle_band = np.concatenate((padding, middle_band))
-        upper_band = np.concatenate((padding, upper_band))
-        lower_band = np.concatenate((padding, lower_band))
+        if self._count < self.period:
+            return None
+        if self._head == 0:
+            self._shift = self._window.mean()
+            centered = self._window - self._shift
+            self._sum = centered.sum()
+            self._sum_sq = (centered * centered).sum()
 
-        return upper_band, middle_band, lower_band
+        mean = self._sum / self.period
+        variance = max(self._sum_sq / self.period - mean * mean, 0.0)
+        middle = self._shift + mean
+        std = np.sqrt(variance)
+        self._value = (middle + std * self.std_dev, middle, middle - std * self.std_dev)
+        return self._value
 
-    def get_signal(self, data):
-        close_prices = np.array(data)
-        upper_band, middle_band, lower_band = self.calculate(close_prices)
+    def get_signal(self, data, bands=None):
+        # bands: a calculate_all() result for data, to avoid computing it again
+        close_prices = np.asarray(data, dtype=np.float64)
+        bands = bands or self.calculate_all(close_prices)
 
         last_close = close_prices[-1]
-        last_upper = upper_band[-1]
-        last_lower = lower_band[-1]
+        last_upper = bands['upper'][-1]
+        last_lower = bands['lower'][-1]
 
         if last_close > last_upper:
             return 'SELL'
@@ -45,12 +86,7 @@ class BollingerBands(BaseIndicator):
             return 'NEUTRAL'
 
     def get_bandwidth(self, data):
-        upper_band, middle_band, lower_band = self.calculate(data)
-        bandwidth = (upper_band - lower_band) / middle_band
-        return bandwidth
+        return self.calculate_all(data)['bandwidth']
 
     def get_percent_b(self, data):
-        close_prices = np.array(data)
-        upper_band, _, lower_band = self.calculate(close_prices)
-        percent_b = (close_prices - lower_band) / (upper_band - lower_band)
-        return percent_b
+        return self.calculate_all(data)['percent_b']
@@ -0,0 +1,144 @@
+
+from typing import Callable, Dict, Iterable, List, Sequence
+import numpy as np
+import pandas as pd
+from indicators.rsi import wilder_rsi
+from indicators.technical_indicators import calculate_ema, calculate_rolling_std, calculate_rsi, calculate_sma
+
+# Symbols per kernel call: blocks of about this many values stay in cache, unlike the whole matrix
+BLOCK_VALUES = 1 << 16
+
+def _blocks(prices: np.ndarray):
+    step = max(1, BLOCK_VALUES // max(prices.shape[-1], 1))
+    for start in range(0, len(prices), step):
+        yield slice(start, start + step)
+
+def sma_grid(prices: np.ndarray, windows: Sequence[int]) -> np.ndarray:
+    '''
+    Every window's SMA from a single cumulative sum: (symbols x bars) in, (symbols x windows x bars) out.
+    '''
+    prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+    result = np.full((prices.shape[0], len(windows), prices.shape[-1]), np.nan)
+    if not prices.shape[-1]:
+        return result
+    for block in _blocks(prices):
+        # Centered on each row's mean to keep the cumulative sums small
+        shift = prices[block].mean(axis=-1, keepdims=True)
+        cumsum = np.concatenate([np.zeros(shift.shape), np.cumsum(prices[block] - shift, axis=-1)], axis=-1)
+        for position, window in enumerate(windows):
+            window = int(window)
+            if window <= prices.shape[-1]:
+                result[block, position, window - 1:] = (cumsum[:, window:] - cumsum[:, :-window]) / window + shift
+    return result
+
+def _stacked(function: Callable) -> Callable:
+    # Grid kernel from a 2-D-capable indicator: one call per block of symbols and parameter
+    def grid(prices: np.ndarray, periods: Sequence) -> np.ndarray:
+        prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+        result = np.empty((prices.shape[0], len(periods), prices.shape[-1]))
+        for block in _blocks(prices):
+            for position, period in enumerate(periods):
+                result[block, position] = function(prices[block], period)
+        return result
+    return grid
+
+# name -> function(prices, period), for 1-D or (symbols x bars) closes
+INDICATORS: Dict[str, Callable] = {
+    'sma': calculate_sma,
+    'ema': calculate_ema,
+    'std': calculate_rolling_std,
+    'rsi': calculate_rsi,
+    'rsi_wilder': wilder_rsi,
+}
+
+# name -> kernel(prices, periods) returning (symbols x periods x bars)
+GRID_KERNELS: Dict[str, Callable] = {name: _stacked(function) for name, function in INDICATORS.items()}
+GRID_KERNELS['sma'] = sma_grid
+
+def shared_indicator(strategy, data: pd.DataFrame, name: str, period, column: str = 'close') -> np.ndarray:
+    '''
+    Indicator column for a strategy's precompute(): read from the IndicatorEngine the
+    optimizer attached as strategy.indicators when it covers data, computed otherwise.
+    '''
+    engine = getattr(strategy, 'indicators', None)
+    if engine is not None and engine.covers(data, column):
+        return engine.get(name, period)
+    return INDICATORS[name](data[column].to_numpy(dtype=np.float64), period)
+
+class IndicatorEngine:
+    '''
+    Indicators of a (symbols x bars) price matrix for many parameters at once.
+
+    compute(name, periods) runs the grid kernel over every symbol and period in
+    one call and returns a (symbols x periods x bars) array; each (name, period)
+    it covers is then served by get() without recomputation, so a parameter
+    search or several strategies can share one precomputed grid. get() on a
+    period that was never computed runs the kernel for that period alone, and
+    keeps it only while fewer than max_cached periods are held, so searches over
+    continuous parameters do not grow the engine without bound.
+    '''
+    def __init__(self, prices, symbols: List[str] = None, max_cached: int = None):
+        if isinstance(prices, pd.DataFrame):
+            # Columns are symbols, rows are bars
+            symbols = symbols or list(prices.columns)
+            prices = prices.to_numpy(dtype=np.float64).T
+        prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+        prices.flags.writeable = False
+        self.prices = prices
+        self.symbols = symbols or list(range(len(prices)))
+        self._rows = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self._grids: Dict[tuple, np.ndarray] = {}
+        # (name, period) -> (grid, position of the period in the grid)
+        self._index: Dict[tuple, tuple] = {}
+        self.max_cached = max_cached
+        self.stats = {'computed': 0, 'hits': 0}
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, column: str = 'close', symbol: str = None,
+                   max_cached: int = None) -> 'IndicatorEngine':
+        # Single-symbol engine over one OHLCV column, as used by the backtester
+        return cls(data[column].to_numpy(dtype=np.float64), symbols=[symbol or column], max_cached=max_cached)
+
+    def covers(self, data: pd.DataFrame, column: str = 'close') -> bool:
+        # Whether a single-symbol engine was built from exactly these bars: a full compare,
+        # O(bars) against the O(bars) indicator computations it lets the caller skip
+        if len(self.prices) != 1 or self.prices.shape[-1] != len(data) or not len(data):
+            return False
+        return np.array_equal(data[column].to_numpy(dtype=np.float64), self.prices[0], equal_nan=True)
+
+    def compute(self, name: str, periods: Iterable) -> np.ndarray:
+        periods = tuple(periods)
+        key = (name, periods)
+        if key not in self._grids:
+            grid = GRID_KERNELS[name](self.prices, periods)
+            grid.flags.writeable = False
+            self._grids[key] = grid
+            self.stats['computed'] += len(periods)
+            for position, period in enumerate(periods):
+                self._index[(name, period)] = (grid, position)
+        return self._grids[key]
+
+    def get(self, name: str, period, symbol=None) -> np.ndarray:
+        '''
+        Read-only values of one indicator for symbol (the first one by default).
+        '''
+        row = self._rows[symbol] if symbol is not None else 0
+        if (name, period) in self._index:
+            self.stats['hits'] += 1
+        elif self.max_cached is not None and len(self._index) >= self.max_cached:
+            self.stats['computed'] += 1
+            return GRID_KERNELS[name](self.prices[row:row + 1], (period,))[0, 0]
+        else:
+            self.compute(name, (period,))
+        grid, position = self._index[(name, period)]
+        return grid[row, position]
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._index
+
+    def precompute(self, grid: Dict[str, Iterable]):
+        # {name: periods} as returned by a strategy's indicator_grid(param_grid)
+        for name, periods in grid.items():
+            missing = [period for period in dict.fromkeys(periods) if (name, period) not in self._index]
+            if missing:
+                self.compute(name, missing)
@@ -4,9 +4,17 @@ import pandas as pd
 
 class MACD(BaseIndicator):
     def __init__(self, fast_period=12, slow_period=26, signal_period=9):
+        super().__init__()
         self.fast_period = fast_period
         self.slow_period = slow_period
         self.signal_period = signal_period
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self._fast_ema = None
+        self._slow_ema = None
+        self._signal_ema = None
 
     def calculate(self, data):
         fast_ema = data['close'].ewm(span=self.fast_period, adjust=False).mean()
@@ -19,3 +27,25 @@ class MACD(BaseIndicator):
             'signal': signal_line,
             'histogram': histogram
         })
+
+    def update(self, new_value):
+        # Three chained EMAs with the same recursion as ewm(adjust=False), seeded with the first value
+        if self._fast_ema is None:
+            self._fast_ema = self._slow_ema = new_value
+            macd_line = self._signal_ema = 0.0
+        else:
+            self._fast_ema = self._ema_step(self._fast_ema, new_value, self.fast_period)
+            self._slow_ema = self._ema_step(self._slow_ema, new_value, self.slow_period)
+            macd_line = self._fast_ema - self._slow_ema
+            self._signal_ema = self._ema_step(self._signal_ema, macd_line, self.signal_period)
+        self._value = {
+            'macd': macd_line,
+            'signal': self._signal_ema,
+            'histogram': macd_line - self._signal_ema
+        }
+        return self._value
+
+    @staticmethod
+    def _ema_step(previous, new_value, span):
+        alpha = 2 / (span + 1)
+        return previous + alpha * (new_value - previous)
@@ -2,36 +2,122 @@
 import numpy as np
 from indicators.base_indicator import BaseIndicator
 
-class RSI(BaseIndicator):
-    def __init__(self, period=14):
-        super().__init__()
-        self.period = period
+# Optional accelerators for the Wilder smoothing recursion: Numba compiles the
+# reference loop, SciPy's lfilter runs it as a first-order IIR filter.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
 
-    def calculate(self, data):
-        close_prices = np.array(data)
-        deltas = np.diff(close_prices)
-        seed = deltas[:self.period+1]
-        up = seed[seed >= 0].sum()/self.period
-        down = -seed[seed < 0].sum()/self.period
-        rs = up/down
-        rsi = np.zeros_like(close_prices)
-        rsi[:self.period] = 100. - 100./(1. + rs)
-
-        for i in range(self.period, len(close_prices)):
-            delta = deltas[i - 1]
+def _seed(deltas: np.ndarray, period: int):
+    # Average gain and loss of the first period + 1 deltas, divided by period (as the original loop did)
+    seed = deltas[..., :period + 1]
+    up = np.where(seed >= 0, seed, 0.).sum(axis=-1) / period
+    down = -np.where(seed < 0, seed, 0.).sum(axis=-1) / period
+    return up, down
+
+def _rsi_loop(deltas, period, up, down, rsi):
+    # Reference implementation; compiled by Numba when available
+    for row in range(rsi.shape[0]):
+        row_up = up[row]
+        row_down = down[row]
+        for i in range(period, rsi.shape[1]):
+            delta = deltas[row, i - 1]
             if delta > 0:
                 upval = delta
                 downval = 0.
             else:
                 upval = 0.
                 downval = -delta
+            row_up = (row_up*(period-1) + upval)/period
+            row_down = (row_down*(period-1) + downval)/period
+            rsi[row, i] = 100. - 100./(1. + row_up/row_down)
+
+_rsi_numba = njit(cache=True)(_rsi_loop) if njit is not None else None
+
+def _rsi_lfilter(deltas, period, up, down, rsi):
+    # up_i = up_{i-1} * (period - 1) / period + upval_i / period, with up_{-1} given by the seed
+    tail = deltas[:, period - 1:rsi.shape[1] - 1]
+    decay = (period - 1) / period
+    coefficients = ([1 / period], [1., -decay])
+    smoothed_up, _ = lfilter(*coefficients, np.where(tail > 0, tail, 0.), axis=-1, zi=(decay * up)[:, None])
+    smoothed_down, _ = lfilter(*coefficients, np.where(tail > 0, 0., -tail), axis=-1, zi=(decay * down)[:, None])
+    rsi[:, period:] = 100. - 100./(1. + smoothed_up/smoothed_down)
+
+RSI_BACKENDS = {'python': _rsi_loop}
+if lfilter is not None:
+    RSI_BACKENDS['lfilter'] = _rsi_lfilter
+if _rsi_numba is not None:
+    RSI_BACKENDS['numba'] = _rsi_numba
+
+def default_rsi_backend() -> str:
+    return 'numba' if 'numba' in RSI_BACKENDS else 'lfilter' if 'lfilter' in RSI_BACKENDS else 'python'
 
-            up = (up*(self.period-1) + upval)/self.period
-            down = (down*(self.period-1) + downval)/self.period
-            rs = up/down
-            rsi[i] = 100. - 100./(1. + rs)
+def wilder_rsi(data, period: int = 14, backend: str = None) -> np.ndarray:
+    '''
+    Wilder RSI of a 1-D price series, or of every row of a 2-D (symbols x bars) array.
+    backend is 'numba', 'lfilter' or 'python' (the reference loop); by default the
+    fastest available one. lfilter matches the loop to floating point rounding.
+    '''
+    close_prices = np.asarray(data, dtype=np.float64)
+    single = close_prices.ndim == 1
+    close_prices = np.atleast_2d(close_prices)
+    deltas = np.ascontiguousarray(np.diff(close_prices, axis=-1))
+    rsi = np.zeros_like(close_prices)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        up, down = _seed(deltas, period)
+        rsi[:, :period] = (100. - 100./(1. + up/down))[:, None]
+        if close_prices.shape[1] > period:
+            RSI_BACKENDS[backend or default_rsi_backend()](deltas, period, up, down, rsi)
+    return rsi[0] if single else rsi
+
+class RSI(BaseIndicator):
+    def __init__(self, period=14):
+        super().__init__()
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self._last_price = None
+        self._seed = []
+        self._up = None
+        self._down = None
+
+    def calculate(self, data):
+        # 1-D prices, or a 2-D (symbols x bars) array computed row by row in one call
+        return wilder_rsi(data, self.period)
+
+    def update(self, new_value):
+        if self._last_price is not None:
+            delta = new_value - self._last_price
+            if self._up is None:
+                # Same seed as calculate(): the first period + 1 deltas averaged over period
+                self._seed.append(delta)
+                if len(self._seed) == self.period + 1:
+                    seed = np.array(self._seed)
+                    self._up = seed[seed >= 0].sum()/self.period
+                    self._down = -seed[seed < 0].sum()/self.period
+                    # calculate() starts Wilder smoothing at deltas[period - 1], so the last two seed deltas are applied again
+                    self._smooth(seed[-2])
+                    self._smooth(seed[-1])
+                    self._seed = []
+            else:
+                self._smooth(np.float64(delta))
+        self._last_price = new_value
+        return self._value
 
-        return rsi
+    def _smooth(self, delta):
+        upval = delta if delta > 0 else 0.
+        downval = 0. if delta > 0 else -delta
+        self._up = (self._up*(self.period-1) + upval)/self.period
+        self._down = (self._down*(self.period-1) + downval)/self.period
+        rs = self._up/self._down
+        self._value = 100. - 100./(1. + rs)
 
     def get_signal(self, data, overbought=70, oversold=30):
         rsi_values = self.calculate(data)
@@ -0,0 +1,95 @@
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+# Array counterparts of the streaming indicator classes: each function takes a 1-D
+# array (or a Series, in which case a Series with the same index is returned), or
+# a 2-D (symbols x bars) array computed row by row, and returns the indicator for
+# every bar, NaN until enough bars have been seen.
+
+def _as_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+def _like(values, result: np.ndarray):
+    if isinstance(values, pd.Series):
+        return pd.Series(result, index=values.index, name=values.name)
+    return result
+
+def _cumsum(prices: np.ndarray) -> np.ndarray:
+    # Cumulative sums along the last axis with a leading 0, so window sums are c[w:] - c[:-w]
+    return np.concatenate([np.zeros(prices.shape[:-1] + (1,)), np.cumsum(prices, axis=-1)], axis=-1)
+
+def calculate_sma(values, window: int):
+    prices = _as_array(values)
+    result = np.full(prices.shape, np.nan)
+    if prices.shape[-1] >= window:
+        cumsum = _cumsum(prices)
+        result[..., window - 1:] = (cumsum[..., window:] - cumsum[..., :-window]) / window
+    return _like(values, result)
+
+def calculate_ema(values, span: float):
+    # Recursive EMA seeded with the first price (pandas ewm(adjust=False))
+    prices = _as_array(values)
+    if lfilter is not None and prices.shape[-1]:
+        alpha = 2 / (span + 1)
+        result, _ = lfilter([alpha], [1., alpha - 1], prices, axis=-1, zi=(1 - alpha) * prices[..., :1])
+    else:
+        result = pd.DataFrame(np.atleast_2d(prices).T).ewm(span=span, adjust=False).mean().to_numpy().T.reshape(prices.shape)
+    return _like(values, result)
+
+def rolling_mean_std(values, window: int, ddof: int = 0, chunk: int = 1024):
+    '''
+    Rolling mean and standard deviation along the last axis of a 1-D or 2-D (symbols x bars)
+    array in O(n), NaN for the first window - 1 bars. Window sums are differences of cumulative
+    sums, taken over chunks of `chunk` windows re-centered on their own mean, so the rounding
+    error depends on the chunk size and the local spread rather than the series length.
+    '''
+    prices = _as_array(values)
+    mean = np.full(prices.shape, np.nan)
+    std = np.full(prices.shape, np.nan)
+    windows = prices.shape[-1] - window + 1
+    if windows <= 0:
+        return mean, std
+    chunk = min(chunk, windows)
+    chunks = -(-windows // chunk)
+    padding = chunks * chunk - windows
+    if padding:
+        prices = np.concatenate([prices, np.repeat(prices[..., -1:], padding, axis=-1)], axis=-1)
+    # (..., chunks, chunk + window - 1) overlapping views, then one centered copy
+    spans = np.lib.stride_tricks.sliding_window_view(prices, chunk + window - 1, axis=-1)[..., ::chunk, :]
+    shift = spans.mean(axis=-1, keepdims=True)
+    centered = spans - shift
+    zeros = np.zeros(centered.shape[:-1] + (1,))
+    sums = np.cumsum(np.concatenate([zeros, centered], axis=-1), axis=-1)
+    squares = np.cumsum(np.concatenate([zeros, centered * centered], axis=-1), axis=-1)
+    window_sum = sums[..., window:] - sums[..., :-window]
+    window_squares = squares[..., window:] - squares[..., :-window]
+    window_mean = window_sum / window
+    variance = np.maximum(window_squares - window_sum * window_mean, 0) / (window - ddof)
+    shape = prices.shape[:-1] + (chunks * chunk,)
+    mean[..., window - 1:] = (window_mean + shift).reshape(shape)[..., :windows]
+    std[..., window - 1:] = np.sqrt(variance).reshape(shape)[..., :windows]
+    return mean, std
+
+def calculate_rolling_std(values, window: int, ddof: int = 1):
+    return _like(values, rolling_mean_std(values, window, ddof)[1])
+
+def calculate_rsi(values, period: int = 14):
+    # RSI over simple averages of the gains and losses of the last period bars (the first bar counts as no change)
+    prices = _as_array(values)
+    deltas = np.diff(prices, prepend=prices[..., :1], axis=-1)
+    gain = calculate_sma(np.clip(deltas, 0, None), period)
+    loss = calculate_sma(np.clip(-deltas, 0, None), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = 100 - 100 / (1 + gain / loss)
+    return _like(values, result)
+
+def calculate_bollinger_bands(values, window: int = 20, num_std: float = 2):
+    # (upper, middle, lower)
+    middle, std = rolling_mean_std(values, window, ddof=1)
+    return _like(values, middle + std * num_std), _like(values, middle), _like(values, middle - std * num_std)
@@ -0,0 +1,44 @@
+
+import time
+import numpy as np
+import pandas as pd
+from core.records import ColumnStore
+
+class EquityCurve(ColumnStore):
+    '''
+    Portfolio valuations as growable (timestamp, equity) columns. The running
+    peak, the current drawdown and the worst drawdown so far are updated on each
+    record(), so reading them never rescans the history.
+    '''
+    COLUMNS = (('timestamp', np.int64), ('equity', np.float64))
+
+    def __init__(self, capacity: int = 1024):
+        super().__init__(capacity)
+        self.peak = float('-inf')
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+
+    def record(self, equity: float, timestamp: int = None) -> int:
+        row = self._next_row()
+        self._columns['timestamp'][row] = timestamp if timestamp is not None else time.time_ns() // 1_000_000
+        self._columns['equity'][row] = equity
+        if equity > self.peak:
+            self.peak = equity
+        self.drawdown = (self.peak - equity) / self.peak if self.peak > 0 else 0.0
+        if self.drawdown > self.max_drawdown:
+            self.max_drawdown = self.drawdown
+        return row
+
+    def last(self) -> float:
+        return float(self._columns['equity'][self._length - 1]) if self._length else None
+
+    def values(self) -> np.ndarray:
+        return self.column('equity')
+
+    def to_frame(self) -> pd.DataFrame:
+        equity = self.values()
+        peak = np.maximum.accumulate(equity) if len(equity) else equity
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown = np.where(peak > 0, (peak - equity) / peak, 0.0)
+        return pd.DataFrame({'equity': equity, 'peak': peak, 'drawdown': drawdown},
+                            index=pd.to_datetime(self.column('timestamp'), unit='ms').rename('timestamp'))
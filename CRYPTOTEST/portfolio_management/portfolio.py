@@ -1,43 +1,103 @@
 
-from typing import Dict
+import time
+from typing import Dict, List
 import pandas as pd
+import numpy as np
+from core.records import Fill, Order, Signal, TradeLog
+from portfolio_management.ledger import EquityCurve
 
 class Portfolio:
-    def __init__(self):
+    '''
+    Cash, open positions and their ledger: fills in a columnar TradeLog and
+    every valuation in an EquityCurve that tracks peak and drawdown as it grows.
+    Positions are valued from a per-symbol last-price table, so a valuation
+    costs O(open positions) whatever the length of the history. Listeners
+    (e.g. a RiskManager) get on_fill(fill), on_price(symbol, price) and
+    on_mark(equity) as they happen.
+    '''
+    def __init__(self, initial_balance: float = 0):
         self.positions: Dict[str, float] = {}
-        self.balance: float = 0
-        self.trade_history: list = []
-        self.value_history: list = []
+        self.entry_prices: Dict[str, float] = {}
+        self.balance: float = initial_balance
+        self.trade_history = TradeLog()
+        self.equity = EquityCurve()
+        self.last_prices: Dict[str, float] = {}
+        self.listeners: list = []
+
+    def subscribe(self, listener):
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    @property
+    def value_history(self) -> np.ndarray:
+        return self.equity.values()
+
+    def mark(self, symbol: str, price: float):
+        # Latest known price of a symbol, used by the next valuation
+        self.last_prices[symbol] = price
+        for listener in self.listeners:
+            listener.on_price(symbol, price)
 
     def update_status(self, exchange_data):
-        total_value = self.balance
-        for symbol, amount in self.positions.items():
+        for symbol in self.positions:
             latest_price = exchange_data.get_latest_price(symbol)
             if latest_price is not None:
-                total_value += amount * latest_price
-        self.trade_history.append({'timestamp': pd.Timestamp.now(), 'total_value': total_value})
-        self.value_history.append(total_value)
+                self.mark(symbol, latest_price)
+        self.update_value_history()
         
-    def execute_trade(self, signal):
-        symbol = signal['symbol']
-        amount = signal['amount']
-        price = signal['price']
-        if signal['action'] == 'buy':
+    def execute_trade(self, signal, timestamp: int = None) -> Fill:
+        # signal: a Signal, or a dict with 'action' (or 'side'/'type'), 'symbol', 'amount' and 'price'
+        signal = Signal.coerce(signal)
+        symbol = signal.symbol
+        amount = signal.amount
+        price = signal.price
+        profit = None
+        if amount is None or not amount > 0:
+            # A zero buy on a flat symbol would divide by zero in the entry price below
+            raise ValueError(f"Trade amount must be positive, got {amount}")
+        if signal.action == 'buy':
             cost = amount * price
             if cost <= self.balance:
-                self.positions[symbol] = self.positions.get(symbol, 0) + amount
+                current_position = self.positions.get(symbol, 0)
+                # Keep a volume-weighted entry price so sells can report realized profit
+                self.entry_prices[symbol] = (self.entry_prices.get(symbol, 0) * current_position + cost) / (current_position + amount)
+                self.positions[symbol] = current_position + amount
                 self.balance -= cost
             else:
                 raise ValueError("Insufficient balance for this trade")
-        elif signal['action'] == 'sell':
+        elif signal.action == 'sell':
             current_position = self.positions.get(symbol, 0)
             if amount <= current_position:
-                self.positions[symbol] = current_position - amount
                 self.balance += amount * price
+                profit = (price - self.entry_prices.get(symbol, price)) * amount
+                if amount == current_position:
+                    # Closed positions leave the table so valuations only walk open ones
+                    del self.positions[symbol]
+                    self.entry_prices.pop(symbol, None)
+                else:
+                    self.positions[symbol] = current_position - amount
             else:
                 raise ValueError("Insufficient position for this trade")
-        self.trade_history.append({'timestamp': pd.Timestamp.now(), 'action': signal['action'], 'symbol': symbol, 'amount': amount, 'price': price})
-        self.update_value_history()
+        else:
+            raise ValueError(f"Cannot execute a '{signal.action}' signal")
+        if timestamp is None:
+            timestamp = time.time_ns() // 1_000_000
+        fill = Fill(symbol, signal.action, amount, price, timestamp=timestamp, profit=profit)
+        self.trade_history.append(fill)
+        self.last_prices[symbol] = price
+        for listener in self.listeners:
+            listener.on_fill(fill)
+        self.update_value_history(timestamp)
+        return fill
+
+    def update(self, order, timestamp: int = None) -> Fill:
+        # Orders coming from the engine/backtester use 'side' instead of 'action'
+        order = Order.coerce(order)
+        return self.execute_trade(Signal(order.symbol, order.side, order.price, order.amount), timestamp)
 
     def get_position(self, symbol):
         return self.positions.get(symbol, 0)
@@ -45,12 +105,17 @@ class Portfolio:
     def get_balance(self):
         return self.balance
 
+    def get_trade_history(self) -> List[Fill]:
+        # Closed trades only, i.e. the sells that realized a profit or loss
+        return [self.trade_history[row] for row in self.trade_history.closed()]
+
+    def get_historical_values(self) -> np.ndarray:
+        return self.equity.values()
+
     def calculate_returns(self):
-        if len(self.trade_history) < 2:
+        if len(self.equity) < 2:
             return pd.Series()
-        df = pd.DataFrame(self.trade_history)
-        df.set_index('timestamp', inplace=True)
-        returns = df['total_value'].pct_change()
+        returns = self.equity.to_frame()['equity'].pct_change()
         return returns.dropna()
 
     def get_total_value(self, exchange_data):
@@ -61,18 +126,26 @@ class Portfolio:
                 total_value += amount * latest_price
         return total_value
 
-    def calculate_drawdown(self):
-        if not self.value_history:
-            return 0
-        peak = max(self.value_history)
-        current_value = self.value_history[-1]
-        return (peak - current_value) / peak
+    def calculate_drawdown(self) -> float:
+        # Current drawdown from the running peak
+        return self.equity.drawdown
 
-    def update_value_history(self):
+    def get_value(self) -> float:
         total_value = self.balance
         for symbol, amount in self.positions.items():
-            # Assuming we have the latest price in the trade history
-            latest_trade = next((trade for trade in reversed(self.trade_history) if trade['symbol'] == symbol), None)
-            if latest_trade:
-                total_value += amount * latest_trade['price']
-        self.value_history.append(total_value)
+            price = self.last_prices.get(symbol)
+            if price is not None:
+                total_value += amount * price
+        return total_value
+
+    def update_value_history(self, timestamp: int = None):
+        equity = self.get_value()
+        self.equity.record(equity, timestamp)
+        for listener in self.listeners:
+            listener.on_mark(equity)
+
+    def trades_frame(self) -> pd.DataFrame:
+        return self.trade_history.to_frame()
+
+    def equity_frame(self) -> pd.DataFrame:
+        return self.equity.to_frame()
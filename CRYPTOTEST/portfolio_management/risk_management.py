@@ -1,47 +1,219 @@
 
-from typing import Dict
+import time
+from typing import Dict, List
+from core.records import Signal
 from utils.logging_config import setup_logging
-import numpy as np
+from utils.metrics import MetricsRegistry
 
 class RiskManager:
-    def __init__(self, max_position_size: float, stop_loss_pct: float, take_profit_pct: float, max_drawdown_pct: float = 0.2, max_risk_per_trade: float = 0.02):
+    '''
+    Pre-trade checks against running state rather than the portfolio's history.
+    The manager binds to the portfolio it is asked about (once, reading its
+    positions and equity curve) and is then told of every fill, price mark and
+    valuation, keeping per-symbol position and exposure, the open-position
+    count, and the peak equity and drawdowns. Each check is then O(1).
+    '''
+    def __init__(self, max_position_size: float = 1.0, stop_loss_pct: float = 0.02, take_profit_pct: float = 0.04, max_drawdown_pct: float = 0.2, max_risk_per_trade: float = 0.02,
+                 max_spread_bps: float = None, max_slippage_bps: float = None, order_books: Dict = None,
+                 max_open_positions: int = None, metrics: MetricsRegistry = None):
         self.logger = setup_logging()
         self.max_position_size = max_position_size
         self.stop_loss_pct = stop_loss_pct
         self.take_profit_pct = take_profit_pct
         self.max_drawdown_pct = max_drawdown_pct
         self.max_risk_per_trade = max_risk_per_trade
+        # Liquidity checks read the locally maintained books (symbol -> LocalOrderBook), never the network
+        self.max_spread_bps = max_spread_bps
+        self.max_slippage_bps = max_slippage_bps
+        self.order_books = order_books if order_books is not None else {}
+        self.max_open_positions = max_open_positions
+
+        # Running state, fed by the bound portfolio through on_fill(), on_price() and on_mark()
+        self.portfolio = None
+        self.positions: Dict[str, float] = {}
+        self.exposure: Dict[str, float] = {}
+        self.peak_equity = float('-inf')
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+
+        self.metrics = metrics or MetricsRegistry()
+        check_seconds = self.metrics.histogram('risk_check_seconds', "check_risk(s) latency per call", ('call',))
+        self._single_seconds = check_seconds.labels('check_risk')
+        self._batch_seconds = check_seconds.labels('check_risks')
+        checks_total = self.metrics.counter('risk_checks_total', "Signals checked, by outcome", ('result',))
+        self._approved = checks_total.labels('approved')
+        self._rejected = checks_total.labels('rejected')
+
+    @property
+    def open_positions(self) -> int:
+        return len(self.positions)
+
+    def bind(self, portfolio: 'Portfolio'):
+        '''
+        Loads the portfolio's current state (O(open positions)) and subscribes to its
+        fills and valuations. Done implicitly by the first check against a new portfolio.
+        '''
+        if self.portfolio is not None:
+            self.portfolio.unsubscribe(self)
+        self.portfolio = portfolio
+        self.positions = {symbol: amount for symbol, amount in portfolio.positions.items() if amount}
+        self.exposure = {symbol: amount * portfolio.last_prices.get(symbol, portfolio.entry_prices.get(symbol, 0))
+                         for symbol, amount in self.positions.items()}
+        equity = portfolio.equity
+        self.peak_equity = equity.peak
+        self.drawdown = equity.drawdown
+        self.max_drawdown = equity.max_drawdown
+        portfolio.subscribe(self)
+
+    def on_fill(self, fill):
+        position = self.positions.get(fill.symbol, 0) + (fill.amount if fill.side == 'buy' else -fill.amount)
+        if position:
+            self.positions[fill.symbol] = position
+            self.exposure[fill.symbol] = position * fill.price
+        else:
+            self.positions.pop(fill.symbol, None)
+            self.exposure.pop(fill.symbol, None)
+
+    def on_price(self, symbol: str, price: float):
+        position = self.positions.get(symbol)
+        if position:
+            self.exposure[symbol] = position * price
+
+    def on_mark(self, equity: float):
+        if equity > self.peak_equity:
+            self.peak_equity = equity
+        self.drawdown = (self.peak_equity - equity) / self.peak_equity if self.peak_equity > 0 else 0.0
+        if self.drawdown > self.max_drawdown:
+            self.max_drawdown = self.drawdown
+
+    def _bound(self, portfolio: 'Portfolio'):
+        if portfolio is not None and portfolio is not self.portfolio:
+            self.bind(portfolio)
+        elif self.portfolio is None:
+            raise ValueError("RiskManager has no portfolio to check against: pass portfolio= to the check "
+                             "or call bind(portfolio) first")
+
+    def get_state(self) -> Dict:
+        return {
+            'peak_equity': self.peak_equity,
+            'drawdown': self.drawdown,
+            'max_drawdown': self.max_drawdown,
+            'open_positions': self.open_positions,
+            'positions': dict(self.positions),
+            'exposure': dict(self.exposure),
+            'total_exposure': sum(self.exposure.values())
+        }
+
+    def get_position_size(self, symbol: str) -> float:
+        # Room left under max_position_size for symbol
+        return float(max(self.max_position_size - self.positions.get(symbol, 0), 0))
+
+    def check_risk(self, signal: Signal, portfolio: 'Portfolio' = None, exchange_data=None) -> bool:
+        # exchange_data is accepted for older callers; prices come from the portfolio's fills and marks
+        start = time.perf_counter()
+        approved = self._check_risk(signal, portfolio)
+        self._single_seconds.record(time.perf_counter() - start)
+        (self._approved if approved else self._rejected).inc()
+        return approved
+
+    def _check_risk(self, signal: Signal, portfolio: 'Portfolio') -> bool:
+        self._bound(portfolio)
+        # Check maximum drawdown
+        if self.check_max_drawdown():
+            self.logger.warning(f"Maximum drawdown reached")
+            return False
+        signal = Signal.coerce(signal)
+        return self._check_signal(signal, self.positions.get(signal.symbol, 0), self.open_positions)
+
+    def check_risks(self, signals: List[Signal], portfolio: 'Portfolio' = None) -> List[bool]:
+        '''
+        Checks a batch of signals (one strategy cycle) against the same state. The drawdown
+        is evaluated once for the batch, and signals approved earlier in the batch count
+        toward the position and open-position limits of later ones.
+        '''
+        if not signals:
+            return []
+        start = time.perf_counter()
+        results = self._check_risks(signals, portfolio)
+        self._batch_seconds.record(time.perf_counter() - start)
+        approved = sum(results)
+        self._approved.inc(approved)
+        self._rejected.inc(len(results) - approved)
+        return results
+
+    def _check_risks(self, signals: List[Signal], portfolio: 'Portfolio') -> List[bool]:
+        self._bound(portfolio)
+        if self.check_max_drawdown():
+            self.logger.warning(f"Maximum drawdown reached")
+            return [False] * len(signals)
+        pending: Dict[str, float] = {}
+        # Positions opened by signals approved earlier in the batch, kept as a running count
+        opened = 0
+        results = []
+        for signal in signals:
+            signal = Signal.coerce(signal)
+            symbol = signal.symbol
+            position = self.positions.get(symbol, 0)
+            before = pending.get(symbol, 0)
+            approved = self._check_signal(signal, position + before, self.open_positions + opened)
+            if approved:
+                # Sells approved earlier in the batch free room for later buys
+                after = before + (signal.amount if signal.action == 'buy' else -signal.amount)
+                pending[symbol] = after
+                if symbol not in self.positions:
+                    opened += bool(after) - bool(before)
+            results.append(approved)
+        return results
+
+    def _check_signal(self, signal: Signal, current_position: float, open_positions: int) -> bool:
+        symbol = signal.symbol
 
-    def check_risk(self, signal: Dict, portfolio: 'Portfolio') -> bool:
-        symbol = signal['symbol']
-        current_position = portfolio.get_position(symbol)
-        
         # Check if the position size respects the limit
-        if current_position['amount'] + signal['amount'] > self.max_position_size:
+        if current_position + signal.amount > self.max_position_size:
             self.logger.warning(f"Position size limit exceeded for {symbol}")
             return False
 
+        # Check if a new position fits under the open-position limit
+        if self.max_open_positions is not None and not current_position and open_positions >= self.max_open_positions:
+            self.logger.warning(f"Open position limit reached, cannot open {symbol}")
+            return False
+
         # Check if the trade respects the risk management rules
         if not self.check_risk_reward_ratio(signal):
             self.logger.warning(f"Risk-reward ratio not met for {symbol}")
             return False
 
-        # Check maximum drawdown
-        if self.check_max_drawdown(portfolio):
-            self.logger.warning(f"Maximum drawdown reached")
-            return False
-
         # Check if the risk per trade is within limits
-        if not self.check_risk_per_trade(signal, portfolio):
+        if not self.check_risk_per_trade(signal, self.portfolio):
             self.logger.warning(f"Risk per trade limit exceeded for {symbol}")
             return False
 
+        # Check if the book can absorb the order
+        if not self.check_liquidity(signal):
+            self.logger.warning(f"Insufficient liquidity for {symbol}")
+            return False
+
+        return True
+
+    def check_liquidity(self, signal: Signal) -> bool:
+        book = self.order_books.get(signal.symbol)
+        if book is None or not book.synced:
+            # No local book for this symbol: nothing to check against
+            return True
+        if self.max_spread_bps is not None:
+            spread = book.spread_bps()
+            if spread is None or spread > self.max_spread_bps:
+                return False
+        if self.max_slippage_bps is not None:
+            side = 'asks' if signal.action == 'buy' else 'bids'
+            if book.depth(self.max_slippage_bps, side) < signal.amount:
+                return False
         return True
 
-    def check_risk_reward_ratio(self, signal: Dict) -> bool:
-        entry_price = signal['price']
-        stop_loss = self.calculate_stop_loss(entry_price, signal['type'])
-        take_profit = self.calculate_take_profit(entry_price, signal['type'])
+    def check_risk_reward_ratio(self, signal: Signal) -> bool:
+        entry_price = signal.price
+        stop_loss = self.calculate_stop_loss(entry_price, signal.type)
+        take_profit = self.calculate_take_profit(entry_price, signal.type)
 
         risk = abs(entry_price - stop_loss)
         reward = abs(take_profit - entry_price)
@@ -74,23 +246,17 @@ class RiskManager:
         
         return new_stop_loss
 
-    def check_max_drawdown(self, portfolio: 'Portfolio') -> bool:
-        historical_values = portfolio.get_historical_values()
-        if len(historical_values) < 2:
-            return False
-
-        peak = np.maximum.accumulate(historical_values)
-        drawdown = (peak - historical_values) / peak
-        max_drawdown = np.max(drawdown)
-
-        return max_drawdown > self.max_drawdown_pct
+    def check_max_drawdown(self, portfolio: 'Portfolio' = None) -> bool:
+        # Worst drawdown since the peak, kept up to date by on_mark()
+        self._bound(portfolio)
+        return self.max_drawdown > self.max_drawdown_pct
 
-    def check_risk_per_trade(self, signal: Dict, portfolio: 'Portfolio') -> bool:
+    def check_risk_per_trade(self, signal: Signal, portfolio: 'Portfolio') -> bool:
         account_balance = portfolio.get_balance()
-        entry_price = signal['price']
-        stop_loss = self.calculate_stop_loss(entry_price, signal['type'])
+        entry_price = signal.price
+        stop_loss = self.calculate_stop_loss(entry_price, signal.type)
         
-        risk_amount = abs(entry_price - stop_loss) * signal['amount']
+        risk_amount = abs(entry_price - stop_loss) * signal.amount
         risk_percentage = risk_amount / account_balance
 
         return risk_percentage <= self.max_risk_per_trade
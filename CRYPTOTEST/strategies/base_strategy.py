@@ -1,5 +1,5 @@
 
-from abc import ABC, abstractmethod
+from abc import ABC
 import logging
 
 class BaseStrategy(ABC):
@@ -8,21 +8,22 @@ class BaseStrategy(ABC):
         self.exchange_data = exchange_data
         self.historical_data = historical_data
         self.portfolio = portfolio
-        self.logger = logging.getLogger(self.__class__.__name__)
+        # Under TradingBot so strategy lines go through the queued, rate-limited handlers
+        self.logger = logging.getLogger(f'TradingBot.{self.__class__.__name__}')
 
-    @abstractmethod
     async def analyze(self, symbol, timeframe):
         '''
         Analyse les données de marché et renvoie un signal de trading.
+        Par défaut, les signaux de generate_signals pour ce symbole, calculés sur un instantané du marché.
         '''
-        pass
+        return [signal for signal in self.generate_signals(self.exchange_data) if signal['symbol'] == symbol]
 
-    @abstractmethod
     async def generate_signal(self, analysis_result):
         '''
         Génère un signal de trading basé sur l'analyse.
+        Par défaut, le dernier signal de l'analyse, ou None.
         '''
-        pass
+        return analysis_result[-1] if analysis_result else None
 
     async def execute(self, symbol, timeframe):
         '''
@@ -32,6 +33,20 @@ class BaseStrategy(ABC):
         signal = await self.generate_signal(analysis_result)
         return signal
 
+    def precompute(self, data):
+        '''
+        Pré-calcule les colonnes d'indicateurs sur tout l'historique pour le backtest vectorisé.
+        Renvoie un dictionnaire {nom: tableau NumPy de même longueur que data}.
+        '''
+        return {}
+
+    def on_bar(self, cursor):
+        '''
+        Génère les signaux pour la bougie courante d'un backtest vectorisé.
+        Par défaut, délègue à generate_signals avec une vue de l'historique jusqu'à la bougie courante.
+        '''
+        return self.generate_signals(cursor.frame())
+
     def get_parameter(self, name, default=None):
         '''
         Récupère un paramètre de configuration de la stratégie.
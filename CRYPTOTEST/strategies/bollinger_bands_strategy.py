@@ -1,6 +1,8 @@
 
-import pandas as pd
-import numpy as np
+from core.records import Signal
+from data.market_snapshot import MarketSnapshot
+from indicators.indicator_engine import shared_indicator
+from indicators.technical_indicators import calculate_bollinger_bands
 from strategies.base_strategy import BaseStrategy
 
 class BollingerBandsStrategy(BaseStrategy):
@@ -9,48 +11,44 @@ class BollingerBandsStrategy(BaseStrategy):
         self.num_std = num_std
 
     def calculate_bollinger_bands(self, data):
-        rolling_mean = data['close'].rolling(window=self.window).mean()
-        rolling_std = data['close'].rolling(window=self.window).std()
-        upper_band = rolling_mean + (rolling_std * self.num_std)
-        lower_band = rolling_mean - (rolling_std * self.num_std)
+        upper_band, _, lower_band = calculate_bollinger_bands(data['close'], self.window, self.num_std)
         return upper_band, lower_band
 
     def generate_signals(self, exchange_data):
         signals = []
-        for symbol, data in exchange_data.data.items():
-            print(f"Processing symbol: {symbol}")
-            print(f"Data length: {len(data)}")
-            if len(data) >= self.window:
-                upper_band, lower_band = self.calculate_bollinger_bands(data)
-                last_close = data['close'].iloc[-1]
-                last_upper = upper_band.iloc[-1]
-                last_lower = lower_band.iloc[-1]
-                print(f"Last close: {last_close}, Upper band: {last_upper}, Lower band: {last_lower}")
+        snapshot = MarketSnapshot.from_source(exchange_data)
+        for symbol in snapshot.symbols():
+            if snapshot.bars(symbol) >= self.window:
+                # Mean and deviation are cached per cycle, so other strategies on the same window reuse them
+                rolling_mean = snapshot.indicator(symbol, 'sma', self.window)[-1]
+                rolling_std = snapshot.indicator(symbol, 'std', self.window)[-1]
+                last_close = snapshot.get_latest_price(symbol)
+                last_upper = rolling_mean + rolling_std * self.num_std
+                last_lower = rolling_mean - rolling_std * self.num_std
 
                 if last_close > last_upper:
-                    print("Generating sell signal")
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'sell',
-                        'price': last_close,
-                        'amount': 1  # This should be calculated based on available balance and risk management
-                    })
+                    signals.append(Signal(symbol, 'sell', last_close, 1))  # This should be calculated based on available balance and risk management
                 elif last_close < last_lower:
-                    print("Generating buy signal")
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'buy',
-                        'price': last_close,
-                        'amount': 1  # This should be calculated based on available balance and risk management
-                    })
+                    signals.append(Signal(symbol, 'buy', last_close, 1))  # This should be calculated based on available balance and risk management
                 else:
-                    print("Generating hold signal")
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'hold',
-                        'price': last_close,
-                        'amount': 0
-                    })
-
-        print(f"Total signals generated: {len(signals)}")
+                    signals.append(Signal(symbol, 'hold', last_close, 0))
+
         return signals
+
+    def precompute(self, data):
+        rolling_mean = shared_indicator(self, data, 'sma', self.window)
+        rolling_std = shared_indicator(self, data, 'std', self.window)
+        return {
+            'upper_band': rolling_mean + rolling_std * self.num_std,
+            'lower_band': rolling_mean - rolling_std * self.num_std
+        }
+
+    def on_bar(self, cursor):
+        if len(cursor) < self.window:
+            return []
+        last_close = cursor.value('close')
+        if last_close > cursor.value('upper_band'):
+            return [Signal(cursor.symbol, 'sell', last_close, 1)]
+        if last_close < cursor.value('lower_band'):
+            return [Signal(cursor.symbol, 'buy', last_close, 1)]
+        return [Signal(cursor.symbol, 'hold', last_close, 0)]
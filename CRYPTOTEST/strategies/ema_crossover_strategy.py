@@ -1,53 +1,57 @@
 
 import logging
-import pandas as pd
+import numpy as np
+from core.records import Signal
+from data.market_snapshot import MarketSnapshot
+from indicators.indicator_engine import shared_indicator
 from strategies.base_strategy import BaseStrategy
-from indicators.technical_indicators import calculate_ema
 
 class EMACrossoverStrategy(BaseStrategy):
     def __init__(self, short_window=12, long_window=26):
         self.short_window = short_window
         self.long_window = long_window
-        self.logger = logging.getLogger(__name__)
+        self.logger = logging.getLogger(f'TradingBot.{self.__class__.__name__}')
 
     def generate_signals(self, exchange_data):
         signals = []
-        for symbol, data in exchange_data.data.items():
-            self.logger.info(f"Generating signals for {symbol}")
-            self.logger.info(f"Data length: {len(data)}")
-            if len(data) >= self.long_window:
-                short_ema = calculate_ema(data['close'], self.short_window)
-                long_ema = calculate_ema(data['close'], self.long_window)
-                
-                # Calculate the EMA crossover
-                crossover = pd.Series(short_ema > long_ema, index=data.index)
-                crossover_changes = crossover.diff()
-                
-                self.logger.info(f"Last short EMA: {short_ema.iloc[-1]}, Last long EMA: {long_ema.iloc[-1]}")
-                
-                # Generate buy signal when short EMA crosses above long EMA
-                buy_signals = crossover_changes[crossover_changes == True]
-                for timestamp in buy_signals.index:
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'buy',
-                        'price': data.loc[timestamp, 'close'],
-                        'amount': 1  # This should be calculated based on available balance and risk management
-                    })
-                    self.logger.info(f"Generated buy signal for {symbol} at {timestamp}")
-                
-                # Generate sell signal when short EMA crosses below long EMA
-                sell_signals = crossover_changes[crossover_changes == False]
-                for timestamp in sell_signals.index:
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'sell',
-                        'price': data.loc[timestamp, 'close'],
-                        'amount': 1  # This should be calculated based on current position
-                    })
-                    self.logger.info(f"Generated sell signal for {symbol} at {timestamp}")
+        snapshot = MarketSnapshot.from_source(exchange_data)
+        for symbol in snapshot.symbols():
+            self.logger.debug("Generating signals for %s", symbol)
+            if snapshot.bars(symbol) >= self.long_window:
+                short_ema = snapshot.indicator(symbol, 'ema', self.short_window)
+                long_ema = snapshot.indicator(symbol, 'ema', self.long_window)
+                last_price = snapshot.get_latest_price(symbol)
+
+                # +1 when the short EMA crossed above the long one on the last bar, -1 when it crossed below;
+                # earlier crossings were reported on their own bar
+                above = (short_ema[-2:] > long_ema[-2:]).astype(np.int8)
+                crossover = above[-1] - above[0]
+
+                self.logger.debug("Last short EMA: %s, Last long EMA: %s", short_ema[-1], long_ema[-1])
+
+                if crossover == 1:
+                    signals.append(Signal(symbol, 'buy', last_price, 1))  # This should be calculated based on available balance and risk management
+                    self.logger.debug("Generated buy signal for %s", symbol)
+                elif crossover == -1:
+                    signals.append(Signal(symbol, 'sell', last_price, 1))  # This should be calculated based on current position
+                    self.logger.debug("Generated sell signal for %s", symbol)
             else:
-                self.logger.warning(f"Not enough data for {symbol} to generate signals")
+                self.logger.warning("Not enough data for %s to generate signals", symbol)
         
-        self.logger.info(f"Total signals generated: {len(signals)}")
+        self.logger.debug("Total signals generated: %d", len(signals))
         return signals
+
+    def precompute(self, data):
+        above = shared_indicator(self, data, 'ema', self.short_window) > shared_indicator(self, data, 'ema', self.long_window)
+        # +1 on the bar where the short EMA crosses above the long one, -1 where it crosses below
+        return {'ema_cross': np.diff(above.astype(np.int8), prepend=above[:1].astype(np.int8))}
+
+    def on_bar(self, cursor):
+        if len(cursor) < self.long_window:
+            return []
+        crossover = cursor.value('ema_cross')
+        if crossover == 1:
+            return [Signal(cursor.symbol, 'buy', cursor.value('close'), 1)]
+        if crossover == -1:
+            return [Signal(cursor.symbol, 'sell', cursor.value('close'), 1)]
+        return []
@@ -1,4 +1,5 @@
 
+from core.records import Signal
 from strategies.base_strategy import BaseStrategy
 from indicators.macd import MACD
 from indicators.adx import ADX
@@ -22,29 +23,25 @@ class MomentumStrategy(BaseStrategy):
         
         # Conditions d'entrée
         if macd_line[-1] > signal_line[-1] and macd_line[-2] <= signal_line[-2] and adx_values[-1] > self.adx_threshold:
-            signals.append({
-                'type': 'BUY',
-                'symbol': self.symbol,
-                'price': close_prices[-1],
-                'timestamp': data[-1]['timestamp'],
-                'metadata': {
+            signals.append(Signal(
+                self.symbol, 'buy', close_prices[-1],
+                timestamp=data[-1]['timestamp'],
+                metadata={
                     'macd': macd_line[-1],
                     'signal': signal_line[-1],
                     'adx': adx_values[-1]
                 }
-            })
+            ))
         elif macd_line[-1] < signal_line[-1] and macd_line[-2] >= signal_line[-2] and adx_values[-1] > self.adx_threshold:
-            signals.append({
-                'type': 'SELL',
-                'symbol': self.symbol,
-                'price': close_prices[-1],
-                'timestamp': data[-1]['timestamp'],
-                'metadata': {
+            signals.append(Signal(
+                self.symbol, 'sell', close_prices[-1],
+                timestamp=data[-1]['timestamp'],
+                metadata={
                     'macd': macd_line[-1],
                     'signal': signal_line[-1],
                     'adx': adx_values[-1]
                 }
-            })
+            ))
         
         return signals
 
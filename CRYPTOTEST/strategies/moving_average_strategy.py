@@ -1,5 +1,7 @@
 
-import numpy as np
+from core.records import Signal
+from data.market_snapshot import MarketSnapshot
+from indicators.indicator_engine import shared_indicator
 from .base_strategy import BaseStrategy
 
 class MovingAverageStrategy(BaseStrategy):
@@ -9,26 +11,34 @@ class MovingAverageStrategy(BaseStrategy):
 
     def generate_signals(self, exchange_data):
         signals = []
-        for symbol, data in exchange_data.data.items():
-            if len(data) >= self.long_window:
-                short_ma = np.mean(data['close'][-self.short_window:])
-                long_ma = np.mean(data['close'][-self.long_window:])
+        snapshot = MarketSnapshot.from_source(exchange_data)
+        for symbol in snapshot.symbols():
+            if snapshot.bars(symbol) >= self.long_window:
+                short_ma = snapshot.indicator(symbol, 'sma', self.short_window)[-1]
+                long_ma = snapshot.indicator(symbol, 'sma', self.long_window)[-1]
                 
-                last_price = data['close'].iloc[-1]
+                last_price = snapshot.get_latest_price(symbol)
                 
                 if short_ma > long_ma:
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'buy',
-                        'price': last_price,
-                        'amount': 1  # This should be calculated based on available balance and risk management
-                    })
+                    signals.append(Signal(symbol, 'buy', last_price, 1))  # This should be calculated based on available balance and risk management
                 elif short_ma < long_ma:
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'sell',
-                        'price': last_price,
-                        'amount': 1  # This should be calculated based on current position
-                    })
+                    signals.append(Signal(symbol, 'sell', last_price, 1))  # This should be calculated based on current position
         
         return signals
+
+    def precompute(self, data):
+        return {
+            'short_ma': shared_indicator(self, data, 'sma', self.short_window),
+            'long_ma': shared_indicator(self, data, 'sma', self.long_window)
+        }
+
+    def on_bar(self, cursor):
+        if len(cursor) < self.long_window:
+            return []
+        short_ma = cursor.value('short_ma')
+        long_ma = cursor.value('long_ma')
+        if short_ma > long_ma:
+            return [Signal(cursor.symbol, 'buy', cursor.value('close'), 1)]
+        if short_ma < long_ma:
+            return [Signal(cursor.symbol, 'sell', cursor.value('close'), 1)]
+        return []
@@ -1,6 +1,8 @@
 
-import numpy as np
-import pandas as pd
+from core.records import Signal
+from data.market_snapshot import MarketSnapshot
+from indicators.indicator_engine import shared_indicator
+from indicators.technical_indicators import calculate_rsi
 from strategies.base_strategy import BaseStrategy
 
 class RSIStrategy(BaseStrategy):
@@ -10,33 +12,33 @@ class RSIStrategy(BaseStrategy):
         self.overbought_threshold = overbought_threshold
 
     def calculate_rsi(self, data):
-        delta = data['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=self.rsi_period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=self.rsi_period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
+        return calculate_rsi(data['close'], self.rsi_period)
 
     def generate_signals(self, exchange_data):
         signals = []
-        for symbol, data in exchange_data.data.items():
-            if len(data) >= self.rsi_period:
-                rsi = self.calculate_rsi(data)
-                last_rsi = rsi.iloc[-1]
-                last_price = data['close'].iloc[-1]
+        snapshot = MarketSnapshot.from_source(exchange_data)
+        for symbol in snapshot.symbols():
+            if snapshot.bars(symbol) >= self.rsi_period:
+                # Shared with every other strategy of the cycle asking for the same RSI
+                last_rsi = snapshot.indicator(symbol, 'rsi', self.rsi_period)[-1]
+                last_price = snapshot.get_latest_price(symbol)
 
                 if last_rsi < self.oversold_threshold:
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'buy',
-                        'price': last_price,
-                        'amount': 1  # This should be calculated based on available balance and risk management
-                    })
+                    signals.append(Signal(symbol, 'buy', last_price, 1))  # This should be calculated based on available balance and risk management
                 elif last_rsi > self.overbought_threshold:
-                    signals.append({
-                        'symbol': symbol,
-                        'action': 'sell',
-                        'price': last_price,
-                        'amount': 1  # This should be calculated based on current position
-                    })
+                    signals.append(Signal(symbol, 'sell', last_price, 1))  # This should be calculated based on current position
 
         return signals
+
+    def precompute(self, data):
+        return {'rsi': shared_indicator(self, data, 'rsi', self.rsi_period)}
+
+    def on_bar(self, cursor):
+        if len(cursor) < self.rsi_period:
+            return []
+        last_rsi = cursor.value('rsi')
+        if last_rsi < self.oversold_threshold:
+            return [Signal(cursor.symbol, 'buy', cursor.value('close'), 1)]
+        if last_rsi > self.overbought_threshold:
+            return [Signal(cursor.symbol, 'sell', cursor.value('close'), 1)]
+        return []
@@ -1,14 +1,16 @@
 
 from typing import Dict
 from .base_strategy import BaseStrategy
-from crypto_trading_bot.core.exchange_handler import ExchangeHandler
-from crypto_trading_bot.core.risk_manager import RiskManager
-from crypto_trading_bot.utils.logger import BotLogger
+from core.exchange_handler import ExchangeHandler
+from portfolio_management.portfolio import Portfolio
+from portfolio_management.risk_management import RiskManager
 import pandas as pd
 
 class ScalpingStrategy(BaseStrategy):
-    def __init__(self, symbol: str, config: Dict, exchange_handler: ExchangeHandler = None, risk_manager: RiskManager = None):
-        super().__init__(symbol, config)
+    def __init__(self, symbol: str, config: Dict, exchange_handler: ExchangeHandler = None, risk_manager: RiskManager = None,
+                 portfolio: Portfolio = None):
+        super().__init__(config, None, None, portfolio)
+        self.symbol = symbol
         self.exchange_handler = exchange_handler
         self.risk_manager = risk_manager
         self.last_price = None
@@ -16,12 +18,12 @@ class ScalpingStrategy(BaseStrategy):
         self.profit_threshold = config.get('profit_threshold', 0.015)  # 1.5% profit target
         self.stop_loss_threshold = config.get('stop_loss_threshold', 0.03)  # 3% stop loss
         self.max_position_size = config.get('max_position_size', 1000)  # Maximum position size
-        self.logger = BotLogger().get_logger()
         self.rapid_change_threshold = 0.08  # 8% threshold for rapid price changes
         self.last_log_time = None
         self.log_interval = pd.Timedelta(minutes=5)
         self.trades_per_day = 0
         self.max_trades_per_day = config.get('max_trades_per_day', 50)  # Limit the number of trades per day
+        self.max_spread_bps = config.get('max_spread_bps', 10)  # Skip entries when the book is wider than this
 
     def process(self, data: Dict) -> Dict:
         current_price = data['close']
@@ -44,7 +46,7 @@ class ScalpingStrategy(BaseStrategy):
 
         action = None
         if self.position == 0 and self.trades_per_day < self.max_trades_per_day:
-            if abs(price_change) > self.profit_threshold:
+            if abs(price_change) > self.profit_threshold and self.spread_ok():
                 position_size = self.calculate_position_size(current_price)
                 if price_change > 0:
                     action = {'side': 'buy', 'amount': position_size, 'symbol': self.symbol}
@@ -61,9 +63,26 @@ class ScalpingStrategy(BaseStrategy):
         self.last_price = current_price
         return action
 
+    def spread_ok(self) -> bool:
+        # Reads the locally maintained book: no network call on the hot path
+        if self.exchange_handler is None:
+            return True
+        book = self.exchange_handler.local_order_book(self.symbol)
+        if book is None:
+            return True
+        spread = book.spread_bps()
+        if spread is not None and spread > self.max_spread_bps:
+            self.logger.debug(f"Spread {spread:.1f} bps above {self.max_spread_bps} bps, skipping entry")
+            return False
+        return True
+
     def calculate_position_size(self, price: float) -> float:
-        if self.risk_manager:
-            return min(self.risk_manager.calculate_position_size(price, price * (1 - self.stop_loss_threshold)), self.max_position_size)
+        # process() is synchronous: sizing goes through the portfolio's RiskManager, never an awaitable
+        portfolio = self.portfolio or (self.risk_manager.portfolio if self.risk_manager else None)
+        if self.risk_manager and portfolio is not None:
+            position_size = self.risk_manager.calculate_position_size(
+                portfolio.get_balance(), self.risk_manager.max_risk_per_trade, price, price * (1 - self.stop_loss_threshold))
+            return min(position_size, self.max_position_size)
         else:
             # Simplified position sizing for backtesting
             return min(100 / price, self.max_position_size)  # Assume we're willing to risk $100 per trade, but not more than max_position_size
@@ -1,4 +1,5 @@
 
+from core.records import Signal
 from strategies.base_strategy import BaseStrategy
 from indicators.macd import MACD
 from indicators.rsi import RSI
@@ -24,33 +25,29 @@ class SentimentMomentumStrategy(BaseStrategy):
         if macd[-1] > signal[-1] and macd[-2] <= signal[-2]:
             # Bullish MACD crossover
             if rsi[-1] < 70 and sentiment > self.sentiment_threshold:
-                signals.append({
-                    'type': 'BUY',
-                    'symbol': self.symbol,
-                    'price': close_prices[-1],
-                    'timestamp': data[-1]['timestamp'],
-                    'metadata': {
+                signals.append(Signal(
+                    self.symbol, 'buy', close_prices[-1],
+                    timestamp=data[-1]['timestamp'],
+                    metadata={
                         'macd': macd[-1],
                         'signal': signal[-1],
                         'rsi': rsi[-1],
                         'sentiment': sentiment
                     }
-                })
+                ))
         elif macd[-1] < signal[-1] and macd[-2] >= signal[-2]:
             # Bearish MACD crossover
             if rsi[-1] > 30 and sentiment < -self.sentiment_threshold:
-                signals.append({
-                    'type': 'SELL',
-                    'symbol': self.symbol,
-                    'price': close_prices[-1],
-                    'timestamp': data[-1]['timestamp'],
-                    'metadata': {
+                signals.append(Signal(
+                    self.symbol, 'sell', close_prices[-1],
+                    timestamp=data[-1]['timestamp'],
+                    metadata={
                         'macd': macd[-1],
                         'signal': signal[-1],
                         'rsi': rsi[-1],
                         'sentiment': sentiment
                     }
-                })
+                ))
 
         return signals
 
@@ -0,0 +1,19 @@
+
+import atexit
+import shutil
+import tempfile
+from utils.logging_config import setup_logging, shutdown_logging
+
+# The first setup_logging() call decides where every component logs: a scratch
+# directory for the test run, instead of the bot's own logs/
+LOG_DIR = tempfile.mkdtemp(prefix='cryptotest-logs-')
+
+def setup_test_logging():
+    return setup_logging(log_dir=LOG_DIR)
+
+@atexit.register
+def _remove_log_dir():
+    shutdown_logging()
+    shutil.rmtree(LOG_DIR, ignore_errors=True)
+
+setup_test_logging()
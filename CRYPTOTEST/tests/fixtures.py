@@ -0,0 +1,59 @@
+
+import numpy as np
+import pandas as pd
+from core.records import Signal
+from indicators.indicator_engine import shared_indicator
+
+class SMACrossover:
+    '''
+    Minimal strategy implementing both the DataFrame interface used by the loop mode
+    and the precompute/on_bar interface used by the vectorized mode.
+    '''
+    def __init__(self, symbol='BTC/USDT', short_window=10, long_window=30, amount=0.05):
+        self.symbol = symbol
+        self.short_window = short_window
+        self.long_window = long_window
+        self.amount = amount
+
+    def _signal(self, short_now, long_now, short_prev, long_prev, price):
+        if short_prev <= long_prev and short_now > long_now:
+            return [Signal(self.symbol, 'buy', price, self.amount)]
+        if short_prev >= long_prev and short_now < long_now:
+            return [Signal(self.symbol, 'sell', price, self.amount)]
+        return []
+
+    def generate_signals(self, data):
+        if len(data) <= self.long_window:
+            return []
+        close = data['close']
+        short_ma = close.rolling(self.short_window).mean()
+        long_ma = close.rolling(self.long_window).mean()
+        return self._signal(short_ma.iloc[-1], long_ma.iloc[-1], short_ma.iloc[-2], long_ma.iloc[-2], close.iloc[-1])
+
+    def precompute(self, data):
+        # Read from the optimizer's shared IndicatorEngine when one is attached
+        return {
+            'short_ma': shared_indicator(self, data, 'sma', self.short_window),
+            'long_ma': shared_indicator(self, data, 'sma', self.long_window)
+        }
+
+    def indicator_grid(self, param_grid):
+        windows = list(param_grid.get('short_window', [self.short_window])) + \
+            list(param_grid.get('long_window', [self.long_window]))
+        return {'sma': windows}
+
+    def on_bar(self, cursor):
+        if len(cursor) <= self.long_window:
+            return []
+        return self._signal(cursor.value('short_ma'), cursor.value('long_ma'),
+                            cursor.value('short_ma', 1), cursor.value('long_ma', 1), cursor.value('close'))
+
+def make_candles(n_bars, seed=42):
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.001, n_bars)))
+    index = pd.date_range('2023-01-01', periods=n_bars, freq='1min')
+    return pd.DataFrame({
+        'open': close, 'high': close * 1.001, 'low': close * 0.999, 'close': close,
+        'volume': rng.uniform(1, 10, n_bars)
+    }, index=index)
+
@@ -0,0 +1,189 @@
+
+import unittest
+from unittest import mock
+import numpy as np
+from analysis.backtester import Backtester
+from core.records import Signal
+from tests.fixtures import SMACrossover, make_candles
+from strategies.bollinger_bands_strategy import BollingerBandsStrategy
+from strategies.ema_crossover_strategy import EMACrossoverStrategy
+from strategies.moving_average_strategy import MovingAverageStrategy
+from strategies.rsi_strategy import RSIStrategy
+
+class FrameOnlyStrategy(SMACrossover):
+    on_bar = None
+    precompute = None
+
+class RoundedSMACrossover(SMACrossover):
+    # ParameterOptimizer samples floats
+    def __init__(self, short_window, long_window):
+        super().__init__(short_window=int(short_window), long_window=int(long_window))
+
+class TestBacktester(unittest.TestCase):
+    def setUp(self):
+        self.data = make_candles(600)
+        self.risk_params = {'max_position_size': 1, 'stop_loss_pct': 0.04, 'take_profit_pct': 0.1}
+
+    def run_backtest(self, strategy, mode):
+        backtester = Backtester(strategy, initial_balance=10000, risk_params=self.risk_params)
+        backtester.logger.disabled = True
+        return backtester.run(self.data, mode=mode)
+
+    def assertSameMetrics(self, expected, actual):
+        self.assertEqual(set(expected), set(actual))
+        for key in expected:
+            self.assertTrue(np.isclose(expected[key], actual[key], equal_nan=True), key)
+
+    def test_vectorized_matches_loop(self):
+        loop = self.run_backtest(SMACrossover(), 'loop')
+        vectorized = self.run_backtest(SMACrossover(), 'vectorized')
+        self.assertGreater(loop['total_trades'], 0)
+        self.assertSameMetrics(loop, vectorized)
+
+    def test_vectorized_falls_back_to_frame_prefix(self):
+        loop = self.run_backtest(FrameOnlyStrategy(), 'loop')
+        vectorized = self.run_backtest(FrameOnlyStrategy(), 'vectorized')
+        self.assertSameMetrics(loop, vectorized)
+
+    def test_cursor_columns_are_read_only(self):
+        seen = []
+
+        class Probe(SMACrossover):
+            def on_bar(self, cursor):
+                seen.append(cursor['close'])
+                return []
+
+        self.run_backtest(Probe(), 'vectorized')
+        self.assertEqual(len(seen[-1]), len(self.data))
+        with self.assertRaises(ValueError):
+            seen[-1][0] = 0
+
+    def test_repo_strategies_run_in_both_modes(self):
+        # Their unit amounts fit the risk limits on a ~100 price, and they read the frame through MarketSnapshot
+        self.data = make_candles(200)
+        self.data[['open', 'high', 'low', 'close']] /= 300
+        self.risk_params = dict(self.risk_params, max_position_size=5)
+        for strategy_class in (RSIStrategy, MovingAverageStrategy, BollingerBandsStrategy, EMACrossoverStrategy):
+            with self.subTest(strategy=strategy_class.__name__):
+                loop = self.run_backtest(strategy_class(), 'loop')
+                strategy = strategy_class()
+                # The vectorized mode must go through on_bar, not a frame per bar
+                strategy.generate_signals = mock.Mock(side_effect=AssertionError('generate_signals called'))
+                vectorized = self.run_backtest(strategy, 'vectorized')
+                self.assertNotEqual(loop['total_return'], 0)
+                self.assertSameMetrics(loop, vectorized)
+
+    def test_crossings_are_signalled_once(self):
+        strategy = EMACrossoverStrategy()
+        crossings = np.count_nonzero(strategy.precompute(self.data)['ema_cross'][strategy.long_window - 1:])
+        self.assertGreater(crossings, 0)
+        for mode in ('loop', 'vectorized'):
+            with self.subTest(mode=mode):
+                strategy = EMACrossoverStrategy()
+                counted = []
+                backtester = Backtester(strategy, initial_balance=10000, risk_params=self.risk_params)
+                backtester.logger.disabled = True
+                process_signals = backtester.process_signals
+                backtester.process_signals = lambda signals, price: counted.extend(signals) or process_signals(signals, price)
+                backtester.run(self.data, mode=mode)
+                self.assertEqual(len(counted), crossings)
+
+    def test_hold_signals_do_not_trade(self):
+        # Room under the position limit, so the risk stage alone would approve them
+        backtester = Backtester(SMACrossover(), initial_balance=10000, risk_params=dict(self.risk_params, max_position_size=10))
+        backtester.portfolio.execute_trade(Signal('BTC/USDT', 'buy', 100.0, 5))
+        backtester.process_signals([Signal('BTC/USDT', 'hold', 100.0, 0), Signal('BTC/USDT', 'buy', 100.0, 0)], 100.0)
+        self.assertEqual(backtester.portfolio.positions['BTC/USDT'], 5)
+        self.assertEqual(backtester.portfolio.balance, 9500)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            self.run_backtest(SMACrossover(), 'parallel')
+
+class TestParameterSearch(unittest.TestCase):
+    def setUp(self):
+        self.data = make_candles(800)
+        self.param_grid = {'short_window': [5, 8, 12], 'long_window': [20, 30, 40]}
+        self.backtester = Backtester(SMACrossover(), initial_balance=10000,
+                                     risk_params={'max_position_size': 1, 'stop_loss_pct': 0.04, 'take_profit_pct': 0.1})
+        self.backtester.logger.disabled = True
+
+    def test_parallel_matches_serial(self):
+        progress = []
+        serial = self.backtester.optimize_parameters(self.data, self.param_grid, seed=1)
+        parallel = self.backtester.optimize_parameters(self.data, self.param_grid, n_workers=2, seed=1,
+                                                       progress_callback=lambda done, total, *_: progress.append((done, total)))
+        self.assertEqual(serial, parallel)
+        self.assertEqual(progress[-1], (9, 9))
+        # The template strategy is never mutated by the search
+        self.assertEqual(self.backtester.strategy.short_window, 10)
+
+    def test_search_shares_indicator_engine(self):
+        from analysis.parallel_optimizer import build_indicator_engine
+        engine = build_indicator_engine(self.backtester.strategy, self.data, self.param_grid)
+        self.assertEqual(engine.stats['computed'], 6)
+        best = self.backtester.optimize_parameters(self.data, self.param_grid, seed=1)
+        # The shared columns give the same backtests as strategies computing their own
+        plain = Backtester(SMACrossover(**best), 10000, self.backtester.risk_params).run(self.data, mode='vectorized')
+        shared_strategy = SMACrossover(**best)
+        shared_strategy.indicators = engine
+        shared = Backtester(shared_strategy, 10000, self.backtester.risk_params).run(self.data, mode='vectorized')
+        self.assertEqual(plain['total_return'], shared['total_return'])
+        self.assertGreater(engine.stats['hits'], 0)
+
+    def test_memmap_frame_round_trip(self):
+        import tempfile
+        from analysis.parallel_optimizer import MemmapFrame
+        with tempfile.TemporaryDirectory() as directory:
+            loaded = MemmapFrame(self.data, directory).load()
+            np.testing.assert_array_equal(loaded.to_numpy(), self.data.to_numpy())
+            self.assertTrue(loaded.index.equals(self.data.index))
+
+    def test_early_stop(self):
+        seen = []
+        self.backtester.optimize_parameters(self.data, self.param_grid, n_workers=2,
+                                            stop_condition=lambda params, performance: seen.append(params) or True)
+        self.assertEqual(len(seen), 1)
+
+class TestParameterOptimizer(unittest.TestCase):
+    def make_optimizer(self):
+        from analysis.parameter_optimizer import ParameterOptimizer
+        optimizer = ParameterOptimizer(RoundedSMACrossover, make_candles(400), initial_balance=10000,
+                                       risk_params={'max_position_size': 1, 'stop_loss_pct': 0.04, 'take_profit_pct': 0.1},
+                                       precision=0)
+        optimizer.logger.disabled = True
+        return optimizer
+
+    def test_cache_and_generation_stats(self):
+        import random
+        random.seed(3)
+        optimizer = self.make_optimizer()
+        param_ranges = {'short_window': (3, 6), 'long_window': (20, 23)}
+        best = optimizer.optimize(param_ranges, population_size=10, generations=3)
+        self.assertEqual(set(best), set(param_ranges))
+        self.assertEqual(len(optimizer.generation_stats), 4)
+        # Rounded to whole windows there are only ~16 distinct individuals
+        self.assertGreater(optimizer.cache_hits, 0)
+        self.assertLessEqual(len(optimizer.fitness_cache), 25)
+
+    def test_cache_does_not_leak_between_runs(self):
+        import random
+        random.seed(3)
+        optimizer = self.make_optimizer()
+        optimizer.optimize({'short_window': (3, 6), 'long_window': (20, 23)}, population_size=10, generations=2)
+        # Same values, swapped names: fitnesses memoized by the first run no longer apply
+        optimizer.optimize({'long_window': (20, 23), 'short_window': (3, 6)}, population_size=10, generations=2)
+        for key, fitness in optimizer.fitness_cache.items():
+            self.assertEqual(fitness, optimizer.evaluate(list(key)))
+
+    def test_parallel_matches_serial(self):
+        import random
+        param_ranges = {'short_window': (3, 8), 'long_window': (20, 30)}
+        random.seed(5)
+        serial = self.make_optimizer().optimize(param_ranges, population_size=8, generations=2)
+        random.seed(5)
+        parallel = self.make_optimizer().optimize(param_ranges, population_size=8, generations=2, n_workers=2)
+        self.assertEqual(serial, parallel)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,595 @@
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+import pandas as pd
+from core.engine import TradingEngine
+from core.event_bus import CANDLE_CLOSED, TICKER_UPDATED, Event, EventBus
+from core.exchange_handler import ExchangeHandler, MockAsyncExchange
+from core.records import Fill, Order, Signal, TradeLog
+from core.rate_limiter import TokenBucketRateLimiter, PRIORITY_HIGH, PRIORITY_LOW
+from core.strategy_scheduler import StrategyScheduler
+from data.market_snapshot import MarketSnapshot
+from data.order_book import LocalOrderBook
+from portfolio_management.portfolio import Portfolio
+from portfolio_management.risk_management import RiskManager
+from utils.latency import LatencyHistogram
+from utils.logging_config import RateLimitFilter, get_logging_stats, setup_logging, shutdown_logging
+from utils.metrics import MetricsRegistry, MetricsServer
+from utils.profiler import SamplingProfiler
+from tests import setup_test_logging
+
+class TestTokenBucketRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_burst_then_steady_rate(self):
+        limiter = TokenBucketRateLimiter(rate=50, capacity=5)
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire('fetch_ticker') for _ in range(15)))
+        elapsed = time.monotonic() - start
+        # 5 tokens are available up front, the other 10 arrive at 50/s
+        self.assertGreater(elapsed, 0.18)
+        self.assertLess(elapsed, 0.5)
+
+    async def test_endpoint_weights(self):
+        limiter = TokenBucketRateLimiter(rate=100, capacity=10)
+        await limiter.acquire('fetch_order_book')
+        self.assertAlmostEqual(limiter.tokens, 5, delta=0.5)
+        with self.assertRaises(ValueError):
+            await limiter.acquire('custom', weight=11)
+
+    async def test_default_capacity_fits_every_endpoint(self):
+        # fetch_balance weighs 10: a bucket of `rate` tokens alone could never hold it
+        limiter = TokenBucketRateLimiter(rate=2)
+        self.assertEqual(limiter.capacity, 10)
+        self.assertEqual(await limiter.acquire('fetch_balance'), 0.0)
+        self.assertEqual(TokenBucketRateLimiter(rate=50).capacity, 50)
+
+    async def test_orders_jump_ahead_of_market_data(self):
+        limiter = TokenBucketRateLimiter(rate=20, capacity=1)
+        await limiter.acquire('fetch_ticker')
+        served = []
+
+        async def request(name, endpoint):
+            await limiter.acquire(endpoint)
+            served.append(name)
+
+        polls = [asyncio.create_task(request(f"poll{i}", 'fetch_ticker')) for i in range(3)]
+        await asyncio.sleep(0)
+        order = asyncio.create_task(request('order', 'create_order'))
+        await asyncio.gather(order, *polls)
+        self.assertEqual(served[0], 'order')
+        self.assertEqual(served[1:], ['poll0', 'poll1', 'poll2'])
+
+    async def test_queued_time_statistics(self):
+        limiter = TokenBucketRateLimiter(rate=20, capacity=1)
+        await asyncio.gather(*(limiter.acquire('fetch_ohlcv', priority=PRIORITY_LOW) for _ in range(3)))
+        await limiter.acquire('cancel_order', priority=PRIORITY_HIGH)
+        stats = limiter.get_stats()['endpoints']
+        self.assertEqual(stats['fetch_ohlcv']['requests'], 3)
+        self.assertEqual(stats['fetch_ohlcv']['queued'], 2)
+        self.assertGreater(stats['fetch_ohlcv']['max_queued_time'], 0.04)
+        self.assertGreater(stats['cancel_order']['avg_queued_time'], 0)
+
+    async def test_cancelled_waiter_releases_queue(self):
+        limiter = TokenBucketRateLimiter(rate=20, capacity=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        queued = await limiter.acquire()
+        self.assertLess(queued, 0.1)
+
+class TestExchangeHandler(unittest.IsolatedAsyncioTestCase):
+    async def test_requests_go_through_rate_limiter(self):
+        handler = ExchangeHandler({'name': 'mock', 'rate_limit': {'rate': 100, 'capacity': 10}}, exchange=MockAsyncExchange(latency=0))
+        await handler.get_order_book('BTC/USDT')
+        await handler.get_ticker('BTC/USDT')
+        stats = handler.get_rate_limit_stats()['endpoints']
+        self.assertEqual(stats['fetch_order_book']['requests'], 1)
+        self.assertEqual(stats['fetch_ticker']['requests'], 1)
+
+    async def test_ccxt_throttle_is_disabled(self):
+        handler = ExchangeHandler({'name': 'binance', 'api_key': 'key', 'secret_key': 'secret'})
+        try:
+            self.assertFalse(handler.exchange.enableRateLimit)
+        finally:
+            await handler.close()
+
+    async def test_order_book_snapshot_feeds_local_book(self):
+        exchange = MockAsyncExchange(latency=0)
+        handler = ExchangeHandler({'name': 'mock'}, exchange=exchange)
+        self.assertIsNone(handler.local_order_book('BTC/USDT'))
+        snapshot = await handler.get_order_book('BTC/USDT')
+        book = handler.local_order_book('BTC/USDT')
+        self.assertEqual(book.best_bid(), snapshot['bids'][0][0])
+        self.assertEqual(book.spread(), 1.0)
+        self.assertEqual(exchange.requests, 1)
+
+    async def test_requests_timed_by_endpoint_and_status(self):
+        class DownExchange(MockAsyncExchange):
+            async def fetch_balance(self):
+                raise ConnectionError("exchange down")
+
+        metrics = MetricsRegistry()
+        handler = ExchangeHandler({'name': 'mock'}, exchange=DownExchange(latency=0), metrics=metrics)
+        await handler.get_order_book('BTC/USDT')
+        self.assertEqual(await handler.get_balance(), {})
+        requests = metrics.get('exchange_request_seconds')
+        self.assertEqual(requests.labels('fetch_order_book', 'ok').count, 1)
+        self.assertEqual(requests.labels('fetch_balance', 'error').count, 1)
+
+class SleepyStrategy:
+    def __init__(self, name, delay, signals=(), cpu_bound=True):
+        self.name = name
+        self.delay = delay
+        self.signals = list(signals)
+        self.cpu_bound = cpu_bound
+
+    def generate_signals(self, snapshot):
+        time.sleep(self.delay)
+        return self.signals
+
+class BusyStrategy:
+    # Spins for `duration` seconds per symbol of the snapshot
+    def __init__(self, name, duration):
+        self.name = name
+        self.duration = duration
+
+    def generate_signals(self, snapshot):
+        for symbol in snapshot.symbols():
+            end = time.thread_time() + self.duration
+            while time.thread_time() < end:
+                pass
+        return []
+
+class FailingStrategy:
+    def generate_signals(self, snapshot):
+        raise RuntimeError('boom')
+
+class TestStrategyScheduler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.portfolio = Portfolio(10000)
+        self.risk_manager = RiskManager(max_position_size=1, stop_loss_pct=0.04, take_profit_pct=0.1)
+        self.placed = []
+        self.snapshot = MarketSnapshot({'BTC/USDT': pd.DataFrame({'close': [100.0, 101.0]})})
+
+    async def slow_order(self, signal):
+        await asyncio.sleep(0.1)
+        self.placed.append(signal)
+        return {'symbol': signal['symbol'], 'side': signal['action'], 'amount': signal['amount'], 'price': signal['price']}
+
+    async def test_cpu_bound_strategies_and_orders_run_concurrently(self):
+        scheduler = StrategyScheduler(self.risk_manager, self.portfolio, self.slow_order, max_workers=4)
+        strategies = [SleepyStrategy(f"s{i}", 0.1, [{'symbol': 'BTC/USDT', 'action': 'buy', 'amount': 0.1}]) for i in range(3)]
+        start = time.perf_counter()
+        orders = await scheduler.run_cycle(strategies + [FailingStrategy()], lambda: self.snapshot)
+        elapsed = time.perf_counter() - start
+        scheduler.close()
+
+        # Three 0.1s strategies then three 0.1s orders would take 0.6s back to back
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(len(orders), 3)
+        self.assertEqual(self.placed[0]['price'], 101.0)
+        self.assertEqual(self.placed[0]['type'], 'BUY')
+        self.assertAlmostEqual(self.portfolio.get_position('BTC/USDT'), 0.3)
+        stats = scheduler.get_latency_stats()
+        self.assertEqual(stats['stages']['cycle']['count'], 1)
+        self.assertGreater(stats['stages']['orders']['max'], 0.09)
+        self.assertEqual(set(stats['strategies']), {'s0', 's1', 's2', 'FailingStrategy'})
+
+    async def test_batch_risk_counts_earlier_approvals(self):
+        scheduler = StrategyScheduler(self.risk_manager, self.portfolio, self.slow_order)
+        signals = [{'symbol': 'BTC/USDT', 'action': 'buy', 'price': 100.0, 'amount': 0.6}]
+        strategies = [SleepyStrategy('a', 0, signals, cpu_bound=False), SleepyStrategy('b', 0, signals, cpu_bound=False)]
+        orders = await scheduler.run_cycle(strategies, lambda: self.snapshot)
+        scheduler.close()
+        self.assertEqual(len(orders), 1)
+        self.assertEqual(self.placed[0]['strategy'], 'a')
+
+    async def test_hold_and_empty_signals_never_reach_the_executor(self):
+        scheduler = StrategyScheduler(self.risk_manager, self.portfolio, self.slow_order)
+        signals = [Signal('BTC/USDT', 'hold', 100.0, 0), {'symbol': 'BTC/USDT', 'action': 'buy', 'amount': 0},
+                   {'symbol': 'BTC/USDT', 'action': 'sell', 'amount': -1}, {'symbol': 'BTC/USDT', 'action': 'buy', 'amount': 0.2}]
+        orders = await scheduler.run_cycle([SleepyStrategy('mixed', 0, signals, cpu_bound=False)], lambda: self.snapshot)
+        scheduler.close()
+        self.assertEqual([(signal.action, signal.amount) for signal in self.placed], [('buy', 0.2)])
+        self.assertEqual(len(orders), 1)
+
+    async def test_cycle_metrics_share_one_registry(self):
+        metrics = MetricsRegistry()
+        risk_manager = RiskManager(max_position_size=1, stop_loss_pct=0.04, take_profit_pct=0.1, metrics=metrics)
+        scheduler = StrategyScheduler(risk_manager, self.portfolio, self.slow_order, metrics=metrics)
+        signals = [{'symbol': 'BTC/USDT', 'action': 'buy', 'price': 100.0, 'amount': 0.6}]
+        strategies = [SleepyStrategy('a', 0, signals, cpu_bound=False), SleepyStrategy('b', 0, signals, cpu_bound=False),
+                      FailingStrategy()]
+        await scheduler.run_cycle(strategies, lambda: self.snapshot)
+        scheduler.close()
+
+        snapshot = metrics.snapshot()
+        values = lambda name: {tuple(sample['labels'].values()): sample.get('value', sample.get('count'))
+                               for sample in snapshot[name]['samples']}
+        self.assertEqual(values('signals_total'), {('a',): 1, ('b',): 1, ('FailingStrategy',): 0})
+        self.assertEqual(values('strategy_errors_total'), {('FailingStrategy',): 1})
+        self.assertEqual(values('risk_checks_total'), {('approved',): 1, ('rejected',): 1})
+        self.assertEqual(values('orders_total'), {('buy', 'filled'): 1})
+        self.assertEqual(values('strategy_signals_seconds'), {('a',): 1, ('b',): 1, ('FailingStrategy',): 1})
+
+    async def test_strategy_wall_and_cpu_time(self):
+        scheduler = StrategyScheduler(self.risk_manager, self.portfolio, self.slow_order, max_workers=2)
+        sleepy, busy = SleepyStrategy('sleepy', 0.05), BusyStrategy('busy', 0.05)
+        await scheduler.run_cycle([sleepy, busy], lambda: self.snapshot)
+        await scheduler.run_cycle([busy], lambda: self.snapshot)
+        scheduler.close()
+
+        times = scheduler.get_strategy_times()
+        self.assertEqual((times['sleepy']['calls'], times['busy']['calls']), (1, 2))
+        # Sleeping costs wall time but no CPU; spinning costs both
+        self.assertGreater(times['sleepy']['wall'], 0.045)
+        self.assertLess(times['sleepy']['cpu'], 0.02)
+        self.assertGreater(times['busy']['cpu'], 0.08)
+        self.assertIsNone(times['sleepy']['last_wall'])
+        self.assertGreater(times['busy']['last_cpu'], 0.04)
+
+    def test_risk_checks_read_local_order_book(self):
+        book = LocalOrderBook('BTC/USDT')
+        book.load_snapshot({'bids': [[99.9, 0.2]], 'asks': [[100.1, 0.2], [101.0, 5.0]]})
+        risk_manager = RiskManager(max_position_size=1, stop_loss_pct=0.04, take_profit_pct=0.1,
+                                   max_spread_bps=50, max_slippage_bps=20, order_books={'BTC/USDT': book})
+        signal = {'symbol': 'BTC/USDT', 'type': 'BUY', 'price': 100.0, 'amount': 0.1}
+        self.assertEqual(risk_manager.check_risks([signal, dict(signal, amount=0.5)], self.portfolio), [True, False])
+        book.apply_delta(bids=[[99.9, 0], [98.0, 1.0]])
+        self.assertFalse(risk_manager.check_risk(signal, self.portfolio))
+
+class TestRiskState(unittest.TestCase):
+    def setUp(self):
+        self.portfolio = Portfolio(10000)
+        self.risk_manager = RiskManager(max_position_size=5, stop_loss_pct=0.02, take_profit_pct=0.04,
+                                        max_drawdown_pct=0.1, max_open_positions=2)
+        self.risk_manager.bind(self.portfolio)
+
+    def test_fills_and_marks_update_state(self):
+        self.portfolio.execute_trade({'symbol': 'BTC/USDT', 'action': 'buy', 'amount': 2, 'price': 1000})
+        self.portfolio.execute_trade({'symbol': 'ETH/USDT', 'action': 'buy', 'amount': 1, 'price': 100})
+        self.portfolio.execute_trade({'symbol': 'ETH/USDT', 'action': 'sell', 'amount': 1, 'price': 120})
+        state = self.risk_manager.get_state()
+        self.assertEqual(state['positions'], {'BTC/USDT': 2})
+        self.assertEqual(state['total_exposure'], 2000)
+        self.assertEqual(state['open_positions'], 1)
+        self.assertEqual(self.risk_manager.get_position_size('BTC/USDT'), 3.0)
+        self.portfolio.mark('BTC/USDT', 400)
+        self.assertEqual(self.risk_manager.get_state()['exposure'], {'BTC/USDT': 800})
+        self.portfolio.update_value_history()
+        self.assertAlmostEqual(self.risk_manager.drawdown, self.portfolio.calculate_drawdown())
+        self.assertFalse(self.risk_manager.check_risk({'symbol': 'BTC/USDT', 'action': 'buy', 'price': 400, 'amount': 1}))
+
+    def test_batch_counts_positions_opened_earlier_in_the_cycle(self):
+        signals = [{'symbol': symbol, 'action': 'buy', 'price': 100.0, 'amount': 1}
+                   for symbol in ('BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'BTC/USDT')]
+        self.assertEqual(self.risk_manager.check_risks(signals), [True, True, False, True])
+
+    def test_batch_frees_slots_closed_earlier_in_the_cycle(self):
+        signals = [{'symbol': symbol, 'action': action, 'price': 100.0, 'amount': 1}
+                   for symbol, action in (('BTC/USDT', 'buy'), ('ETH/USDT', 'buy'), ('ETH/USDT', 'sell'),
+                                          ('SOL/USDT', 'buy'), ('ADA/USDT', 'buy'))]
+        self.assertEqual(self.risk_manager.check_risks(signals), [True, True, True, True, False])
+
+    def test_batch_nets_sells_against_buys(self):
+        risk_manager = RiskManager(max_position_size=2, stop_loss_pct=0.02, take_profit_pct=0.04)
+        signals = [{'symbol': 'BTC/USDT', 'action': action, 'price': 100.0, 'amount': amount}
+                   for action, amount in (('buy', 1), ('sell', 1), ('buy', 1.5), ('buy', 1))]
+        self.assertEqual(risk_manager.check_risks(signals, self.portfolio), [True, True, True, False])
+
+    def test_binding_reads_existing_state(self):
+        self.portfolio.execute_trade({'symbol': 'BTC/USDT', 'action': 'buy', 'amount': 4, 'price': 100})
+        risk_manager = RiskManager(max_position_size=5)
+        self.assertFalse(risk_manager.check_risk({'symbol': 'BTC/USDT', 'type': 'BUY', 'price': 100, 'amount': 2}, self.portfolio))
+        self.assertEqual(risk_manager.open_positions, 1)
+        with self.assertRaisesRegex(ValueError, r'call bind\(portfolio\) first'):
+            RiskManager().check_risk({'symbol': 'BTC/USDT', 'type': 'BUY', 'price': 100, 'amount': 1})
+
+class TestRecords(unittest.TestCase):
+    def test_signal_reads_like_the_dicts_it_replaces(self):
+        signal = Signal.coerce({'symbol': 'BTC/USDT', 'type': 'BUY', 'price': 100, 'amount': 1, 'strength': 0.7})
+        self.assertEqual((signal.action, signal['type'], signal['side']), ('buy', 'BUY', 'buy'))
+        self.assertEqual(signal['strength'], 0.7)
+        self.assertNotIn('strategy', signal)
+        self.assertEqual(dict(signal, amount=2)['amount'], 2)
+        self.assertIs(Signal.coerce(signal), signal)
+        with self.assertRaises(AttributeError):
+            signal.reason = 'slots only'
+        signal['reason'] = 'kept in metadata'
+        self.assertEqual(signal.metadata['reason'], 'kept in metadata')
+
+    def test_order_type_is_the_order_type(self):
+        order = Order.coerce({'symbol': 'BTC/USDT', 'side': 'sell', 'amount': 1, 'price': 100, 'type': 'limit', 'id': '7'})
+        self.assertEqual((order['type'], order['action'], order.id), ('limit', 'sell', '7'))
+
+    def test_trade_log_grows_and_rebuilds_fills(self):
+        log = TradeLog(capacity=2)
+        for i in range(5):
+            log.append(Fill('ETH/USDT' if i % 2 else 'BTC/USDT', 'buy' if i < 3 else 'sell', 1.0, 100.0 + i,
+                            timestamp=i, profit=None if i < 3 else float(i)))
+        self.assertEqual(len(log), 5)
+        self.assertEqual(log.symbols, ['BTC/USDT', 'ETH/USDT'])
+        self.assertEqual(list(log.closed()), [3, 4])
+        self.assertEqual(log[-1], Fill('BTC/USDT', 'sell', 1.0, 104.0, timestamp=4, profit=4.0))
+        self.assertNotIn('profit', log[0])
+        with self.assertRaises(ValueError):
+            log.column('price')[0] = 0
+        self.assertEqual(list(log.to_frame()['side']), ['buy'] * 3 + ['sell'] * 2)
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+        for _ in range(90):
+            histogram.record(0.005)
+        for _ in range(10):
+            histogram.record(0.5)
+        stats = histogram.get_stats()
+        self.assertEqual(stats['count'], 100)
+        self.assertLessEqual(stats['p50'], 0.01)
+        self.assertGreater(stats['p95'], 0.1)
+        self.assertLessEqual(stats['p99'], 0.5)
+        self.assertEqual(stats['buckets'], {0.01: 90, 0.1: 0, 1.0: 10, float('inf'): 0})
+
+class TestMetrics(unittest.TestCase):
+    def test_registry_returns_existing_metrics(self):
+        metrics = MetricsRegistry()
+        orders = metrics.counter('orders_total', "Orders", ('side', 'status'))
+        self.assertIs(metrics.counter('orders_total', "Orders", ('side', 'status')), orders)
+        self.assertIs(orders.labels('buy', 'filled'), orders.labels(status='filled', side='buy'))
+        with self.assertRaises(ValueError):
+            metrics.gauge('orders_total')
+        with self.assertRaises(ValueError):
+            orders.labels('buy')
+
+    def test_prometheus_text_and_snapshot(self):
+        metrics = MetricsRegistry()
+        metrics.counter('orders_total', "Orders", ('side',)).labels('buy').inc(2)
+        metrics.gauge('equity', "Equity").set_function(lambda: 10500.5)
+        latency = metrics.histogram('request_seconds', "Latency", ('endpoint',), buckets=(0.01, 0.1))
+        for seconds in (0.005, 0.05, 0.05, 1.0):
+            latency.labels('fetch_ticker').record(seconds)
+
+        text = metrics.render_prometheus()
+        self.assertIn('# TYPE orders_total counter', text)
+        self.assertIn('orders_total{side="buy"} 2', text)
+        self.assertIn('equity 10500.5', text)
+        # Buckets are cumulative and end with +Inf, as scrapers expect
+        self.assertIn('request_seconds_bucket{endpoint="fetch_ticker",le="0.01"} 1', text)
+        self.assertIn('request_seconds_bucket{endpoint="fetch_ticker",le="0.1"} 3', text)
+        self.assertIn('request_seconds_bucket{endpoint="fetch_ticker",le="+Inf"} 4', text)
+        self.assertIn('request_seconds_count{endpoint="fetch_ticker"} 4', text)
+
+        sample = metrics.snapshot()['request_seconds']['samples'][0]
+        self.assertEqual(sample['labels'], {'endpoint': 'fetch_ticker'})
+        self.assertEqual(sample['count'], 4)
+        self.assertAlmostEqual(sample['sum'], 1.105)
+        self.assertEqual(metrics.snapshot()['equity']['samples'][0]['value'], 10500.5)
+
+    def test_server_serves_text_and_json(self):
+        metrics = MetricsRegistry()
+        metrics.counter('cycles_total', "Cycles").inc()
+        server = MetricsServer(metrics, port=0).start()
+        try:
+            base = f"http://127.0.0.1:{server.port}"
+            with urllib.request.urlopen(f"{base}/metrics") as response:
+                self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+                self.assertIn('cycles_total 1', response.read().decode())
+            with urllib.request.urlopen(f"{base}/metrics.json") as response:
+                self.assertEqual(json.load(response)['cycles_total']['samples'][0]['value'], 1)
+        finally:
+            server.stop()
+
+    def test_admin_commands(self):
+        calls = []
+        commands = {'profile': lambda params: calls.append(params) or {'started': True}}
+        server = MetricsServer(MetricsRegistry(), port=0, commands=commands, admin_token='secret').start()
+        disabled = MetricsServer(MetricsRegistry(), port=0, commands=commands).start()
+        try:
+            base = f"http://127.0.0.1:{server.port}"
+            authorized = {'Authorization': 'Bearer secret'}
+            with urllib.request.urlopen(urllib.request.Request(f"{base}/admin/profile?seconds=5", method='POST', headers=authorized)) as response:
+                self.assertEqual(json.load(response), {'started': True})
+            for url, headers, code in ((f"{base}/admin/unknown", authorized, 404),
+                                       (f"{base}/admin/profile?seconds=5", {}, 401),
+                                       (f"{base}/admin/profile?seconds=5", {'Authorization': 'Bearer guess'}, 401),
+                                       (f"http://127.0.0.1:{disabled.port}/admin/profile?seconds=5", authorized, 403)):
+                with self.assertRaises(urllib.error.HTTPError) as error:
+                    urllib.request.urlopen(urllib.request.Request(url, method='POST', headers=headers))
+                self.assertEqual(error.exception.code, code)
+        finally:
+            server.stop()
+            disabled.stop()
+        self.assertEqual(calls, [{'seconds': '5'}])
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_samples_are_tagged_with_strategy_and_symbol(self):
+        snapshot = MarketSnapshot({'BTC/USDT': pd.DataFrame({'close': [100.0]}), 'ETH/USDT': pd.DataFrame({'close': [10.0]})})
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = SamplingProfiler(directory, interval=0.002)
+            self.assertTrue(profiler.start(5))
+            self.assertFalse(profiler.start(5))
+            worker = threading.Thread(target=BusyStrategy('busy', 0.1).generate_signals, args=(snapshot,))
+            worker.start()
+            worker.join()
+            path = profiler.stop()
+            self.assertFalse(profiler.running)
+            self.assertEqual(os.path.dirname(path), directory)
+            with open(path) as profile:
+                lines = profile.read().splitlines()
+
+        stacks = {}
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            stacks[stack] = int(count)
+        tagged = [stack for stack in stacks if ';strategy:busy;' in stack]
+        self.assertTrue(any(';symbol:BTC/USDT;' in stack for stack in tagged))
+        self.assertTrue(any(';symbol:ETH/USDT;' in stack for stack in tagged))
+        self.assertTrue(all(stack.endswith('BusyStrategy.generate_signals') for stack in tagged))
+
+class TestLogging(unittest.TestCase):
+    def setUp(self):
+        import logging
+        import tempfile
+        shutdown_logging()
+        # Other tests silence the shared logger through their components' .logger
+        logging.getLogger('TradingBot').disabled = False
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        shutdown_logging()
+        self.directory.cleanup()
+        setup_test_logging()
+
+    def test_setup_is_idempotent_and_writes_from_the_listener(self):
+        import logging
+        import os
+        logger = setup_logging(log_dir=self.directory.name, console_level=logging.CRITICAL)
+        handlers = list(logger.handlers)
+        for _ in range(5):
+            self.assertIs(setup_logging(log_dir=self.directory.name), logger)
+        self.assertEqual(logger.handlers, handlers)
+        logger.info('once')
+        logging.getLogger('TradingBot.Security').info('login')
+        shutdown_logging()
+        with open(os.path.join(self.directory.name, 'trading_bot.log')) as log_file:
+            self.assertEqual(log_file.read().count('once'), 1)
+        with open(os.path.join(self.directory.name, 'security.log')) as log_file:
+            self.assertIn('login', log_file.read())
+
+    def test_debug_lines_are_rate_limited_per_logger(self):
+        import logging
+        setup_logging(log_dir=self.directory.name, console_level=logging.CRITICAL, debug_rate=5)
+        tick_logger = logging.getLogger('TradingBot.Ticks')
+        for _ in range(50):
+            tick_logger.debug('tick')
+            tick_logger.warning('kept')
+        self.assertGreaterEqual(get_logging_stats()['dropped']['TradingBot.Ticks'], 40)
+        rate_filter = RateLimitFilter(rate=1, burst=2)
+        record = logging.LogRecord('a', logging.DEBUG, '', 0, 'x', None, None)
+        self.assertEqual([rate_filter.filter(record) for _ in range(3)], [True, True, False])
+
+class TestEventBus(unittest.IsolatedAsyncioTestCase):
+    async def test_filters_by_symbol_and_timeframe(self):
+        bus = EventBus()
+        received = []
+        bus.subscribe(CANDLE_CLOSED, lambda event: received.append(('btc', event.symbol)), symbol='BTC/USDT', timeframe='1m')
+        bus.subscribe(CANDLE_CLOSED, lambda event: received.append(('any', event.symbol)))
+        token = bus.subscribe(CANDLE_CLOSED, lambda event: received.append(('5m', event.symbol)), timeframe='5m')
+
+        self.assertEqual(bus.publish(Event(CANDLE_CLOSED, 'BTC/USDT', '1m')), 2)
+        self.assertEqual(bus.publish(Event(CANDLE_CLOSED, 'ETH/USDT', '5m')), 2)
+        self.assertEqual(bus.publish(Event(TICKER_UPDATED, 'BTC/USDT', '1m')), 0)
+        bus.unsubscribe(token)
+        bus.publish(Event(CANDLE_CLOSED, 'ETH/USDT', '5m'))
+        self.assertEqual(received, [('btc', 'BTC/USDT'), ('any', 'BTC/USDT'), ('5m', 'ETH/USDT'), ('any', 'ETH/USDT'), ('any', 'ETH/USDT')])
+        self.assertEqual(bus.get_stats()['published'], {CANDLE_CLOSED: 3, TICKER_UPDATED: 1})
+
+    async def test_coroutine_handlers_and_errors(self):
+        bus = EventBus()
+        received = []
+
+        async def handler(event):
+            received.append(event.symbol)
+
+        bus.subscribe(CANDLE_CLOSED, lambda event: 1 / 0)
+        bus.subscribe(CANDLE_CLOSED, handler)
+        bus.publish(Event(CANDLE_CLOSED, 'BTC/USDT', '1m'))
+        await asyncio.sleep(0)
+        self.assertEqual(received, ['BTC/USDT'])
+
+    async def test_coroutine_tasks_are_held_and_failures_logged(self):
+        bus = EventBus()
+        release = asyncio.Event()
+
+        async def slow(event):
+            await release.wait()
+
+        async def failing(event):
+            raise RuntimeError('boom')
+
+        bus.subscribe(CANDLE_CLOSED, slow)
+        bus.subscribe(CANDLE_CLOSED, failing)
+        with self.assertLogs(bus.logger, level='ERROR') as logs:
+            bus.publish(Event(CANDLE_CLOSED, 'BTC/USDT', '1m'))
+            self.assertEqual(bus.get_stats()['pending'], 2)
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        self.assertEqual(bus.get_stats()['pending'], 1)
+        self.assertIn('boom', logs.output[0])
+        release.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.assertEqual(bus.get_stats()['pending'], 0)
+
+class CountingStrategy:
+    def __init__(self, name):
+        self.name = name
+        self.snapshots = []
+
+    def generate_signals(self, snapshot):
+        self.snapshots.append(snapshot)
+        return []
+
+class TestEventDrivenEngine(unittest.IsolatedAsyncioTestCase):
+    async def test_only_affected_strategies_run_on_candle_close(self):
+        engine = TradingEngine({
+            'exchange': {'name': 'binance', 'api_key': 'key', 'secret_key': 'secret', 'rate_limit': {'rate': 1000}},
+            'initial_balance': 10000,
+            'symbols': ['BTC/USDT', 'ETH/USDT'],
+            'risk_params': {'max_position_size': 1, 'stop_loss_pct': 0.04, 'take_profit_pct': 0.1},
+        })
+        engine.exchange_handler.exchange = MockAsyncExchange(latency=0)
+        btc, eth = CountingStrategy('btc'), CountingStrategy('eth')
+        engine.strategies = [btc, eth]
+        engine.subscribe_strategy(btc, ['BTC/USDT'])
+        engine.subscribe_strategy(eth, ['ETH/USDT'])
+        engine.running = True
+        runner = asyncio.create_task(engine.run_event_driven())
+
+        # First round opens two bars per symbol: the older one is closed
+        await engine.exchange_data.update_async()
+        await asyncio.sleep(0.01)
+        self.assertEqual((len(btc.snapshots), len(eth.snapshots)), (1, 1))
+
+        # An update of the open bar closes nothing, so nothing runs
+        last = engine.exchange_data.store.get('BTC/USDT', '1m').last_timestamp()
+        engine.exchange_data.ingest_ohlcv('BTC/USDT', [[last, 1, 1, 1, 2, 1]])
+        await asyncio.sleep(0.01)
+        self.assertEqual((len(btc.snapshots), len(eth.snapshots)), (1, 1))
+
+        # A new BTC bar closes the previous one; ETH stays idle
+        engine.exchange_data.ingest_ohlcv('BTC/USDT', [[last + 60000, 1, 1, 1, 1, 1]])
+        await asyncio.sleep(0.01)
+        self.assertEqual((len(btc.snapshots), len(eth.snapshots)), (2, 1))
+        self.assertIn('BTC/USDT', btc.snapshots[-1].data)
+
+        await engine.stop()
+        await runner
+        await engine.exchange_handler.close()
+
+    async def test_profile_requests_are_bounded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = TradingEngine({
+                'exchange': {'name': 'binance', 'api_key': 'key', 'secret_key': 'secret'},
+                'initial_balance': 10000,
+                'risk_params': {'max_position_size': 1, 'stop_loss_pct': 0.04, 'take_profit_pct': 0.1},
+                'profile_dir': directory,
+                'profile_max_seconds': 2,
+            })
+            for seconds in (float('nan'), float('inf'), -1, 0):
+                with self.assertRaises(ValueError):
+                    engine.start_profiling(seconds)
+            self.assertFalse(engine.profiler.running)
+            self.assertEqual(engine.start_profiling(1e9)['seconds'], 2)
+            engine.profiler.stop()
+            await engine.exchange_handler.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,616 @@
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+import numpy as np
+import pandas as pd
+from core.exchange_handler import ExchangeHandler, MockAsyncExchange
+from data.backfill import BackfillService
+from data.candle_store import CandleBuffer, CandleStore
+from data.data_cache import DataCache
+from data.exchange_data import ExchangeData, MockExchangeData
+from data.historical_data import HistoricalData
+from data.migrate_storage import migrate_csv_to_binary
+from data.order_book import LocalOrderBook, book_checksum
+from data.storage import BinaryStorage, CSVStorage
+from data.stream_feed import BOOK, OHLCV, StreamFeed
+from data.stream_replay import ReplayClient, ReplayServer
+from data.timeframes import find_gaps, parse_timeframe, plan_fetches, timeframe_to_ms
+
+class FakeExchange:
+    def __init__(self, candles):
+        self.candles = candles
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        return [self.candles.pop(0)]
+
+class TestCandleStore(unittest.TestCase):
+    def test_append_updates_open_bar_in_place(self):
+        buffer = CandleBuffer(capacity=4)
+        self.assertTrue(buffer.append(60000, 1, 2, 0.5, 1.5, 10))
+        self.assertFalse(buffer.append(60000, 1, 3, 0.5, 2.5, 12))
+        self.assertTrue(buffer.append(120000, 2.5, 3, 2, 2.8, 5))
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(buffer.column('close').tolist(), [2.5, 2.8])
+
+    def test_wraparound_keeps_tail_contiguous(self):
+        buffer = CandleBuffer(capacity=4)
+        for i in range(10):
+            buffer.append(i * 60000, i, i, i, i, i)
+        timestamps, values = buffer.tail(3)
+        self.assertEqual(timestamps.tolist(), [420000, 480000, 540000])
+        self.assertEqual(buffer.column('close').tolist(), [6, 7, 8, 9])
+        self.assertTrue(np.shares_memory(values, buffer._values))
+        with self.assertRaises(ValueError):
+            values[0, 0] = 1
+
+    def test_late_update_and_truncate(self):
+        buffer = CandleBuffer(capacity=8)
+        for i in range(5):
+            buffer.append(i * 60000, i, i, i, i, i)
+        self.assertFalse(buffer.append(120000, 2, 2, 2, 42, 2))
+        self.assertEqual(buffer.column('close')[2], 42)
+        buffer.truncate(180000)
+        self.assertEqual(buffer.last_timestamp(), 180000)
+        self.assertEqual(len(buffer), 4)
+
+    def test_load_frame_round_trip(self):
+        index = pd.date_range('2023-01-01', periods=5, freq='1min')
+        df = pd.DataFrame({column: np.arange(5.0) for column in ['open', 'high', 'low', 'close', 'volume']}, index=index)
+        store = CandleStore(capacity=3)
+        buffer = store.load_frame('BTC/USDT', '1m', df)
+        self.assertEqual(buffer.capacity, 5)
+        pd.testing.assert_frame_equal(buffer.to_frame(), df, check_names=False, check_freq=False, check_index_type=False)
+
+class TestExchangeData(unittest.TestCase):
+    def test_update_appends_to_store(self):
+        exchange_data = ExchangeData('binance', 'dummy_api_key', 'dummy_api_secret')
+        exchange_data.set_trading_pairs(['BTC/USDT'])
+        exchange_data.exchange = FakeExchange([
+            [60000, 1, 1, 1, 100, 1],
+            [60000, 1, 1, 1, 101, 1],
+            [120000, 1, 1, 1, 102, 1],
+        ])
+        for _ in range(3):
+            exchange_data.update()
+        self.assertEqual(exchange_data.get_latest_price('BTC/USDT'), 102)
+        self.assertEqual(exchange_data.data['BTC/USDT']['close'].tolist(), [101, 102])
+        self.assertEqual(len(exchange_data.tail('BTC/USDT', 10)[0]), 2)
+
+    def test_update_fetches_the_closed_bar_again(self):
+        exchange_data = ExchangeData('binance', 'dummy_api_key', 'dummy_api_secret')
+        exchange_data.set_trading_pairs(['BTC/USDT'])
+        rounds = [[[60000, 1, 1, 1, 100, 1]], [[60000, 1, 1, 1, 101, 1], [120000, 1, 1, 1, 102, 1]]]
+        limits = []
+        exchange_data.exchange.fetch_ohlcv = lambda symbol, timeframe, limit: limits.append(limit) or rounds.pop(0)
+        exchange_data.update()
+        exchange_data.update()
+        self.assertEqual(limits, [2, 2])
+        # The first bar's final close replaced the partial one
+        self.assertEqual(exchange_data.data['BTC/USDT']['close'].tolist(), [101, 102])
+
+    def test_mock_exchange_data_serves_snapshots(self):
+        exchange_data = MockExchangeData(timeframe='1h')
+        exchange_data.load_historical_data('BTC/USDT', pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-05'), timeframe='1h')
+        exchange_data.update()
+        snapshot = exchange_data.get_latest_data()
+        self.assertEqual(snapshot.symbols(), ['BTC/USDT'])
+        self.assertGreater(snapshot.bars('BTC/USDT'), 100)
+        self.assertEqual(exchange_data.get_update_stats(), {'rounds': 0})
+
+    def test_historical_data_merges_with_live_candles(self):
+        exchange_data = ExchangeData('binance', 'dummy_api_key', 'dummy_api_secret', capacity=4)
+        exchange_data.set_trading_pairs(['BTC/USDT'])
+        exchange_data.exchange = FakeExchange([[600000, 1, 1, 1, 110, 1], [660000, 1, 1, 1, 111, 1]])
+        exchange_data.update()
+        exchange_data.update()
+
+        history = [[minute * 60000, 1, 1, 1, 100 + minute, 1] for minute in range(11)]
+        exchange_data.exchange.fetch_ohlcv = lambda symbol, timeframe, since: [c for c in history if c[0] >= since][:4]
+        start = pd.Timestamp(0, unit='s', tz='UTC')
+        exchange_data.load_historical_data('BTC/USDT', start, start + pd.Timedelta(minutes=10))
+        # Ten candles loaded before the two live ones, although they exceed the initial capacity
+        self.assertEqual(exchange_data.data['BTC/USDT']['close'].tolist(), [100 + minute for minute in range(12)])
+
+class TestAsyncUpdate(unittest.IsolatedAsyncioTestCase):
+    async def test_update_async_fans_out_symbols(self):
+        exchange = MockAsyncExchange(latency=0.05)
+        handler = ExchangeHandler({'name': 'mock', 'rate_limit': {'rate': 1000}}, exchange=exchange)
+        exchange_data = ExchangeData('binance', 'dummy_api_key', 'dummy_api_secret', exchange_handler=handler)
+        symbols = [f"COIN{i}/USDT" for i in range(50)]
+        exchange_data.set_trading_pairs(symbols)
+
+        start = time.perf_counter()
+        latency = await exchange_data.update_async()
+        elapsed = time.perf_counter() - start
+
+        # 50 sequential requests would take 2.5s
+        self.assertLess(elapsed, 1.0)
+        self.assertGreater(exchange.max_in_flight, 1)
+        self.assertEqual(exchange.requests, 50)
+        for symbol in symbols:
+            self.assertEqual(len(exchange_data.store.get(symbol, '1m')), 2)
+        self.assertEqual(exchange_data.get_update_stats()['rounds'], 1)
+        self.assertAlmostEqual(exchange_data.get_update_stats()['last'], latency)
+
+class TestMarketSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.exchange_data = ExchangeData('binance', 'key', 'secret', snapshot_lookback=50)
+        self.exchange_data.store.append_ohlcv('BTC/USDT', '1m', [[i * 60000, 1, 1, 1, 100 + i % 7, 1] for i in range(80)])
+
+    def test_views_are_read_only_and_frozen(self):
+        snapshot = self.exchange_data.get_latest_data()
+        closes = snapshot.column('BTC/USDT', 'close')
+        self.assertEqual(len(closes), 50)
+        with self.assertRaises(ValueError):
+            closes[0] = 0
+        self.exchange_data.ingest_ohlcv('BTC/USDT', [[79 * 60000, 1, 1, 1, 500, 1]])
+        self.assertEqual(snapshot.get_latest_price('BTC/USDT'), 100 + 79 % 7)
+        self.assertEqual(snapshot.data['BTC/USDT']['close'].iloc[-1], 100 + 79 % 7)
+
+    def test_snapshot_defaults_to_every_stored_candle(self):
+        exchange_data = ExchangeData('binance', 'key', 'secret', capacity=3000)
+        exchange_data.store.append_ohlcv('BTC/USDT', '1m', [[i * 60000, 1, 1, 1, 100, 1] for i in range(2500)])
+        self.assertEqual(len(exchange_data.get_latest_data().column('BTC/USDT', 'close')), 2500)
+        self.assertEqual(len(exchange_data.get_latest_data(lookback=10).column('BTC/USDT', 'close')), 10)
+
+    def test_indicators_are_computed_once_per_cycle(self):
+        snapshot = self.exchange_data.get_latest_data()
+        calls = []
+        def counted_sma(closes, window):
+            calls.append(window)
+            return pd.Series(closes).rolling(window).mean().to_numpy()
+        threads = [threading.Thread(target=snapshot.indicator, args=('BTC/USDT', 'sma', 14), kwargs={'compute': counted_sma})
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [14])
+        np.testing.assert_allclose(snapshot.indicator('BTC/USDT', 'sma', 14), snapshot.indicator('BTC/USDT', 'sma', 14, compute=counted_sma))
+        snapshot.indicator('BTC/USDT', 'rsi', 14)
+        self.assertEqual(snapshot.indicator_stats, {'hits': 9, 'misses': 2})
+        self.assertEqual(self.exchange_data.get_latest_data().indicator_stats['misses'], 0)
+
+    def test_indicator_grid_fills_per_symbol_cache(self):
+        self.exchange_data.store.append_ohlcv('ETH/USDT', '1m', [[i * 60000, 1, 1, 1, 50 + i % 5, 1] for i in range(80)])
+        snapshot = self.exchange_data.get_latest_data()
+        grid = snapshot.indicator_grid('sma', [5, 10])
+        self.assertEqual(grid.shape, (2, 2, 50))
+        self.assertIs(snapshot.indicator_grid('sma', [5, 10]), grid)
+        np.testing.assert_allclose(snapshot.indicator('ETH/USDT', 'sma', 10), grid[1, 1], equal_nan=True)
+        self.assertEqual(snapshot.indicator_stats, {'hits': 1, 'misses': 0})
+
+class TestDataCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = DataCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get_keys(), ['a', 'c'])
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_ages_follow_writes_not_hits(self):
+        cache = DataCache()
+        cache.set('a', 1)
+        time.sleep(0.02)
+        cache.set('b', 2)
+        cache.get('a')
+        stats = cache.get_stats()
+        self.assertGreaterEqual(stats['oldest_item_age'], 0.02)
+        self.assertLess(stats['newest_item_age'], 0.02)
+        cache.refresh('a')
+        cache.remove('b')
+        self.assertLess(cache.get_stats()['oldest_item_age'], 0.02)
+
+    def test_ttl_expiration(self):
+        cache = DataCache(expiration_time=0.05)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('a'))
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['expirations']), (1, 1, 1))
+
+    def test_byte_bound(self):
+        frame = pd.DataFrame({'close': np.arange(1000.0)})
+        cache = DataCache(max_bytes=int(frame.memory_usage(deep=True).sum() * 2.5))
+        for key in 'abc':
+            cache.set(key, frame)
+        self.assertEqual(cache.get_keys(), ['b', 'c'])
+        self.assertLessEqual(cache.current_bytes, cache.max_bytes)
+
+    def test_get_or_load_single_flight(self):
+        cache = DataCache()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('key', loader))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get_or_load('key', loader), 'value')
+        self.assertEqual(len(calls), 1)
+
+    def test_get_or_load_async_single_flight(self):
+        cache = DataCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        async def main():
+            return await asyncio.gather(*(cache.get_or_load_async('key', loader) for _ in range(10)))
+
+        self.assertEqual(asyncio.run(main()), [42] * 10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get_stats()['coalesced_loads'], 9)
+
+    def test_failed_load_is_not_cached(self):
+        cache = DataCache()
+        with self.assertRaises(RuntimeError):
+            cache.get_or_load('key', lambda: (_ for _ in ()).throw(RuntimeError('boom')))
+        self.assertEqual(cache.get_or_load('key', lambda: 1), 1)
+
+def make_ohlcv(start, periods, freq='1min'):
+    index = pd.date_range(start, periods=periods, freq=freq, name='timestamp')
+    values = np.arange(periods, dtype=np.float64)
+    return pd.DataFrame({column: values for column in ['open', 'high', 'low', 'close', 'volume']}, index=index)
+
+class TestBinaryStorage(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = BinaryStorage(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_across_months(self):
+        df = make_ohlcv('2023-01-31 23:00', 180)
+        self.storage.save('BTC/USDT', '1m', df)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.directory.name, 'BTC%2FUSDT_1m'))), ['2023-01.bin', '2023-02.bin'])
+        pd.testing.assert_frame_equal(self.storage.load('BTC/USDT', '1m'), df, check_freq=False, check_index_type=False)
+        self.assertEqual(self.storage.list_series(), [('BTC/USDT', '1m')])
+        self.assertEqual(self.storage.info('BTC/USDT', '1m')['num_records'], 180)
+
+    def test_symbols_round_trip_and_empty_series(self):
+        for symbol in ('BTC/USDT', 'BTC-PERP', 'ETH/USDT:USDT'):
+            self.storage.save(symbol, '1h', make_ohlcv('2023-01-01', 3, freq='1h'))
+        os.makedirs(os.path.join(self.directory.name, 'SOL%2FUSDT_1m'))
+        open(os.path.join(self.directory.name, 'SOL%2FUSDT_1m', '2023-01.bin'), 'wb').close()
+        self.assertEqual(sorted(self.storage.list_series()),
+                         [('BTC-PERP', '1h'), ('BTC/USDT', '1h'), ('ETH/USDT:USDT', '1h'), ('SOL/USDT', '1m')])
+        self.assertEqual(self.storage.info('SOL/USDT', '1m'), {'start_date': None, 'end_date': None, 'num_records': 0})
+        self.assertEqual(CSVStorage(self.directory.name).info('SOL/USDT', '1m')['num_records'], 0)
+
+    def test_append_leaves_older_partitions_untouched(self):
+        df = make_ohlcv('2023-01-31 23:00', 180)
+        self.storage.save('BTC/USDT', '1m', df.iloc[:120])
+        january = os.path.join(self.directory.name, 'BTC%2FUSDT_1m', '2023-01.bin')
+        before = os.stat(january).st_mtime_ns
+        self.storage.append('BTC/USDT', '1m', df.iloc[120:])
+        self.assertEqual(os.stat(january).st_mtime_ns, before)
+        pd.testing.assert_frame_equal(self.storage.load('BTC/USDT', '1m'), df, check_freq=False, check_index_type=False)
+
+    def test_overlapping_append_deduplicates(self):
+        df = make_ohlcv('2023-01-01', 10)
+        self.storage.save('BTC/USDT', '1m', df)
+        update = df.iloc[5:].copy()
+        update['close'] = 99.0
+        self.storage.append('BTC/USDT', '1m', update)
+        loaded = self.storage.load('BTC/USDT', '1m')
+        self.assertEqual(len(loaded), 10)
+        self.assertEqual(loaded['close'].tolist(), [0, 1, 2, 3, 4] + [99.0] * 5)
+
+    def test_range_load(self):
+        df = make_ohlcv('2023-01-01', 3 * 24 * 60)
+        self.storage.save('BTC/USDT', '1m', df)
+        start, end = pd.Timestamp('2023-01-02 00:00'), pd.Timestamp('2023-01-02 23:59')
+        pd.testing.assert_frame_equal(self.storage.load('BTC/USDT', '1m', start, end), df.loc[start:end], check_freq=False, check_index_type=False)
+        self.assertTrue(self.storage.load('BTC/USDT', '1m', '2024-01-01', '2024-02-01').empty)
+
+class TestHistoricalDataBackends(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_backends_agree(self):
+        df = make_ohlcv('2023-01-01', 100)
+        frames = []
+        for backend in ('csv', 'binary'):
+            historical_data = HistoricalData(os.path.join(self.directory.name, backend), backend=backend)
+            historical_data.save_data('ETH', '1m', df.iloc[:60])
+            historical_data.load_data('ETH', '1m')
+            historical_data.update_data('ETH', '1m', df.iloc[60:])
+            frames.append(historical_data.load_data('ETH', '1m'))
+            self.assertEqual(historical_data.get_data_info()['ETH_1m']['num_records'], 100)
+        pd.testing.assert_frame_equal(frames[0], frames[1], check_freq=False, check_index_type=False)
+
+    def test_cached_history_is_not_shared(self):
+        historical_data = HistoricalData(self.directory.name, backend='binary')
+        historical_data.save_data('ETH', '1m', make_ohlcv('2023-01-01', 10))
+        first = historical_data.load_data('ETH', '1m')
+        first['close'] *= 2
+        first.loc[first.index[0], 'open'] = -1
+        second = historical_data.load_data('ETH', '1m')
+        self.assertEqual(historical_data.cache.loads, 1)
+        pd.testing.assert_frame_equal(second, make_ohlcv('2023-01-01', 10), check_freq=False, check_index_type=False)
+
+    def test_migration(self):
+        df = make_ohlcv('2023-01-01', 100)
+        source, target = os.path.join(self.directory.name, 'csv'), os.path.join(self.directory.name, 'bin')
+        CSVStorage(source).save('BTC/USDT', '1h', df)
+        self.assertEqual(migrate_csv_to_binary(source, target), {'BTC/USDT_1h': 100})
+        pd.testing.assert_frame_equal(BinaryStorage(target).load('BTC/USDT', '1h'), df, check_freq=False, check_index_type=False)
+
+class TestGapDetection(unittest.TestCase):
+    def test_parse_timeframe(self):
+        self.assertEqual(parse_timeframe('15m'), (15, 'm'))
+        self.assertEqual(timeframe_to_ms('4h'), 4 * 3600 * 1000)
+        self.assertEqual(timeframe_to_ms('1M'), 30 * 86400 * 1000)
+        for invalid in ('', '0m', '1x', 'm1'):
+            with self.assertRaises(ValueError):
+                parse_timeframe(invalid)
+
+    def test_merged_ranges(self):
+        minute = 60000
+        timestamps = np.array([0, 1, 2, 5, 6, 9]) * minute
+        self.assertEqual(find_gaps(timestamps, 0, 12 * minute, '1m'),
+                         [(3 * minute, 5 * minute), (7 * minute, 9 * minute), (10 * minute, 12 * minute)])
+        self.assertEqual(find_gaps(np.array([], dtype=np.int64), 30000, 3 * minute, '1m'), [(minute, 3 * minute)])
+        self.assertEqual(find_gaps(timestamps[:3], 0, 3 * minute, '1m'), [])
+        unsorted = np.array([9, 2, 0, 5, 1, 6, 2]) * minute
+        self.assertEqual(find_gaps(unsorted, 0, 12 * minute, '1m'), find_gaps(timestamps, 0, 12 * minute, '1m'))
+
+    def test_calendar_and_weekly_grids(self):
+        months = pd.to_datetime(['2023-01-01', '2023-02-01', '2023-05-01'])
+        gaps = find_gaps(months.as_unit('ms').asi8, months[0].value // 10**6, pd.Timestamp('2023-07-01').value // 10**6, '1M')
+        self.assertEqual([(str(pd.Timestamp(a, unit='ms').date()), str(pd.Timestamp(b, unit='ms').date())) for a, b in gaps],
+                         [('2023-03-01', '2023-05-01'), ('2023-06-01', '2023-07-01')])
+        # 2023-01-02 was a Monday
+        start = pd.Timestamp('2023-01-02').value // 10**6
+        self.assertEqual(find_gaps(np.array([start]), start, start + 14 * 86400000, '1w'), [(start + 7 * 86400000, start + 14 * 86400000)])
+
+    def test_plan_fetches(self):
+        hour = 3600000
+        self.assertEqual(plan_fetches([(0, 5 * hour), (10 * hour, 11 * hour)], '1h', limit=2),
+                         [(0, 2), (2 * hour, 2), (4 * hour, 1), (10 * hour, 1)])
+
+    def test_historical_data_missing_ranges(self):
+        with tempfile.TemporaryDirectory() as directory:
+            historical_data = HistoricalData(directory, backend='binary')
+            df = make_ohlcv('2023-01-01', 10, freq='5min').drop(pd.to_datetime(['2023-01-01 00:10', '2023-01-01 00:15']))
+            historical_data.save_data('BTC/USDT', '5m', df)
+            self.assertEqual(historical_data.get_missing_data_ranges('BTC/USDT', '5m', pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-01 01:00')),
+                             [(pd.Timestamp('2023-01-01 00:10'), pd.Timestamp('2023-01-01 00:20')),
+                              (pd.Timestamp('2023-01-01 00:50'), pd.Timestamp('2023-01-01 01:00'))])
+            self.assertEqual(len(historical_data.plan_backfill('BTC/USDT', '5m', pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02'), limit=100)), 4)
+
+class ListedExchange(MockAsyncExchange):
+    '''
+    Serves at most 60 candles per request, nothing before the listing time,
+    and fails the first request for each timestamp in `flaky`.
+    '''
+    def __init__(self, listed_at, flaky=(), **kwargs):
+        super().__init__(**kwargs)
+        self.listed_at = listed_at
+        self.flaky = set(flaky)
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        if since in self.flaky:
+            self.flaky.discard(since)
+            await self._request()
+            raise ConnectionError('timeout')
+        if since + 60000 * limit <= self.listed_at:
+            await self._request()
+            return []
+        start = max(since, self.listed_at)
+        return await super().fetch_ohlcv(symbol, timeframe, -(-start // 60000) * 60000, min(limit, 60))
+
+class TestBackfill(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.historical_data = HistoricalData(self.directory.name, backend='binary')
+        self.start, self.end = pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-01 06:00')
+        self.checkpoint = os.path.join(self.directory.name, 'backfill.jsonl')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def service(self, exchange, **options):
+        handler = ExchangeHandler({'name': 'mock', 'rate_limit': {'rate': 10000}}, exchange=exchange)
+        return BackfillService(handler, self.historical_data, page_limit=100, retry_delay=0,
+                               checkpoint_path=self.checkpoint, **options)
+
+    async def test_concurrent_backfill_fills_every_gap(self):
+        exchange = ListedExchange(listed_at=0, latency=0.01)
+        symbols = ['BTC/USDT', 'ETH/USDT']
+        written = await self.service(exchange).run(symbols, '1m', self.start, self.end)
+        self.assertEqual(written, {'BTC/USDT': 360, 'ETH/USDT': 360})
+        self.assertGreater(exchange.max_in_flight, 1)
+        for symbol in symbols:
+            self.assertEqual(self.historical_data.get_missing_data_ranges(symbol, '1m', self.start, self.end), [])
+            self.assertTrue(self.historical_data.load_data(symbol, '1m').index.is_monotonic_increasing)
+
+    async def test_skips_stored_ranges(self):
+        self.historical_data.save_data('BTC/USDT', '1m', make_ohlcv(self.start, 200))
+        exchange = ListedExchange(listed_at=0, latency=0)
+        written = await self.service(exchange).run(['BTC/USDT'], '1m', self.start, self.end)
+        self.assertEqual(written, {'BTC/USDT': 160})
+        # 160 missing candles: two windows of 100 and 60, each served in pages of 60
+        self.assertEqual(exchange.requests, 4)
+
+    async def test_resume_after_failures(self):
+        listed_at = int(self.start.value // 10**6) + 150 * 60000
+        first = ListedExchange(listed_at=listed_at, flaky=[listed_at + 150 * 60000], latency=0)
+        written = await self.service(first, max_retries=0).run(['BTC/USDT'], '1m', self.start, self.end)
+        self.assertEqual(written, {'BTC/USDT': 150})
+        gaps = self.historical_data.get_missing_data_ranges('BTC/USDT', '1m', self.start, self.end)
+        self.assertEqual(len(gaps), 2)
+
+        # The window before the listing is checkpointed as empty; only the failed one is fetched again
+        second = ListedExchange(listed_at=listed_at, latency=0)
+        written = await self.service(second).run(['BTC/USDT'], '1m', self.start, self.end)
+        self.assertEqual(written, {'BTC/USDT': 60})
+        self.assertEqual(self.historical_data.get_missing_data_ranges('BTC/USDT', '1m', self.start, self.end),
+                         [(self.start, self.start + pd.Timedelta(minutes=150))])
+        second.requests = 0
+        self.assertEqual(await self.service(second).run(['BTC/USDT'], '1m', self.start, self.end), {'BTC/USDT': 0})
+        self.assertEqual(second.requests, 0)
+
+    async def test_empty_windows_are_checkpointed_only_once_past(self):
+        start = pd.Timestamp(time.time(), unit='s').floor('min') - pd.Timedelta(hours=2)
+        end = start + pd.Timedelta(hours=4)
+        # Nothing listed yet: the windows of the last two hours are final, the later ones may still fill up
+        exchange = ListedExchange(listed_at=int(end.value // 10**6), latency=0)
+        self.assertEqual(await self.service(exchange).run(['BTC/USDT'], '1m', start, end), {'BTC/USDT': 0})
+        planned = self.service(exchange).plan(['BTC/USDT'], '1m', start, end)['BTC/USDT']
+        self.assertTrue(planned)
+        self.assertTrue(all(since >= start.value // 10**6 + 100 * 60000 for since, _ in planned))
+
+class TestLocalOrderBook(unittest.TestCase):
+    def make_book(self):
+        book = LocalOrderBook('BTC/USDT')
+        self.assertTrue(book.load_snapshot({'bids': [[99.0, 1.0], [98.0, 2.0], [97.0, 3.0]],
+                                            'asks': [[101.0, 1.0], [102.0, 2.0], [103.0, 3.0]], 'nonce': 1}))
+        return book
+
+    def test_top_of_book(self):
+        book = self.make_book()
+        self.assertEqual((book.best_bid(), book.best_ask()), (99.0, 101.0))
+        self.assertEqual(book.spread(), 2.0)
+        self.assertEqual(book.mid(), 100.0)
+        self.assertAlmostEqual(book.spread_bps(), 200.0)
+
+    def test_deltas_keep_levels_sorted(self):
+        book = self.make_book()
+        book.apply_delta(bids=[[99.5, 4.0], [98.0, 0]], asks=[[101.0, 0], [100.5, 1.5]], nonce=2)
+        self.assertEqual(book.to_dict()['bids'], [[99.5, 4.0], [99.0, 1.0], [97.0, 3.0]])
+        self.assertEqual(book.to_dict(depth=2)['asks'], [[100.5, 1.5], [102.0, 2.0]])
+        self.assertEqual(book.nonce, 2)
+        self.assertTrue(book.covers(2))
+        self.assertTrue(book.follows(3))
+        self.assertFalse(book.follows(4))
+
+    def test_depth_within_bps(self):
+        book = self.make_book()
+        # 250 bps around a 100 mid reaches 97.5 and 102.5
+        self.assertEqual(book.depth(250, 'bids'), 3.0)
+        self.assertEqual(book.depth(250, 'asks'), 3.0)
+        self.assertEqual(book.depth(500), 12.0)
+
+    def test_checksum_validation(self):
+        bids, asks = [[99.0, 1.0]], [[101.0, 1.0]]
+        book = LocalOrderBook('BTC/USDT')
+        self.assertFalse(book.load_snapshot({'bids': bids, 'asks': asks, 'checksum': book_checksum(bids, asks) + 1}))
+        self.assertFalse(book.synced)
+        self.assertTrue(book.load_snapshot({'bids': bids, 'asks': asks, 'checksum': book_checksum(bids, asks)}))
+        self.assertFalse(book.apply_delta(bids=[[99.0, 2.0]], checksum=book_checksum(bids, asks)))
+
+    def test_crossed_book_is_rejected(self):
+        book = LocalOrderBook('BTC/USDT')
+        self.assertFalse(book.load_snapshot({'bids': [[101.0, 1.0]], 'asks': [[100.0, 1.0]]}))
+
+class FakeRest:
+    def __init__(self, ohlcv=(), book=None):
+        self.ohlcv = list(ohlcv)
+        self.book = book
+        self.calls = []
+
+    async def get_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        self.calls.append(('ohlcv', since))
+        return self.ohlcv
+
+    async def get_order_book(self, symbol):
+        self.calls.append(('book', None))
+        return self.book
+
+class TestStreamFeed(unittest.IsolatedAsyncioTestCase):
+    def make_feed(self, client=None, rest=None, **options):
+        exchange_data = ExchangeData('binance', 'dummy_api_key', 'dummy_api_secret')
+        return StreamFeed(client, exchange_data, ['BTC/USDT'], channels=(OHLCV, BOOK), rest_handler=rest, **options)
+
+    async def test_missing_bars_trigger_rest_resnapshot(self):
+        rest = FakeRest(ohlcv=[[60000, 1, 1, 1, 1, 1], [120000, 1, 1, 1, 2, 1]])
+        feed = self.make_feed(rest=rest)
+        await feed.on_ohlcv('BTC/USDT', [[0, 1, 1, 1, 1, 1]])
+        await feed.on_ohlcv('BTC/USDT', [[60000, 1, 1, 1, 1, 1]])
+        self.assertEqual(rest.calls, [])
+        await feed.on_ohlcv('BTC/USDT', [[180000, 1, 1, 1, 3, 1]])
+        self.assertEqual(rest.calls, [('ohlcv', 60000)])
+        self.assertEqual(feed.exchange_data.data['BTC/USDT']['close'].tolist(), [1, 1, 2, 3])
+        self.assertEqual(feed.get_stats()['gaps'], 1)
+
+    async def test_book_nonce_gap_resnapshots(self):
+        rest = FakeRest(book={'bids': [[99.0, 5.0]], 'asks': [[101.0, 5.0]], 'nonce': 12})
+        feed = self.make_feed(rest=rest)
+        await feed.on_book('BTC/USDT', {'bids': [[99.0, 1.0], [98.0, 1.0]], 'asks': [[101.0, 1.0]], 'nonce': 10})
+        await feed.on_book('BTC/USDT', {'type': 'delta', 'bids': [[98.0, 0]], 'asks': [[102.0, 2.0]], 'nonce': 11})
+        self.assertEqual(feed.get_order_book('BTC/USDT')['bids'], [[99.0, 1.0]])
+        await feed.on_book('BTC/USDT', {'type': 'delta', 'bids': [], 'asks': [[100.5, 1.0]], 'nonce': 13})
+        book = feed.get_order_book('BTC/USDT')
+        self.assertEqual(book['bids'], [[99.0, 5.0]])
+        self.assertEqual(book['asks'], [[100.5, 1.0], [101.0, 5.0]])
+        self.assertEqual(book['nonce'], 13)
+        self.assertEqual(feed.get_stats()['gaps'], 1)
+
+    async def test_book_checksum_mismatch_resnapshots(self):
+        rest = FakeRest(book={'bids': [[99.0, 5.0]], 'asks': [[101.0, 5.0]], 'nonce': 12})
+        feed = self.make_feed(rest=rest)
+        await feed.on_book('BTC/USDT', {'bids': [[99.0, 1.0]], 'asks': [[101.0, 1.0]], 'nonce': 10})
+        await feed.on_book('BTC/USDT', {'type': 'delta', 'bids': [[99.0, 2.0]], 'asks': [], 'nonce': 11, 'checksum': 0})
+        self.assertEqual(rest.calls, [('book', None)])
+        self.assertEqual(feed.get_order_book('BTC/USDT')['bids'], [[99.0, 5.0]])
+        self.assertEqual(feed.get_stats()['checksum_errors'], 1)
+
+    async def test_replay_server_round_trip_with_reconnect(self):
+        messages = [
+            {'channel': 'ohlcv', 'symbol': 'BTC/USDT', 'data': [[0, 1, 1, 1, 1, 1]]},
+            {'channel': 'book', 'symbol': 'BTC/USDT', 'data': {'bids': [[99.0, 1.0]], 'asks': [[101.0, 1.0]], 'nonce': 1}},
+            {'channel': 'ohlcv', 'symbol': 'BTC/USDT', 'data': [[60000, 1, 1, 1, 2, 1]]},
+            {'channel': 'book', 'symbol': 'BTC/USDT', 'data': {'type': 'delta', 'bids': [[99.0, 2.0]], 'asks': [], 'nonce': 2}},
+            {'channel': 'ohlcv', 'symbol': 'BTC/USDT', 'data': [[120000, 1, 1, 1, 3, 1]]},
+            {'channel': 'book', 'symbol': 'BTC/USDT', 'data': {'type': 'delta', 'bids': [], 'asks': [[100.0, 1.0]], 'nonce': 3}},
+            {'channel': 'ohlcv', 'symbol': 'BTC/USDT', 'data': [[180000, 1, 1, 1, 4, 1]]},
+            {'channel': 'book', 'symbol': 'BTC/USDT', 'data': {'type': 'delta', 'bids': [], 'asks': [[101.0, 0], [102.0, 1.0]], 'nonce': 4}},
+            {'channel': 'ohlcv', 'symbol': 'BTC/USDT', 'data': [[240000, 1, 1, 1, 5, 1]]},
+        ]
+        server = ReplayServer(messages, drop_after=3, skip=[5])
+        client = ReplayClient(await server.start())
+        rest = FakeRest(book={'bids': [[99.0, 2.0]], 'asks': [[101.0, 1.0]], 'nonce': 3})
+        feed = self.make_feed(client, rest, reconnect_delay=0.01)
+        await feed.start()
+        try:
+            for _ in range(200):
+                book = feed.get_order_book('BTC/USDT')
+                if len(feed.exchange_data.data['BTC/USDT']) == 5 and book.get('nonce') == 4:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await feed.stop()
+            await client.close()
+            await server.stop()
+        self.assertEqual(feed.exchange_data.data['BTC/USDT']['close'].tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(book['bids'], [[99.0, 2.0]])
+        self.assertEqual(book['asks'], [[102.0, 1.0]])
+        self.assertEqual(server.connections, 2)
+        self.assertGreaterEqual(feed.get_stats()['reconnects'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+
+import unittest
+import numpy as np
+import pandas as pd
+from indicators.rsi import RSI, RSI_BACKENDS, wilder_rsi
+from indicators.macd import MACD
+from indicators.bollinger_bands import BollingerBands
+from indicators.indicator_engine import IndicatorEngine
+from indicators.technical_indicators import calculate_bollinger_bands, calculate_ema, calculate_rsi, calculate_sma
+
+class TestStreamingIndicators(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.close_prices = 30000 + np.cumsum(rng.normal(0, 50, 2000))
+
+    def test_rsi_update_matches_calculate(self):
+        rsi = RSI(period=14)
+        batch = rsi.calculate(self.close_prices)
+        streamed = [rsi.update(price) for price in self.close_prices]
+        # calculate() seeds from period + 1 deltas, so the stream is warm from index period + 1
+        self.assertTrue(all(value is None for value in streamed[:15]))
+        np.testing.assert_allclose(streamed[15:], batch[15:], rtol=1e-9)
+        self.assertEqual(rsi.value, streamed[-1])
+
+    def test_rsi_backends_match_reference_loop(self):
+        reference = wilder_rsi(self.close_prices, 14, backend='python')
+        for backend in RSI_BACKENDS:
+            np.testing.assert_allclose(wilder_rsi(self.close_prices, 14, backend=backend), reference, rtol=1e-12)
+        batch = np.vstack([self.close_prices, self.close_prices[::-1], self.close_prices * 2])
+        rows = RSI(period=14).calculate(batch)
+        self.assertEqual(rows.shape, batch.shape)
+        for row, prices in zip(rows, batch):
+            np.testing.assert_allclose(row, wilder_rsi(prices, 14, backend='python'), rtol=1e-12)
+
+    def test_macd_update_matches_calculate(self):
+        macd = MACD()
+        batch = macd.calculate(pd.DataFrame({'close': self.close_prices}))
+        streamed = pd.DataFrame([macd.update(price) for price in self.close_prices])
+        for column in ('macd', 'signal', 'histogram'):
+            np.testing.assert_allclose(streamed[column], batch[column], rtol=1e-9, atol=1e-9)
+
+    def test_bollinger_bands_update_matches_calculate(self):
+        bands = BollingerBands(period=20, std_dev=2)
+        upper, middle, lower = bands.calculate(self.close_prices)
+        streamed = [bands.update(price) for price in self.close_prices]
+        self.assertTrue(all(value is None for value in streamed[:19]))
+        streamed = np.array(streamed[19:])
+        np.testing.assert_allclose(streamed[:, 0], upper[19:], rtol=1e-9)
+        np.testing.assert_allclose(streamed[:, 1], middle[19:], rtol=1e-9)
+        np.testing.assert_allclose(streamed[:, 2], lower[19:], rtol=1e-9)
+
+    def test_bollinger_bands_batch_and_derived_series(self):
+        bands = BollingerBands(period=20, std_dev=2)
+        windows = np.lib.stride_tricks.sliding_window_view(self.close_prices, 20)
+        result = bands.calculate_all(self.close_prices)
+        np.testing.assert_allclose(result['middle'][19:], windows.mean(axis=1), rtol=1e-12)
+        np.testing.assert_allclose((result['upper'] - result['middle'])[19:], 2 * windows.std(axis=1), rtol=1e-9)
+        np.testing.assert_allclose(result['percent_b'][19:], (self.close_prices - result['lower'])[19:] / (4 * windows.std(axis=1)), rtol=1e-9)
+        self.assertEqual(bands.get_signal(self.close_prices, result), bands.get_signal(self.close_prices))
+        batch = np.vstack([self.close_prices, self.close_prices[::-1]])
+        for row, prices in zip(bands.calculate_all(batch)['bandwidth'], batch):
+            np.testing.assert_allclose(row, bands.get_bandwidth(prices), rtol=1e-12)
+        self.assertTrue(np.isnan(bands.calculate(self.close_prices[:5])[1]).all())
+
+    def test_reset_clears_state(self):
+        bands = BollingerBands(period=5)
+        for price in self.close_prices[:10]:
+            bands.update(price)
+        bands.reset()
+        self.assertIsNone(bands.value)
+        self.assertIsNone(bands.update(self.close_prices[0]))
+
+class TestTechnicalIndicators(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.close = pd.Series(30000 + np.cumsum(rng.normal(0, 50, 500)))
+
+    def test_matches_pandas_rolling(self):
+        np.testing.assert_allclose(calculate_sma(self.close.to_numpy(), 20), self.close.rolling(20).mean(), rtol=1e-9)
+        np.testing.assert_allclose(calculate_ema(self.close, 12), self.close.ewm(span=12, adjust=False).mean(), rtol=1e-12)
+        upper, middle, lower = calculate_bollinger_bands(self.close, 20, 2)
+        np.testing.assert_allclose(upper, self.close.rolling(20).mean() + 2 * self.close.rolling(20).std(), rtol=1e-9)
+        self.assertIsInstance(lower, pd.Series)
+
+    def test_rsi_matches_simple_average_definition(self):
+        delta = self.close.diff()
+        gain = delta.where(delta > 0, 0).rolling(14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+        np.testing.assert_allclose(calculate_rsi(self.close, 14), 100 - 100 / (1 + gain / loss), rtol=1e-9)
+
+class TestIndicatorEngine(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(13)
+        self.prices = 30000 + np.cumsum(rng.normal(0, 50, (4, 300)), axis=-1)
+        self.engine = IndicatorEngine(self.prices, symbols=['A', 'B', 'C', 'D'])
+
+    def test_grid_matches_per_call(self):
+        functions = {'sma': calculate_sma, 'ema': calculate_ema, 'rsi': calculate_rsi, 'rsi_wilder': wilder_rsi}
+        for name, function in functions.items():
+            grid = self.engine.compute(name, [5, 14, 30])
+            self.assertEqual(grid.shape, (4, 3, 300))
+            for row in range(4):
+                for position, period in enumerate([5, 14, 30]):
+                    np.testing.assert_allclose(grid[row, position], function(self.prices[row], period),
+                                               rtol=1e-9, equal_nan=True)
+
+    def test_precomputed_periods_are_shared(self):
+        self.engine.precompute({'sma': [5, 10, 10, 20]})
+        self.assertEqual(self.engine.stats, {'computed': 3, 'hits': 0})
+        values = self.engine.get('sma', 10, 'C')
+        self.assertEqual(self.engine.stats, {'computed': 3, 'hits': 1})
+        np.testing.assert_allclose(values, calculate_sma(self.prices[2], 10), equal_nan=True)
+        with self.assertRaises(ValueError):
+            values[-1] = 0
+        self.engine.get('sma', 40)
+        self.assertIn(('sma', 40), self.engine)
+
+    def test_max_cached_bounds_lone_periods(self):
+        engine = IndicatorEngine(self.prices, max_cached=1)
+        engine.get('ema', 5)
+        np.testing.assert_allclose(engine.get('ema', 7, 1), calculate_ema(self.prices[1], 7))
+        self.assertNotIn(('ema', 7), engine)
+
+    def test_covers_only_the_exact_bars(self):
+        data = pd.DataFrame({'close': self.prices[0]})
+        engine = IndicatorEngine.from_frame(data)
+        self.assertTrue(engine.covers(data))
+        # Same length, first and last closes: still other bars
+        altered = data.copy()
+        altered.iloc[150, 0] += 1
+        self.assertFalse(engine.covers(altered))
+        self.assertFalse(engine.covers(data.iloc[:-1]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,6 +20,14 @@ class TestPortfolio(unittest.TestCase):
         self.assertEqual(self.portfolio.positions['BTC/USDT'], 1)
         self.assertEqual(self.portfolio.balance, 0)
 
+    def test_rejects_non_positive_amounts(self):
+        self.portfolio.balance = 10000
+        for amount in (0, -1):
+            with self.assertRaises(ValueError):
+                self.portfolio.execute_trade({'symbol': 'BTC/USDT', 'action': 'buy', 'amount': amount, 'price': 10000})
+        self.assertEqual((self.portfolio.positions, self.portfolio.entry_prices, self.portfolio.balance), ({}, {}, 10000))
+        self.assertEqual(len(self.portfolio.get_trade_history()), 0)
+
     def test_update_status(self):
         self.portfolio.positions['BTC/USDT'] = 1
         self.portfolio.balance = 0
@@ -42,5 +50,30 @@ class TestPortfolio(unittest.TestCase):
         self.assertGreaterEqual(drawdown, 0)
         self.assertLess(drawdown, 1)
 
+    def test_ledger_tracks_equity_and_drawdown(self):
+        import numpy as np
+        self.portfolio.balance = 1000
+        prices = [100, 120, 90, 95, 130, 80]
+        for i, price in enumerate(prices):
+            self.portfolio.execute_trade({'symbol': 'BTC/USDT', 'action': 'buy', 'amount': 1, 'price': price}, timestamp=i)
+            self.portfolio.execute_trade({'symbol': 'BTC/USDT', 'action': 'sell', 'amount': 0.5, 'price': price}, timestamp=i)
+        values = self.portfolio.get_historical_values()
+        peak = np.maximum.accumulate(values)
+        self.assertAlmostEqual(self.portfolio.calculate_drawdown(), (peak[-1] - values[-1]) / peak[-1])
+        self.assertAlmostEqual(self.portfolio.equity.max_drawdown, ((peak - values) / peak).max())
+        trades = self.portfolio.trades_frame()
+        self.assertEqual(len(trades), 12)
+        self.assertEqual(list(trades['price'][:2]), [100, 100])
+        self.assertEqual(len(self.portfolio.equity_frame()), 12)
+
+    def test_closed_positions_leave_the_table(self):
+        self.portfolio.balance = 1000
+        self.portfolio.execute_trade({'symbol': 'BTC/USDT', 'action': 'buy', 'amount': 2, 'price': 100})
+        fill = self.portfolio.execute_trade({'symbol': 'BTC/USDT', 'action': 'sell', 'amount': 2, 'price': 110})
+        self.assertEqual(fill.profit, 20)
+        self.assertEqual(self.portfolio.positions, {})
+        self.assertEqual(self.portfolio.get_position('BTC/USDT'), 0)
+        self.assertEqual(self.portfolio.get_value(), 1020)
+
 if __name__ == '__main__':
     unittest.main()
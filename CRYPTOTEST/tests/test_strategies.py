@@ -7,6 +7,7 @@ from strategies.moving_average_strategy import MovingAverageStrategy
 from strategies.rsi_strategy import RSIStrategy
 from strategies.bollinger_bands_strategy import BollingerBandsStrategy
 from strategies.ema_crossover_strategy import EMACrossoverStrategy
+from strategies.scalping_strategy import ScalpingStrategy
 from data.exchange_data import ExchangeData
 from portfolio_management.portfolio import Portfolio
 from portfolio_management.risk_management import RiskManager
@@ -56,8 +57,15 @@ class TestStrategies(unittest.TestCase):
 
     def test_ema_crossover_strategy(self):
         strategy = EMACrossoverStrategy(short_window=5, long_window=10)
-        signals = strategy.generate_signals(self.exchange_data)
-        self.assertIsInstance(signals, list)
+        self.assertIsInstance(strategy.generate_signals(self.exchange_data), list)
+        # Each crossing is reported once, on its own bar: walk a down, up, down history as a live run would
+        closes = np.concatenate([np.linspace(100, 80, 30), np.linspace(80, 120, 30), np.linspace(120, 90, 30)])
+        history = pd.DataFrame({'open': closes, 'high': closes, 'low': closes, 'close': closes, 'volume': 1.0},
+                               index=pd.date_range('2023-01-01', periods=len(closes), freq='D'))
+        signals = []
+        for end in range(1, len(history) + 1):
+            signals.extend(strategy.generate_signals(history.iloc[:end]))
+        self.assertEqual([signal['action'] for signal in signals], ['buy', 'sell'])
         self.assertTrue(len(signals) > 0, "No signals were generated")
         
         # Check if we have both buy and sell signals
@@ -96,5 +104,18 @@ class TestStrategies(unittest.TestCase):
         self.assertIsInstance(position_size, float)
         self.assertGreater(position_size, 0)
 
+class TestScalpingStrategy(unittest.TestCase):
+    def test_sizes_through_the_portfolio_risk_manager(self):
+        portfolio = Portfolio(10000)
+        risk_manager = RiskManager(max_position_size=50, max_risk_per_trade=0.02)
+        strategy = ScalpingStrategy('BTC/USDT', {'stop_loss_threshold': 0.04}, risk_manager=risk_manager, portfolio=portfolio)
+        self.assertEqual(strategy.logger.name, 'TradingBot.ScalpingStrategy')
+        # 2% of 10000 at risk over a 4 stop: 50, the risk manager's cap
+        self.assertAlmostEqual(strategy.calculate_position_size(100.0), 50)
+        strategy.process({'close': 100.0})
+        action = strategy.process({'close': 102.0})
+        self.assertEqual((action['side'], action['symbol']), ('buy', 'BTC/USDT'))
+        self.assertAlmostEqual(action['amount'], 200 / (102.0 * 0.04))
+
 if __name__ == '__main__':
     unittest.main()
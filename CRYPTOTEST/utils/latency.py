@@ -0,0 +1,88 @@
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Upper bounds in seconds, from sub-millisecond strategy steps to slow order round trips
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def log_buckets(lowest: float = 1e-5, highest: float = 100.0, per_decade: int = 10) -> tuple:
+    '''
+    Geometric bucket bounds from lowest to highest, per_decade of them per power of
+    ten. As in an HdrHistogram the relative error of a percentile is the same at
+    every magnitude (about 12% with 10 per decade), so 50us and 5s are both resolved.
+    '''
+    decades = round(math.log10(highest / lowest) * per_decade)
+    return tuple(float(f"{lowest * 10 ** (i / per_decade):.3g}") for i in range(decades + 1))
+
+class LatencyHistogram:
+    '''
+    Fixed-bucket latency histogram: recording is O(log buckets) and memory is
+    constant however long the bot runs. Percentiles are interpolated within
+    the bucket that contains them.
+    '''
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            rank = q / 100 * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                if count and seen + count >= rank:
+                    lower = self.buckets[index - 1] if index > 0 else 0.0
+                    upper = self.buckets[index] if index < len(self.buckets) else self.max
+                    return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+                seen += count
+            return self.max
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        # Consistent copy of (per-bucket counts, count, total) for exporters
+        with self._lock:
+            return list(self.counts), self.count, self.total
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def get_stats(self) -> Dict:
+        stats = {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+        stats['buckets'] = dict(zip([*self.buckets, float('inf')], self.counts))
+        return stats
@@ -1,53 +1,125 @@
-
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-
-def setup_logging(log_file='trading_bot.log', max_file_size=5*1024*1024, backup_count=3):
-    # Create logs directory if it doesn't exist
-    log_dir = 'logs'
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    # Create a custom logger
-    logger = logging.getLogger('TradingBot')
-    logger.setLevel(logging.DEBUG)
-
-    # Create handlers
-    c_handler = logging.StreamHandler()
-    f_handler = RotatingFileHandler(os.path.join(log_dir, log_file), maxBytes=max_file_size, backupCount=backup_count)
-    c_handler.setLevel(logging.WARNING)
-    f_handler.setLevel(logging.DEBUG)
-
-    # Create formatters and add it to handlers
-    c_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    f_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    c_handler.setFormatter(c_format)
-    f_handler.setFormatter(f_format)
-
-    # Add handlers to the logger
-    logger.addHandler(c_handler)
-    logger.addHandler(f_handler)
-
-    # Create a security logger
-    security_logger = logging.getLogger('TradingBot.Security')
-    security_handler = RotatingFileHandler(os.path.join(log_dir, 'security.log'), maxBytes=max_file_size, backupCount=backup_count)
-    security_handler.setLevel(logging.INFO)
-    security_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    security_handler.setFormatter(security_format)
-    security_logger.addHandler(security_handler)
-
-    return logger, security_logger
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOGGER_NAME = 'TradingBot'
+SECURITY_LOGGER_NAME = 'TradingBot.Security'
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# DEBUG lines per second allowed per logger; per-tick debug output beyond that is dropped and counted
+DEFAULT_DEBUG_RATE = 200
+
+_lock = threading.Lock()
+_state = {}
+
+class RateLimitFilter(logging.Filter):
+    '''
+    Token bucket per logger name for records at or below max_level: each logger
+    may emit `rate` of them per second with bursts of `burst`, the rest are
+    dropped before being queued and counted in `dropped`. Warnings and errors
+    always pass.
+    '''
+    def __init__(self, rate: float, burst: float = None, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst or rate
+        self.max_level = max_level
+        self.dropped = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(record.name, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                self._buckets[record.name] = (tokens - 1, now)
+                return True
+            self._buckets[record.name] = (tokens, now)
+            self.dropped[record.name] = self.dropped.get(record.name, 0) + 1
+            return False
+
+def setup_logging(log_file='trading_bot.log', max_file_size=5*1024*1024, backup_count=3, log_dir='logs',
+                  console_level=logging.WARNING, debug_rate=DEFAULT_DEBUG_RATE):
+    '''
+    Configures the TradingBot loggers once per process and returns the main one;
+    later calls return it unchanged, whatever their arguments, so every component
+    can call it from its constructor. Loggers only enqueue records: formatting and
+    the console/file writes run on a QueueListener thread. DEBUG lines are rate
+    limited per logger (debug_rate per second, None to disable).
+    '''
+    logger = logging.getLogger(LOGGER_NAME)
+    with _lock:
+        if _state:
+            return logger
+        os.makedirs(log_dir, exist_ok=True)
+        formatter = logging.Formatter(LOG_FORMAT)
+
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(console_level)
+        console_handler.setFormatter(formatter)
+        file_handler = RotatingFileHandler(os.path.join(log_dir, log_file), maxBytes=max_file_size, backupCount=backup_count)
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(formatter)
+        # Security events also get their own file
+        security_handler = RotatingFileHandler(os.path.join(log_dir, 'security.log'), maxBytes=max_file_size, backupCount=backup_count)
+        security_handler.setLevel(logging.INFO)
+        security_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        security_handler.addFilter(logging.Filter(SECURITY_LOGGER_NAME))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        rate_filter = None
+        if debug_rate:
+            rate_filter = RateLimitFilter(debug_rate)
+            queue_handler.addFilter(rate_filter)
+        listener = QueueListener(log_queue, console_handler, file_handler, security_handler, respect_handler_level=True)
+        listener.start()
+
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(queue_handler)
+        _state.update(listener=listener, queue_handler=queue_handler, rate_filter=rate_filter,
+                      handlers=(console_handler, file_handler, security_handler))
+    return logger
+
+def shutdown_logging():
+    # Flushes the queue and closes the handlers; setup_logging() may then configure them again
+    with _lock:
+        if 'listener' not in _state:
+            return
+        _state['listener'].stop()
+        logging.getLogger(LOGGER_NAME).removeHandler(_state['queue_handler'])
+        for handler in _state['handlers']:
+            handler.close()
+        _state.clear()
+
+# Records still queued at exit are written out
+atexit.register(shutdown_logging)
+
+def get_logging_stats() -> dict:
+    rate_filter = _state.get('rate_filter')
+    return {
+        'configured': 'listener' in _state,
+        'dropped': dict(rate_filter.dropped) if rate_filter is not None else {},
+    }
 
 # Usage example
 if __name__ == "__main__":
-    logger, security_logger = setup_logging()
+    logger = setup_logging()
+    security_logger = logging.getLogger(SECURITY_LOGGER_NAME)
     logger.debug('This is a debug message')
     logger.info('This is an info message')
     logger.warning('This is a warning message')
     logger.error('This is an error message')
     logger.critical('This is a critical message')
-    
+
     security_logger.info('User logged in')
     security_logger.warning('Failed login attempt')
     security_logger.error('Unauthorized access attempt')
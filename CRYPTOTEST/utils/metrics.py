@@ -0,0 +1,312 @@
+
+import bisect
+import hmac
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Sequence, Tuple
+from urllib.parse import parse_qsl, urlsplit
+from utils.latency import LatencyHistogram, log_buckets
+from utils.logging_config import setup_logging
+
+# 10us to 100s with ~12% relative error: exchange round trips and sub-millisecond strategy steps alike
+HISTOGRAM_BUCKETS = log_buckets(1e-5, 100.0, 10)
+
+class CounterValue:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+class GaugeValue:
+    __slots__ = ('_value', '_function')
+
+    def __init__(self):
+        self._value = 0.0
+        self._function = None
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self._value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        # Read at scrape time instead of being pushed, e.g. the portfolio equity
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        return float(self._function()) if self._function is not None else self._value
+
+class HistogramValue(LatencyHistogram):
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+class Metric:
+    '''
+    A named family of values, one per combination of label values. labels()
+    returns the child for that combination (created on first use); hot paths
+    should keep the child instead of looking it up on every call. A metric
+    without labelnames is used directly.
+
+    Values are updated without locks (a lock costs as much as the update), so
+    each one must have a single writer thread, the event loop in the engine;
+    any thread may read or scrape them.
+    '''
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str = '', labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        self._default = None if self.labelnames else self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **labels):
+        key = values or tuple(labels[name] for name in self.labelnames if name in labels)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values or labels}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(value) for value in key), self._new_child())
+                self._children[key] = child
+        return child
+
+    def children(self) -> List[Tuple[Dict[str, str], object]]:
+        seen = {}
+        for key, child in list(self._children.items()):
+            seen.setdefault(id(child), (dict(zip(self.labelnames, map(str, key))), child))
+        return list(seen.values())
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _new_child(self) -> CounterValue:
+        return CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def _new_child(self) -> GaugeValue:
+        return GaugeValue()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str = '', labelnames: Sequence[str] = (), buckets: Sequence[float] = HISTOGRAM_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def record(self, seconds: float):
+        self._default.record(seconds)
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._default.record(time.perf_counter() - start)
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+class MetricsRegistry:
+    '''
+    Counters, gauges and latency histograms of one process. counter(), gauge()
+    and histogram() return the existing metric of that name, so components can
+    declare what they record from their constructors. Readers either scrape
+    render_prometheus() (text format 0.0.4) or take a snapshot() dict.
+    '''
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+        if type(metric) is not cls or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} already registered as a {metric.kind} with labels {metric.labelnames}")
+        return metric
+
+    def counter(self, name: str, help: str = '', labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str = '', labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str = '', labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = HISTOGRAM_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Metric:
+        return self._metrics.get(name)
+
+    def snapshot(self) -> Dict:
+        '''
+        {name: {'type', 'help', 'samples': [{'labels', ...}]}} where counter and
+        gauge samples carry a 'value' and histogram samples count, sum, mean,
+        max and p50/p95/p99 in seconds.
+        '''
+        snapshot = {}
+        for name, metric in list(self._metrics.items()):
+            samples = []
+            for labels, child in metric.children():
+                if metric.kind == 'histogram':
+                    stats = child.get_stats()
+                    del stats['buckets']
+                    stats['sum'] = child.total
+                    samples.append({'labels': labels, **stats})
+                else:
+                    samples.append({'labels': labels, 'value': child.value})
+            snapshot[name] = {'type': metric.kind, 'help': metric.help, 'samples': samples}
+        return snapshot
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for name, metric in list(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, child in metric.children():
+                if metric.kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(child.value)}")
+                    continue
+                counts, count, total = child.snapshot()
+                cumulative = 0
+                for bound, bucket_count in zip([*metric.buckets, float('inf')], counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+def get_registry() -> MetricsRegistry:
+    # Process-wide registry the engine records into and the scrape endpoint serves
+    return REGISTRY
+
+class MetricsServer:
+    '''
+    Serves a registry over HTTP on a daemon thread: GET /metrics returns the
+    Prometheus text format, GET /metrics.json the snapshot. Admin commands are
+    POST /admin/<name>?key=value: commands[name] gets the query as a dict, runs
+    on the server thread and returns a JSON-able result. They require an
+    "Authorization: Bearer <admin_token>" header and are refused (403) when no
+    admin_token is set. Binds to localhost by default; port 0 picks a free
+    port, available as .port after start().
+    '''
+    def __init__(self, registry: MetricsRegistry = None, host: str = '127.0.0.1', port: int = 9108,
+                 commands: Dict[str, Callable[[Dict[str, str]], Dict]] = None, admin_token: str = None):
+        self.logger = setup_logging()
+        self.registry = registry or REGISTRY
+        self.commands = commands if commands is not None else {}
+        self.admin_token = admin_token
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self) -> 'MetricsServer':
+        registry = self.registry
+        commands = self.commands
+        expected = f"Bearer {self.admin_token}".encode() if self.admin_token else None
+        logger = self.logger
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, body: bytes, content_type: str, status: int = 200):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                if path == '/metrics':
+                    self._reply(registry.render_prometheus().encode(), 'text/plain; version=0.0.4; charset=utf-8')
+                elif path == '/metrics.json':
+                    self._reply(json.dumps(registry.snapshot()).encode(), 'application/json')
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                url = urlsplit(self.path)
+                command = commands.get(url.path[len('/admin/'):]) if url.path.startswith('/admin/') else None
+                if command is None:
+                    self.send_error(404)
+                    return
+                if expected is None:
+                    self.send_error(403, "Admin commands are disabled: no admin token configured")
+                    return
+                if not hmac.compare_digest(self.headers.get('Authorization', '').encode(), expected):
+                    logger.warning(f"Rejected unauthenticated admin command {url.path} from {self.client_address[0]}")
+                    self.send_error(401)
+                    return
+                try:
+                    result = command(dict(parse_qsl(url.query)))
+                except (TypeError, ValueError) as e:
+                    self._reply(json.dumps({'error': str(e)}).encode(), 'application/json', 400)
+                    return
+                logger.info(f"Admin command {url.path}?{url.query}: {result}")
+                self._reply(json.dumps(result).encode(), 'application/json')
+
+            def log_message(self, format, *args):
+                logger.debug("Metrics request: " + format, *args)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
@@ -0,0 +1,109 @@
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+from utils.logging_config import setup_logging
+
+class SamplingProfiler:
+    '''
+    Stack sampler for a running bot, idle until start(seconds). While on, a
+    thread reads the stack of every other thread each `interval` seconds
+    (sys._current_frames, no tracing hooks) and counts identical stacks; at
+    the end they are written in collapsed-stack form, "frame;frame;... count"
+    per line, which flamegraph.pl, speedscope and inferno read as is.
+
+    Each stack starts with its thread name. Samples taken inside a strategy's
+    generate_signals (or on_bar) also carry strategy:<name> and, while its
+    per-symbol loop runs, symbol:<symbol> (read from the `symbol` local).
+    '''
+    ENTRY_POINTS = ('generate_signals', 'on_bar')
+
+    def __init__(self, output_dir: str = 'profiles', interval: float = 0.01):
+        self.logger = setup_logging()
+        self.output_dir = output_dir
+        self.interval = interval
+        self.last_path: Optional[str] = None
+        self._stacks: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float) -> bool:
+        # False when a profile is already being taken
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._stacks = {}
+            self._thread = threading.Thread(target=self._run, args=(seconds,), name='sampling-profiler', daemon=True)
+            self._thread.start()
+        self.logger.info(f"Sampling stacks every {self.interval * 1000:.0f}ms for {seconds}s")
+        return True
+
+    def stop(self) -> Optional[str]:
+        # Ends the current profile early; returns the file written
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        return self.last_path
+
+    def _run(self, seconds: float):
+        deadline = time.monotonic() + seconds
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            self.sample(exclude=own)
+        self.last_path = self.write()
+
+    def sample(self, exclude: int = None):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != exclude:
+                stack = self.collapse(frame, names.get(thread_id, str(thread_id)))
+                self._stacks[stack] = self._stacks.get(stack, 0) + 1
+
+    def collapse(self, frame, thread_name: str) -> str:
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        labels = [thread_name]
+        for frame in reversed(frames):
+            code = frame.f_code
+            if code.co_name in self.ENTRY_POINTS:
+                labels.extend(self._tags(frame))
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            labels.append(f"{module}:{getattr(code, 'co_qualname', code.co_name)}")
+        # ';' separates frames and the count follows the last space
+        return ';'.join(labels).replace(' ', '_')
+
+    @staticmethod
+    def _tags(frame) -> list:
+        local_vars = frame.f_locals
+        strategy = local_vars.get('self')
+        if strategy is None:
+            return []
+        tags = [f"strategy:{getattr(strategy, 'name', strategy.__class__.__name__)}"]
+        symbol = local_vars.get('symbol')
+        if isinstance(symbol, str):
+            tags.append(f"symbol:{symbol}")
+        return tags
+
+    def write(self) -> Optional[str]:
+        if not self._stacks:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        now = time.time()
+        path = os.path.join(self.output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}"
+                                             f"-{int(now * 1000) % 1000:03d}.collapsed")
+        with open(path, 'w') as output:
+            for stack, count in sorted(self._stacks.items()):
+                output.write(f"{stack} {count}\n")
+        self.logger.info(f"Wrote {sum(self._stacks.values())} stack samples to {path}")
+        return path